@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+
+'''
+run galfit for many templates concurrently
+
+    each job runs in its own scratch directory,
+        so that concurrent runs would not clobber numbering of galfit.NN
+            or interleave writes to a shared fit.log
+    after run, result template and log are merged back
+        to directory of the initial template
+'''
+
+import os
+import re
+import shutil
+import signal
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .tools import gfname, gfnum, get_allocator, release_gfname
+from .tools_path import abs_dirname, rel_chdir
+
+galfit_exe='galfit'   # executable of galfit
+
+# names of files in scratch directory
+scratch_init=gfname(1)
+scratch_result=gfname(2)
+scratch_stdout='galfit.stdout'
+
+# lock of fit.log in current process
+_lock=threading.Lock()
+
+# head paths in template text
+head_line_re=re.compile(r'^[ \t]*(\w+)\)[ \t]+(\S+)', re.M)
+path_keys='ABCDFG'   # head parameters of files
+
+def rewrite_head_paths(text, src, dest):
+    '''
+    rewrite paths in head of template text,
+        from relative to directory `src` to `dest`
+
+    other lines, like hidden parameters and comments, are kept as they are
+    '''
+    pieces=[]
+    i=0
+    for m in head_line_re.finditer(text):
+        key, val=m.groups()
+        if key=='0':   # components begin
+            break
+        if key not in path_keys or val=='none':
+            continue
+        pieces.append(text[i:m.start(2)])
+        pieces.append(rel_chdir(val, src, dest))
+        i=m.end(2)
+    pieces.append(text[i:])
+    return ''.join(pieces)
+
+# paths of images in log text
+log_path_re=re.compile(
+    r'^((?:Input|Output) image[ \t]*:[ \t]*)(\S+?)(\[[^\]]*\])?[ \t]*$', re.M)
+
+def rewrite_log_paths(text, src, dest):
+    '''
+    rewrite paths of input and output images in log text,
+        from relative to directory `src` to `dest`
+        section of image, like [1:100,1:100], is kept
+    '''
+    def repl(m):
+        head, fname, section=m.groups()
+        if fname=='none':
+            return m.group(0)
+        return head+rel_chdir(fname, src, dest)+(section or '')
+    return log_path_re.sub(repl, text)
+
+def copy_template(src_fname, dest_fname, src=None, init=None):
+    '''
+    copy text of template, with paths in head rewritten to its new directory
+
+    Parameters
+    ----------
+    src: str or None
+        directory which paths in source template are relative to
+        if None, it is directory of source template
+
+    init: str or None
+        if given, rename initial template in comment of result template
+    '''
+    with open(src_fname) as f:
+        text=f.read()
+
+    if src is None:
+        src=abs_dirname(src_fname)
+    text=rewrite_head_paths(text, src, abs_dirname(dest_fname))
+    if init is not None:
+        text=re.sub(r'^(#  Input menu file:).*$', r'\1 '+init, text,
+                    count=1, flags=re.M)
+
+    with open(dest_fname, 'w') as f:
+        f.write(text)
+
+# scratch directory
+def prepare_scratch(init_fname, scratch):
+    '''
+    copy template in scratch directory,
+        with paths in head relative to it
+    '''
+    copy_template(init_fname, os.path.join(scratch, scratch_init))
+
+def collect_scratch(scratch, init_fname, result_fname, src=None):
+    '''
+    copy result template and log in scratch to destination
+
+    result template of galfit is copied as it is,
+        except for paths in head and name of initial template
+    in log, names of templates and paths of images are rewritten
+
+    Parameters
+    ----------
+    src: str or None
+        directory which paths in result template and log are relative to
+        if None, it is scratch directory
+    '''
+    dest=abs_dirname(result_fname)
+    src=src or scratch
+
+    # result template, with paths relative to destination
+    copy_template(os.path.join(scratch, scratch_result), result_fname,
+                  src=src, init=os.path.basename(init_fname))
+
+    # fit.log
+    fitlog=os.path.join(scratch, 'fit.log')
+    if os.path.isfile(fitlog):
+        with open(fitlog) as f:
+            text=f.read()
+        text=rename_log(text, os.path.basename(init_fname),
+                              os.path.basename(result_fname))
+        text=rewrite_log_paths(text, src, dest)
+        append_log(os.path.join(dest, 'fit.log'), text)
+
+def rename_log(text, init, result):
+    '''
+    rename init and result file in log text from scratch
+    '''
+    text=re.sub(r'^(Init\. par\. file :).*$', r'\1 '+init, text, flags=re.M)
+    text=re.sub(r'^(Restart file    :).*$', r'\1 '+result, text, flags=re.M)
+    return text
+
+def append_log(fitlog, text):
+    '''
+    append text to fit.log, locked among processes
+    '''
+    import fcntl
+    with _lock, open(fitlog, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(text)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def clean_scratch(scratch, succeed=True, keep_scratch=False):
+    '''
+    remove scratch directory, but kept for failed job
+    '''
+    if succeed and not keep_scratch:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+# run galfit
+def run_galfit(scratch, timeout=None, capture=True):
+    '''
+    run galfit in scratch directory, killed if timeout
+
+    Parameters
+    ----------
+    capture: bool
+        if True, stdout is written to file in scratch,
+        otherwise, it is inherited from current process
+
+    Returns
+    -------
+    exit code
+    '''
+    with open(os.path.join(scratch, scratch_stdout), 'w') as fout:
+        if not capture:
+            fout=None
+        proc=subprocess.Popen([galfit_exe, scratch_init], cwd=scratch,
+                              stdin=subprocess.DEVNULL,
+                              stdout=fout, stderr=subprocess.STDOUT,
+                              start_new_session=True)
+        try:
+            return proc.wait(timeout=timeout)
+        except:
+            # timeout or interrupted: kill all processes in the session
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+            raise
+
+class GalFitJob:
+    '''
+    job to run galfit for a template
+
+    numbers of changed template and result are reserved
+        through allocator shared in process, see `tools.GfnameAllocator`
+
+    Parameters
+    ----------
+    init: str or integer
+        initial template
+
+    change: callable or None
+        change the given initial template, and run galfit in new one,
+            which is saved beside initial one
+        if callable, it only accepts one GalFit-type argument
+
+    cache: None, True, str or `gfcache.ResultCache`
+        cache of results, to skip galfit for a run done before
+        if True, use default cache; if str, it is directory of cache
+    '''
+    def __init__(self, init, change=None, cache=None):
+        if type(init)==int:
+            init=gfname(init)
+        self.init=os.path.abspath(init)
+        self.change=change
+
+        if cache is not None:
+            from .gfcache import get_cache
+            cache=get_cache(cache)
+        self.cache=cache
+        self.key=None
+
+    def load(self):
+        '''
+        load template, write changed one, and reserve number of result
+
+        return GalFit, name of template to run and of result
+        '''
+        from .galfit import GalFit
+        gf=GalFit(self.init)
+
+        alloc=get_allocator(gf.gfpath)
+        fno=gfnum(self.init) or 0
+
+        init=self.init
+        if self.change is not None:
+            self.change(gf)
+            fno, fno_r=alloc.reserve_pair(fno)
+            init=alloc.gfname(fno)
+            try:
+                gf.writeto_file(init)
+            except:
+                alloc.release(fno_r)
+                alloc.release(fno)
+                raise
+        else:
+            fno_r=alloc.reserve(fno)
+
+        return gf, init, alloc.gfname(fno_r)
+
+    def setup(self, scratch_dir=None):
+        '''
+        load template and write it in a new scratch directory
+
+        return GalFit, name of template and result, and scratch directory
+        '''
+        gf, init, result=self.load()
+
+        try:
+            if self.cache is not None:
+                self.key=self.cache.key(gf, fname=init)
+
+            scratch=tempfile.mkdtemp(prefix='galfit_', dir=scratch_dir)
+            prepare_scratch(init, scratch)
+        except:
+            release_gfname(result)
+            raise
+
+        return gf, init, result, scratch
+
+    def collect(self, init, result, scratch, ecode):
+        '''
+        collect result in scratch after galfit exits
+            reserved result is released if failed
+        '''
+        try:
+            if ecode!=0 or \
+               not os.path.exists(os.path.join(scratch, scratch_result)):
+                raise Exception('galfit failed for %s, exit code: %i'
+                                    % (init, ecode))
+
+            collect_scratch(scratch, init, result)
+        except:
+            release_gfname(result)
+            raise
+
+        if self.key is not None:
+            self.store(scratch)
+
+    # cache
+    def restore(self, init, result, scratch):
+        '''
+        restore result from cache
+
+        return whether it is found in cache
+        '''
+        if self.key is None:
+            return False
+
+        entry=self.cache.get(self.key)
+        if entry is None:
+            return False
+
+        try:
+            with open(os.path.join(scratch, scratch_result), 'w') as f:
+                f.write(entry['result'])
+            with open(os.path.join(scratch, 'fit.log'), 'w') as f:
+                f.write(entry['log'])
+            collect_scratch(scratch, init, result, src=os.sep)
+        except:
+            release_gfname(result)
+            raise
+
+        return True
+
+    def store(self, scratch):
+        '''
+        store result in scratch to cache
+            result template and log are stored as text,
+                with paths relative to root
+        '''
+        with open(os.path.join(scratch, scratch_result)) as f:
+            text=f.read()
+        text=rewrite_head_paths(text, scratch, os.sep)
+
+        log=''
+        fitlog=os.path.join(scratch, 'fit.log')
+        if os.path.isfile(fitlog):
+            with open(fitlog) as f:
+                log=f.read()
+            log=rewrite_log_paths(log, scratch, os.sep)
+
+        self.cache.put(self.key, text, log)
+
+    def run(self, timeout=None, scratch_dir=None,
+                  keep_scratch=False, capture=True):
+        '''
+        run galfit in a scratch directory
+
+        return name of result template
+        '''
+        gf, init, result, scratch=self.setup(scratch_dir)
+
+        succeed=False
+        try:
+            if self.restore(init, result, scratch):
+                succeed=True
+                return result
+
+            try:
+                ecode=run_galfit(scratch, timeout=timeout, capture=capture)
+            except:
+                release_gfname(result)
+                raise
+            self.collect(init, result, scratch, ecode)
+            succeed=True
+        finally:
+            clean_scratch(scratch, succeed, keep_scratch)
+
+        return result
+
+# user function
+def rungf_many(jobs, workers=None, timeout=None, cache=None,
+                     scratch_dir=None, keep_scratch=False):
+    '''
+    run galfit for many templates concurrently
+
+    Parameters
+    ----------
+    jobs: list
+        each item is GalFitJob, initial template, or tuple (init, change)
+            see `GalFitJob` for details
+
+    workers: int or None
+        number of galfit processes running concurrently
+        if None, use number of CPUs
+
+    timeout: float or None
+        seconds to wait for each galfit, killed if exceeded
+
+    cache: None, True, str or `gfcache.ResultCache`
+        cache of results, see `GalFitJob`
+
+    scratch_dir: str or None
+        directory to create scratch directories
+        if None, use default temporary directory
+
+    keep_scratch: bool
+        whether to keep scratch directories of succeeded jobs
+            those of failed jobs are always kept
+
+    Returns
+    -------
+    list of result template, or exception for failed job
+    '''
+    if cache is not None:
+        from .gfcache import get_cache
+        cache=get_cache(cache)
+
+    jobs=[j if isinstance(j, GalFitJob) else
+          GalFitJob(*j, cache=cache) if type(j)==tuple else
+          GalFitJob(j, cache=cache)
+            for j in jobs]
+
+    if workers is None:
+        workers=os.cpu_count() or 1
+
+    def run(job):
+        try:
+            return job.run(timeout=timeout, scratch_dir=scratch_dir,
+                           keep_scratch=keep_scratch)
+        except Exception as e:
+            return e
+
+    # galfit runs in subprocesses, so threads are enough to drive them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, jobs))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+'''
+throughput of hot accessors of Model, Parameter and GalFit
+'''
+
+from common import import_module, timeit
+
+galfit=import_module('galfit')
+
+def make_template():
+    gf=galfit.GalFit()
+    gf.head.region=[1, 100, 1, 100]
+    gf.add_sersic(vals=[50, 50, 18, 10, 2.5, 0.8, 30], tofits=[1]*7)
+    gf.add_sky(vals=[0, 0, 0], tofits=[1, 0, 0])
+    return gf
+
+if __name__=='__main__':
+    gf=make_template()
+    mod=gf.comps[0]
+    par=mod.par_re
+
+    n=10000
+    cases=[
+        ('mod.re', lambda: mod.re),
+        ('mod.vals', lambda: mod.vals),
+        ('mod.set_vals(...)', lambda: mod.set_vals([50, 50, 18, 10, 2.5, 0.8, 30])),
+        ('mod.par_re', lambda: mod.par_re),
+        ('par.get_val()', lambda: par.get_val()),
+        ('par.set_tofit(1)', lambda: par.set_tofit(1)),
+        ('gf.region', lambda: gf.region),
+        ('gf.chinput(...)', lambda: gf.chinput('a.fits')),
+    ]
+    for name, func in cases:
+        def loop():
+            for _ in range(n):
+                func()
+        t=timeit(loop)/n
+        print('%-20s %8.0f ns' % (name, t*1e9))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+'''
+time to build Sersic+Sky templates from a catalog,
+    by `add_sersic` per object or by `GalFit.from_arrays` at once
+'''
+
+import numpy as np
+
+from common import import_module, timeit
+
+galfit=import_module('galfit')
+
+def random_catalog(num, seed=1):
+    rng=np.random.default_rng(seed)
+    return {
+        'x0': rng.uniform(1, 100, num),
+        'y0': rng.uniform(1, 100, num),
+        'mag': rng.uniform(16, 22, num),
+        're': rng.uniform(1, 20, num),
+        'n': np.full(num, 2.5),
+        'ba': rng.uniform(0.3, 1, num),
+        'pa': rng.uniform(-90, 90, num),
+    }
+
+def build_loop(cat):
+    keys=['x0', 'y0', 'mag', 're', 'n', 'ba', 'pa']
+    gfs=[]
+    for row in zip(*[cat[k] for k in keys]):
+        gf=galfit.GalFit()
+        gf.head.zerop=25
+        gf.add_sersic(vals=list(row), tofits=[1]*7)
+        gf.add_sky(vals=[0, 0, 0], tofits=[1, 0, 0])
+        gfs.append(gf)
+    return gfs
+
+def build_arrays(cat):
+    return galfit.GalFit.from_arrays(
+                [('sersic', cat, [1]*7), ('sky', {'bkg': 0}, [1, 0, 0])],
+                head={'zerop': 25})
+
+if __name__=='__main__':
+    for num in [1000, 10000]:
+        cat=random_catalog(num)
+        t0=timeit(build_loop, cat)
+        t1=timeit(build_arrays, cat)
+        print('%6i templates: loop %8.1f ms, from_arrays %8.1f ms'
+                % (num, t0*1e3, t1*1e3))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+'''
+memory used per component
+
+    components are created as in catalog work,
+        i.e. values and fit toggles set, uncertainties and flags default
+
+    with `--baseline REV`, the same measurement is run
+        on the package at git revision REV in a subprocess,
+        e.g. the tree before a change, and both are compared
+'''
+
+import os
+import sys
+import gc
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import common
+
+names=['sersic', 'expdisk', 'psf', 'sky']
+
+def bytes_per_comp(modcls, num=10000):
+    vals=modcls().vals
+    tofits=[1]*len(vals)
+
+    gc.collect()
+    tracemalloc.start()
+    snap0=tracemalloc.take_snapshot()
+
+    comps=[modcls(vals=vals, tofits=tofits) for _ in range(num)]
+
+    snap1=tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats=snap1.compare_to(snap0, 'filename')
+    nbytes=sum([s.size_diff for s in stats])
+    del comps
+    return nbytes/num
+
+def measure(num):
+    '''
+    bytes per component for each model, in current package
+    '''
+    model=common.import_module('model')
+    return {name: bytes_per_comp(model.Model.get_model(name), num)
+                for name in names}
+
+def measure_rev(rev, num):
+    '''
+    bytes per component at a git revision, measured in a subprocess
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pkgdir=os.path.join(tmpdir, common.pkgname)
+        os.makedirs(pkgdir)
+
+        archive=subprocess.run(['git', '-C', common.pkgdir, 'archive', rev],
+                               check=True, stdout=subprocess.PIPE).stdout
+        subprocess.run(['tar', '-x', '-C', pkgdir], input=archive, check=True)
+
+        out=subprocess.run([sys.executable, os.path.abspath(__file__),
+                                '--pkgdir', pkgdir, '--num', str(num)],
+                           check=True, stdout=subprocess.PIPE).stdout
+    result={}
+    for line in out.decode().splitlines():
+        name, nbytes=line.split()[:2]
+        result[name]=float(nbytes)
+    return result
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser()
+    parser.add_argument('--baseline', metavar='REV',
+                        help='git revision to compare with')
+    parser.add_argument('--pkgdir', help=argparse.SUPPRESS)
+    parser.add_argument('--num', type=int, default=10000,
+                        help='number of components')
+    args=parser.parse_args()
+
+    if args.pkgdir is not None:
+        common.set_pkgdir(args.pkgdir)
+
+    after=measure(args.num)
+    if args.baseline is None:
+        for name in names:
+            print('%-8s %8.0f bytes/component' % (name, after[name]))
+        sys.exit()
+
+    before=measure_rev(args.baseline, args.num)
+    print('%-8s %10s %10s %8s' % ('model', args.baseline[:10], 'current',
+                                  'ratio'))
+    for name in names:
+        print('%-8s %10.0f %10.0f %8.2f' % (name, before[name], after[name],
+                                            after[name]/before[name]))
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+'''
+throughput of parsing templates with 1-200 components,
+    by default parser and by fast one
+'''
+
+import os
+import tempfile
+
+import numpy as np
+
+from common import import_module, timeit
+
+galfit=import_module('galfit')
+
+def write_template(fname, ncomp, seed=1):
+    rng=np.random.default_rng(seed)
+    gf=galfit.GalFit()
+    gf.head.region=[1, 500, 1, 500]
+    for _ in range(ncomp):
+        gf.add_sersic(vals=[rng.uniform(1, 500), rng.uniform(1, 500), 18,
+                            rng.uniform(2, 20), rng.uniform(0.5, 4),
+                            rng.uniform(0.3, 1), rng.uniform(-90, 90)],
+                      tofits=[1]*7)
+    gf.add_sky(vals=[0, 0, 0], tofits=[1, 0, 0])
+    gf.writeto_file(fname)
+
+if __name__=='__main__':
+    with tempfile.TemporaryDirectory() as d:
+        fname=os.path.join(d, 'galfit.01')
+        for ncomp in [1, 10, 50, 200]:
+            write_template(fname, ncomp)
+            t0=timeit(galfit.GalFit, fname, number=20)
+            t1=timeit(galfit.GalFit, fname, fast=True, number=20)
+            print('%4i comps: default %8.3f ms, fast %8.3f ms,'
+                  ' %8.0f comps/s by fast'
+                  % (ncomp, t0*1e3, t1*1e3, (ncomp+1)/t1))
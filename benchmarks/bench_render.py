@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+
+'''
+time to render model image of 30 sersic components in 500x500 stamp
+'''
+
+import numpy as np
+
+from common import import_module, timeit
+
+render=import_module('render')
+
+def random_comps(num=30, size=500, seed=1):
+    rng=np.random.default_rng(seed)
+    comps=[]
+    for _ in range(num):
+        vals=[rng.uniform(1, size), rng.uniform(1, size), 18,
+              rng.uniform(2, 20), rng.uniform(0.5, 4),
+              rng.uniform(0.3, 1), rng.uniform(-90, 90)]
+        comps.append(('sersic', vals))
+    return comps
+
+if __name__=='__main__':
+    frame=render.Frame([1, 500, 1, 500])
+    comps=random_comps()
+    render.get_sersic_table()  # built once in process
+
+    for kwargs in [{}, {'tol': 1e-8}, {'tol': 1e-6},
+                   {'tol': 1e-6, 'oversample': 5}]:
+        t=timeit(render.render_comps, comps, frame, **kwargs)
+        print('%-32s %8.2f ms' % (kwargs or 'all pixels', t*1e3))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+'''
+round trip of templates by text file and by compact serialization
+'''
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+from common import import_module, timeit
+
+galfit=import_module('galfit')
+serial=import_module('serial')
+
+def random_template(ncomp, seed=1):
+    rng=np.random.default_rng(seed)
+    gf=galfit.GalFit()
+    gf.head.region=[1, 500, 1, 500]
+    for _ in range(ncomp):
+        gf.add_sersic(vals=[rng.uniform(1, 500), rng.uniform(1, 500), 18,
+                            rng.uniform(2, 20), rng.uniform(0.5, 4),
+                            rng.uniform(0.3, 1), rng.uniform(-90, 90)],
+                      tofits=[1]*7)
+    gf.add_sky(vals=[0, 0, 0], tofits=[1, 0, 0])
+    return gf
+
+def text_round(gf, fname):
+    gf.writeto_file(fname)
+    return galfit.GalFit(fname)
+
+def serial_round(gf, fname):
+    serial.dump(gf, fname)
+    return serial.load(fname)
+
+if __name__=='__main__':
+    with tempfile.TemporaryDirectory() as d:
+        ftxt=os.path.join(d, 'galfit.01')
+        fbin=os.path.join(d, 'galfit.gfb')
+        for ncomp in [1, 20, 200]:
+            gf=random_template(ncomp)
+            t0=timeit(text_round, gf, ftxt, number=10)
+            t1=timeit(serial_round, gf, fbin, number=10)
+            t2=timeit(lambda: pickle.loads(pickle.dumps(gf)), number=10)
+            print('%4i comps: text %8.3f ms, serial %8.3f ms, pickle %8.3f ms'
+                  ', %6i/%6i bytes'
+                  % (ncomp, t0*1e3, t1*1e3, t2*1e3,
+                     os.path.getsize(ftxt), os.path.getsize(fbin)))
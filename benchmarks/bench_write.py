@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+'''
+time to write variants of a template,
+    by text of `str(gf)`, by streaming writer, and by `write_many`
+'''
+
+import os
+import tempfile
+
+import numpy as np
+
+from common import import_module, timeit
+
+galfit=import_module('galfit')
+
+def variants(num, ncomp=5, seed=1):
+    rng=np.random.default_rng(seed)
+    gfs=[]
+    for _ in range(num):
+        gf=galfit.GalFit()
+        gf.head.region=[1, 500, 1, 500]
+        for _ in range(ncomp):
+            gf.add_sersic(vals=[rng.uniform(1, 500), rng.uniform(1, 500), 18,
+                                rng.uniform(2, 20), rng.uniform(0.5, 4),
+                                rng.uniform(0.3, 1), rng.uniform(-90, 90)],
+                          tofits=[1]*7)
+        gf.add_sky(vals=[0, 0, 0], tofits=[1, 0, 0])
+        gfs.append(gf)
+    return gfs
+
+def write_text(gfs, paths):
+    for gf, p in zip(gfs, paths):
+        with open(p, 'w') as f:
+            f.write(str(gf)+'\n')
+
+def write_stream(gfs, paths):
+    for gf, p in zip(gfs, paths):
+        gf.writeto_file(p)
+
+if __name__=='__main__':
+    num=2000
+    gfs=variants(num)
+    with tempfile.TemporaryDirectory() as d:
+        paths=[os.path.join(d, 'galfit.%05i' % i) for i in range(num)]
+        t0=timeit(write_text, gfs, paths)
+        t1=timeit(write_stream, gfs, paths)
+        t2=timeit(galfit.GalFit.write_many, gfs, paths, workers=4)
+        print('%i templates: str %8.1f ms, stream %8.1f ms,'
+              ' write_many(4) %8.1f ms' % (num, t0*1e3, t1*1e3, t2*1e3))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+'''
+common tools for benchmarks
+'''
+
+import os
+import sys
+import time
+import importlib
+
+# import modules of the package from its source directory
+pkgdir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+pkgname=os.path.basename(pkgdir)
+if os.path.dirname(pkgdir) not in sys.path:
+    sys.path.insert(0, os.path.dirname(pkgdir))
+
+def set_pkgdir(path):
+    '''
+    import modules of the package from another directory,
+        like a checkout of an old revision
+    '''
+    global pkgdir, pkgname
+    pkgdir=os.path.abspath(path)
+    pkgname=os.path.basename(pkgdir)
+    sys.path.insert(0, os.path.dirname(pkgdir))
+
+def import_module(name):
+    return importlib.import_module('%s.%s' % (pkgname, name))
+
+# timer
+def timeit(func, *args, repeat=3, number=1, **kwargs):
+    '''
+    best time of `number` calls, in unit of seconds
+    '''
+    best=None
+    for _ in range(repeat):
+        t0=time.perf_counter()
+        for _ in range(number):
+            func(*args, **kwargs)
+        t=(time.perf_counter()-t0)/number
+        if best is None or t<best:
+            best=t
+    return best
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+'''
+columnar view of many galfit templates
+
+    parse templates without building GalFit, Model and Parameter objects,
+        and collect components in a dict of numpy arrays, one row per component
+
+    inversely, build many templates from arrays of a catalog
+'''
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .head import Head
+from .model import Model, no_gc
+from .fitlog import load_fitlogs
+from .tools import gfname
+
+from .tools_path import abs_dirname, abs_join
+
+# keys of parameters in all models, used as columns of 2d arrays
+param_keys=tuple(sorted(set().union(*[m.sorted_keys
+                                        for m in Model.get_all_models().values()]),
+                        key=int))
+param_index={k: i for i, k in enumerate(param_keys)}
+
+# properties of fit taken from fit.log
+log_props=('chisq', 'ndof', 'reduce_chisq')
+
+# parse a template file
+def _parse_template(filename):
+    '''
+    parse a template file into plain python objects
+
+    Returns
+    -------
+    init_file: str or None
+
+    head: dict
+        fields for each head key
+
+    comps: list of (name, dict)
+        dict maps parameter key to its fields
+    '''
+    init_file=None
+    head={}
+    comps=[]
+
+    blk=head
+    with open(filename) as f:
+        for line in f:
+            if line.startswith('#  Input menu file: '):
+                init_file=line.split()[-1]
+                continue
+
+            line=line.strip()
+            if not line or line[0]=='#':
+                continue
+
+            key, *vals=line.split()
+            if key[-1]!=')':
+                continue
+
+            key=key[:-1]
+            if key=='0':
+                blk={}
+                comps.append((vals[0].lower(), blk))
+                continue
+
+            blk[key]=vals
+    return init_file, head, comps
+
+def _template_rows(filename, loadlog=False):
+    '''
+    rows of components in a template
+
+    each row is a list [name, Z, vals, tofits, uncerts, flags],
+        where vals, ... are lists ordered as `param_keys`,
+            with nan, -1 or '' for missing parameters
+        uncerts and flags are None if not `loadlog`
+    hidden parameters, like C0, Fn and Bn, have no column and are skipped
+    '''
+    if type(filename)==int:
+        filename=gfname(filename)
+
+    init_file, head, comps=_parse_template(filename)
+
+    npar=len(param_keys)
+    nan=float('nan')
+    i1, i2=param_index['1'], param_index['2']
+
+    rows=[]
+    for name, fields in comps:
+        vals=[nan]*npar
+        tofits=[-1]*npar
+        for key, fs in fields.items():
+            if key=='1' and name!='sky':
+                vals[i1], vals[i2]=float(fs[0]), float(fs[1])
+                tofits[i1], tofits[i2]=int(fs[2]), int(fs[3])
+                continue
+            if key not in param_index:
+                continue
+            j=param_index[key]
+            vals[j]=float(fs[0])
+            tofits[j]=int(fs[1])
+
+        Z=int(fields['Z'][0]) if 'Z' in fields else 0
+        rows.append([name, Z, vals, tofits, None, None])
+
+    logprops=None
+    if loadlog:
+        logprops=_feed_fitlog_rows(filename, init_file, rows)
+
+    return init_file, head, rows, logprops
+
+def _feed_fitlog_rows(filename, init_file, rows):
+    '''
+    feed uncertainties and flags from fit.log in rows
+    '''
+    fitlog=abs_join(abs_dirname(filename), 'fit.log')
+    logs=load_fitlogs(fitlog)
+
+    logname=os.path.basename(filename)
+    if init_file is None:
+        log=logs.get_log(logname)
+    else:
+        log=logs.get_log(init_file, logname)
+
+    npar=len(param_keys)
+    for row, lmod in zip(rows, log.mods):
+        uncerts=[float('nan')]*npar
+        flags=['']*npar
+        keys=Model.get_model(row[0]).sorted_keys
+        for k, u, f in zip(keys, lmod.uncerts, lmod.flags):
+            j=param_index[k]
+            uncerts[j]=u
+            flags[j]=f
+        row[4], row[5]=uncerts, flags
+
+    for row in rows[len(log.mods):]:
+        row[4], row[5]=[float('nan')]*npar, ['']*npar
+
+    return tuple(getattr(log, p) for p in log_props)
+
+def _rows_to_arrays(files, results, loadlog=False):
+    '''
+    collect rows of components to a dict of arrays
+
+    rows are aligned to `param_keys` when parsed,
+        so that each 2d array is converted at once
+    '''
+    rows=[row for r in results for row in r[2]]
+    nrow=len(rows)
+    npar=len(param_keys)
+    nums=[len(r[2]) for r in results]
+
+    def field(i, dtype, fill):
+        if nrow==0 or (i>=4 and not loadlog):
+            return np.full((nrow, npar), fill, dtype=dtype)
+        return np.array([row[i] for row in rows], dtype=dtype)
+
+    table={
+        'file': np.repeat(np.array(files, dtype=str), nums),
+        'init_file': np.repeat(np.array([r[0] or '' for r in results],
+                                        dtype=str), nums),
+        'id': np.arange(1, nrow+1)-np.repeat(np.cumsum(nums)-nums, nums),
+        'name': np.array([row[0] for row in rows], dtype=str),
+        'Z': np.array([row[1] for row in rows], dtype=int),
+        'val': field(2, float, np.nan),
+        'tofit': field(3, int, -1),
+        'uncert': field(4, float, np.nan),
+        'flag': field(5, 'U12', ''),
+    }
+
+    # head: one value per template, repeated for its components
+    for k in Head.sorted_keys:
+        dtype=type(Head.default_values[k])
+        if dtype==list:
+            dtype=type(Head.default_values[k][0])
+        v=np.array([_head_value(k, r[1].get(k)) for r in results], dtype=dtype)
+        table[k]=np.repeat(v, nums, axis=0)
+
+    if loadlog:
+        for j, p in enumerate(log_props):
+            v=np.array([r[3][j] for r in results])
+            table[p]=np.repeat(v, nums)
+
+    return table
+
+def _head_value(key, fields):
+    '''
+    typed value of head parameter from fields in a line
+    '''
+    default=Head.default_values[key]
+    if fields is None:
+        return default
+
+    if type(default)==list:
+        typef=type(default[0])
+        return [typef(s) for s in fields[:len(default)]]
+
+    return type(default)(fields[0])
+
+# user function
+def load_many(paths, workers=None, loadlog=False):
+    '''
+    load many templates into a columnar table
+
+    Parameters
+    ----------
+    paths: iterable of str or int
+        template files
+
+    workers: int or None
+        number of processes to parse templates
+        if None, use number of CPUs; if 1, parse in current process
+
+    loadlog: bool
+        whether to load uncertainties, flags and chisq from fit.log
+
+    Returns
+    -------
+    dict of arrays, with one row per component:
+        file, init_file, id, name, Z: 1d arrays
+        val, tofit, uncert, flag: 2d arrays,
+            with columns ordered as `param_keys`
+            missing parameters are nan, -1 or ''
+        A-P: head parameters, 2d for H, I and K
+        chisq, ndof, reduce_chisq: only if `loadlog`
+    '''
+    files=[gfname(p) if type(p)==int else p for p in paths]
+
+    if workers is None:
+        workers=os.cpu_count() or 1
+
+    if workers==1 or len(files)<=1:
+        results=[_template_rows(f, loadlog) for f in files]
+    else:
+        chunksize=max(1, len(files)//(workers*4))
+        func=_template_rows if not loadlog else _template_rows_log
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results=list(executor.map(func, files, chunksize=chunksize))
+
+    return _rows_to_arrays(files, results, loadlog)
+
+def _template_rows_log(filename):
+    return _template_rows(filename, loadlog=True)
+
+# build templates from arrays
+def build_many(comps, head=None, heads=None, gfpath=None):
+    '''
+    build many templates from arrays, e.g. columns of a catalog
+
+    Parameters
+    ----------
+    comps: list of tuple (model, vals[, tofits[, Z]])
+        components in each template, in order
+        model: name or class of model
+        vals, tofits, Z: arrays for all templates,
+            see `Model.from_arrays`
+
+    head: dict or None
+        head parameters shared by all templates, like {'zerop': 25}
+
+    heads: dict or None
+        head parameters per template, each value a sequence,
+            like {'input': ['a.fits', 'b.fits', ...]}
+
+    gfpath: str or None
+        directory of templates, to which paths in head are relative
+        if None, use current directory
+
+    Returns
+    -------
+    list of GalFit
+    '''
+    from .galfit import GalFit
+
+    # number of templates
+    nums=set()
+    for comp in comps:
+        vals=comp[1]
+        if type(vals)!=dict:
+            nums.add(len(vals))
+        else:
+            nums.update([np.size(v) for v in vals.values() if np.ndim(v)>0])
+    if heads:
+        nums.update([len(v) for v in heads.values()])
+    if len(nums)!=1:
+        raise Exception('mismatched number of templates: %s' % sorted(nums))
+    num=nums.pop()
+
+    # components
+    mods=[]
+    for comp in comps:
+        mod, *arrs=comp
+        if type(mod)==str:
+            mod=Model.get_model(mod)
+        mods.append(mod.from_arrays(*arrs, num=num))
+
+    # head shared
+    head0=Head()
+    if head:
+        for k, v in head.items():
+            head0._set_param(k, v)
+
+    if heads:
+        hkeys=list(heads.keys())
+        hvals=list(zip(*heads.values()))
+    else:
+        hkeys=[]
+        hvals=[()]*num
+
+    if gfpath is None:
+        gfpath=os.getcwd()
+
+    gfs=[]
+    with no_gc():
+        for i, hvs in enumerate(hvals):
+            gf=GalFit()
+            gf.gfpath=gfpath
+
+            hd=head0.copy()
+            for k, v in zip(hkeys, hvs):
+                hd._set_param(k, v)
+            gf.head=hd
+
+            gf.comps.extend([ms[i] for ms in mods])
+            gfs.append(gf)
+
+    return gfs
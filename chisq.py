@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+'''
+chi-square of templates against input image, without running galfit
+
+    chi^2 = sum over unmasked pixels in region H of ((data-model)/sigma)^2
+    ndof = number of pixels - number of free parameters
+
+    as galfit, components with Z=1 are skipped,
+        neither in model nor in vector of parameters
+
+    pixels, mask and PSF are loaded once,
+        and reused for a batch of parameter vectors of a template
+'''
+
+import numpy as np
+
+from .fitscache import get_data_region
+from .convolve import ConvolvedRenderer
+from .sigma import sigma_region
+
+# load images in region
+def load_region(gf, fname, dtype=float):
+    '''
+    data of a fits file in region H, reading only needed part
+    '''
+    hdu=gf.get_fits_hdu(gf.get_abs_fname(fname))
+    return get_data_region(hdu, gf.head.get_pval('region'), dtype=dtype)
+
+def load_mask(gf):
+    '''
+    mask in region H, True for bad pixels
+
+    head parameter F could be a fits image, where non-zero pixels are bad,
+        or a text file with coordinates x, y of bad pixels per line
+    '''
+    shape=gf.get_region_shape()
+
+    fname=gf.head.get_pval('mask')
+    if fname=='none':
+        return np.zeros(shape, dtype=bool)
+
+    if fname.split('[')[0].lower().endswith(('.fits', '.fit', '.fits.gz')):
+        return load_region(gf, fname)!=0
+
+    xmin, xmax, ymin, ymax=gf.head.get_pval('region')
+    mask=np.zeros(shape, dtype=bool)
+    xy=np.loadtxt(gf.get_abs_fname(fname), ndmin=2, usecols=(0, 1))
+    x, y=xy[:, 0].astype(int), xy[:, 1].astype(int)
+    inreg=(x>=xmin)&(x<=xmax)&(y>=ymin)&(y<=ymax)
+    mask[y[inreg]-ymin, x[inreg]-xmin]=True
+    return mask
+
+# parameter vectors
+def fit_comps(gf):
+    '''
+    components in model, i.e. not skipped by Z=1
+    '''
+    return [mod for mod in gf.comps if not mod.Z.get()]
+
+def get_vector(gf):
+    '''
+    values of parameters of components in model in a vector,
+        ordered as components and then `sorted_keys` of models
+    '''
+    return np.concatenate([np.asarray(mod.vals, dtype=float)
+                                for mod in fit_comps(gf)])
+
+def split_vector(gf, vecs):
+    '''
+    split vectors of parameters to list of (name, vals) for components
+        vectors could be batched, with shape (..., nparams)
+    '''
+    vecs=np.asarray(vecs, dtype=float)
+
+    comps=[]
+    i=0
+    for mod in fit_comps(gf):
+        n=len(mod.sorted_keys)
+        comps.append((mod.name, vecs[..., i:i+n]))
+        i+=n
+
+    if i!=vecs.shape[-1]:
+        raise Exception('mismatch of number of parameters: %i, %i'
+                            % (i, vecs.shape[-1]))
+    return comps
+
+class ChiSquare:
+    '''
+    evaluator of chi-square for a template
+
+    Parameters
+    ----------
+    gf: GalFit
+        load it with `loadcons=True`,
+            so that hard constraints are counted in `ndof`
+
+    chunk: int
+        max number of vectors rendered together, to limit memory
+
+    kwargs: optional arguments for `convolve.ConvolvedRenderer`
+    '''
+    def __init__(self, gf, chunk=64, **kwargs):
+        self.gf=gf
+        self.chunk=chunk
+
+        self.data=gf.get_input_data_region(dtype=float)
+
+        # sigma generated from input if not given, see `sigma.make_sigma`
+        fsigma=gf.head.get_pval('sigma')
+        if fsigma=='none':
+            sigma=sigma_region(gf)
+        else:
+            sigma=load_region(gf, fsigma)
+
+        # weights, zero for bad pixels
+        bad=load_mask(gf)|~np.isfinite(self.data)|~(sigma>0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.weight=np.where(bad, 0, 1/sigma**2)
+        self.data=np.where(bad, 0, self.data)
+
+        self.npix=int(np.count_nonzero(~bad))
+        self.nfree=sum([mod.get_num_of_free_params()
+                            for mod in fit_comps(gf)])-\
+                   gf.get_num_of_hard_free_params()
+        self.ndof=self.npix-self.nfree
+
+        self.renderer=ConvolvedRenderer(gf, **kwargs)
+
+    def chisq_comps(self, comps):
+        '''
+        chi-square for list of (name, vals), which could be batched
+        '''
+        model=self.renderer(comps)
+        res=self.data-model
+        res*=res
+        res*=self.weight
+        return res.sum(axis=(-2, -1))
+
+    def __call__(self, vecs=None):
+        '''
+        chi-square for vectors of parameters
+
+        Parameters
+        ----------
+        vecs: array-like or None
+            vectors with shape (..., nparams), see `get_vector`
+            if None, use current parameters of template
+
+        Returns
+        -------
+        chi-square with shape (...,)
+        '''
+        if vecs is None:
+            vecs=get_vector(self.gf)
+        vecs=np.asarray(vecs, dtype=float)
+
+        bshape=vecs.shape[:-1]
+        vecs=vecs.reshape(-1, vecs.shape[-1])
+
+        chisq=np.empty(len(vecs))
+        for i in range(0, len(vecs), self.chunk):
+            comps=split_vector(self.gf, vecs[i:i+self.chunk])
+            chisq[i:i+self.chunk]=self.chisq_comps(comps)
+        return chisq.reshape(bshape)
+
+    def reduce_chisq(self, vecs=None):
+        '''
+        chi-square per degree of freedom
+        '''
+        return self(vecs)/self.ndof
+
+# user function
+def eval_chisq(gf, vecs=None, **kwargs):
+    '''
+    chi-square, ndof and reduced chi-square for a template
+
+    Parameters
+    ----------
+    vecs: array-like or None
+        batch of parameter vectors, see `ChiSquare.__call__`
+
+    kwargs: optional arguments for `ChiSquare`
+    '''
+    ev=ChiSquare(gf, **kwargs)
+    chisq=ev(vecs)
+    return chisq, ev.ndof, chisq/ev.ndof
@@ -5,9 +5,51 @@ collection of containers
     which is super class of Head, Model and Parameter
 '''
 
-from .containers import Container
+from .containers import Container, Vector
+
+class ParamValue:
+    '''
+    descriptor of value of a parameter, like `head.region`, `mod.re`
+        created for each key and alias when class is defined,
+        which avoids dispatch in `__getattr__`
+
+    setting still goes through `__setattr__` of collection
+    '''
+    __slots__=('key',)
+
+    def __init__(self, key):
+        self.key=key
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        params=obj.params
+        if self.key in params:
+            return params[self.key].get()
+        return obj._peek_param(self.key).get()
+
+def install_descrs(cls, names, descr):
+    '''
+    install descriptors in class for names,
+        skipping those defined in class or bases in other ways
+
+    names: dict
+        name of attribute to argument of `descr`
+    '''
+    for name, arg in names.items():
+        if not name.isidentifier():
+            continue
+
+        defined=False
+        for c in cls.__mro__:
+            if name in c.__dict__:
+                defined=not isinstance(c.__dict__[name], descr)
+                break
+        if not defined:
+            setattr(cls, name, descr(arg))
 
 class Collection:
+    __slots__=('params', 'fmt')
 
     # some class properties
     sorted_keys=''
@@ -25,39 +67,88 @@ class Collection:
 
     comments={}
 
-    valid_props={'params'}
+    valid_props={'params', 'fmt'}
 
-    def __init__(self, container=Container, fmt=None):
-        default_values=self.default_values
-        if type(default_values)!=dict:
-            default_values=dict(zip(self.sorted_keys, self.default_values))
+    container=staticmethod(Container)   # type of item in collection
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        names={k: k for k in cls.valid_keys}
+        names.update(cls.alias_keys)
+        install_descrs(cls, names, ParamValue)
+
+    def __init__(self, fmt=None):
         if fmt==None:
             fmt=self.fmt_value
+        self.fmt=fmt
 
         # collect containers in a dict
+        #     which are created lazily when first needed
         self.params={}
-        for k in self.valid_keys:
-            self.params[k]=container(default_values[k],
-                                     *self.valid_values.get(k, []),
-                                     fmt=fmt)
+
+    @classmethod
+    def _get_defaults(cls):
+        '''
+        dict of default values, cached in class
+        '''
+        if '_defaults' not in cls.__dict__:
+            default_values=cls.default_values
+            if type(default_values)!=dict:
+                default_values=dict(zip(cls.sorted_keys, default_values))
+            cls._defaults=default_values
+        return cls._defaults
+
+    def _new_param(self, key):
+        '''
+        new container with default value
+        '''
+        return self.container(self._get_defaults()[key],
+                              *self.valid_values.get(key, []),
+                              fmt=self.fmt)
 
     # copy
     def copy(self):
         newobj=self.__class__()
+        newobj.fmt=self.fmt
         for k, p in self.params.items():
             newobj.params[k]=p.copy()
         return newobj
 
     # handle parameter
-    def _get_param(self, key):
+    def _get_key(self, key):
         if key in self.alias_keys:
             key=self.alias_keys[key]
 
         if key not in self.valid_keys:
             raise AttributeError(key)
 
-        return self.params[key]
+        return key
+
+    def _get_param(self, key):
+        key=self._get_key(key)
+
+        params=self.params
+        if key not in params:
+            params[key]=self._new_param(key)
+        return params[key]
+
+    def _peek_param(self, key):
+        '''
+        container only for read
+            default one is not stored in collection,
+            except vector, whose value could be changed in place,
+                like `head.region[0]=1`
+        '''
+        key=self._get_key(key)
+
+        params=self.params
+        if key not in params:
+            p=self._new_param(key)
+            if isinstance(p, Vector):
+                params[key]=p
+            return p
+        return params[key]
 
     def _set_param(self, key, val):
         '''
@@ -86,7 +177,7 @@ class Collection:
             
         lines=[]
         for k in keys:
-            v=specials[k] if k in specials else self._get_param(k)
+            v=specials[k] if k in specials else self._peek_param(k)
             c=self._get_comments(k)
 
             lines.append('%*s) %-*s # %s' % (klen, k, vlen, v, c))
@@ -100,7 +191,7 @@ class Collection:
         '''
         get parameter's val
         '''
-        return self._get_param(*args, **kwargs).get()
+        return self._peek_param(*args, **kwargs).get()
 
     # def set_param(self, *args, **kwargs):
     #     return self._set_param(*args, **kwargs)
@@ -118,7 +209,10 @@ class Collection:
         return False
 
     def __getattr__(self, prop):
-        return self._get_param(prop).get()
+        if prop in self.valid_props:
+            # local property not set yet
+            raise AttributeError(prop)
+        return self._peek_param(prop).get()
 
     def __setattr__(self, prop, val):
         if prop in self.valid_props:
@@ -83,6 +83,7 @@ class Constraint:
         'y': '2',  # 'y0'
         'rs': '4', # 're'/'rs'
         're': '4', # 're'/'rs'
+        'q': '9',  # 'ba'
     }
 
     def __init__(self, comps, *args, **kwargs):
@@ -97,6 +98,7 @@ class Constraint:
                                     % len(args))
 
         cpids, self.param=args[:2]
+        self.param_mod=self.get_name_of_param_in_mod(self.param)
 
         # parse component string
         sep=''
@@ -152,7 +154,9 @@ class Constraint:
         self.comps=[comps[i-1] for i in comp_ids]
 
         # parse constraint type, including its range
-        self.cons_type, self.crange=self._parse_type(type_cons, sep)
+        self.cons_type, crange=self._parse_type(type_cons, sep)
+        if self.is_soft():
+            self.range=crange
 
     def _parse_comp(self, comps):
         comps=comps.strip()
@@ -18,6 +18,11 @@ class Scalar:
     '''
     support int 
     '''
+    __slots__=('val', 'typef', 'strf')
+
+    # formatters shared by all containers, cached by format
+    strfs={}
+
     def __init__(self, val, fmt=None):
         self.val=val
 
@@ -25,16 +30,27 @@ class Scalar:
 
         self.strf=str   # used to convert val to string
         if fmt!=None and self.typef==float:
-            if type(fmt)==int:
-                fmt='%.{}f'.format(fmt)
-
-            if type(fmt)==str:
-                fmt=lambda s, fmt=fmt: fmt % s
-
-            if not callable(fmt):
+            self.strf=self.get_strf(fmt)
+
+    @staticmethod
+    def get_strf(fmt):
+        '''
+        function to convert val to string, shared for same format
+        '''
+        if callable(fmt):
+            return fmt
+
+        strfs=Scalar.strfs
+        if fmt not in strfs:
+            sfmt=fmt
+            if type(sfmt)==int:
+                sfmt='%.{}f'.format(sfmt)
+
+            if type(sfmt)!=str:
                 raise Exception('unsupported format')
 
-            self.strf=fmt
+            strfs[fmt]=sfmt.__mod__
+        return strfs[fmt]
 
     # copy
     def copy(self):
@@ -64,16 +80,19 @@ class Enum(Scalar):
     '''
     like enum in scalar with infinite valid value
     '''
+    __slots__=('valid', 'alias')
+
     def __init__(self, val, valid={}, alias={}, fmt=None):
         super().__init__(val, fmt)
 
+        # valid values and alias are not changed, and shared by copies
         self.valid=valid
         self.alias=alias
 
     def copy(self):
         newobj=super().copy()
-        newobj.valid=self.valid.copy()
-        newobj.alias=self.alias.copy()
+        newobj.valid=self.valid
+        newobj.alias=self.alias
         return newobj
 
     def set(self, val):
@@ -86,6 +105,8 @@ class Enum(Scalar):
         self.val=val
 
 class Vector(Scalar):
+    __slots__=('vlen',)
+
     def __init__(self, val, fmt=None):
         val=list(val)
         super().__init__(val[0], fmt)
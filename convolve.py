@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+'''
+PSF convolution of model images by real FFT
+
+    it follows head parameters of galfit:
+        D: PSF image
+        E: fine sampling factor of PSF relative to data
+        I: size of convolution box
+
+    FFT of PSF is cached, keyed by (PSF file, mtime, padded shape),
+        since many stamps share a few PSFs
+'''
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .render import Frame, galfit_comps, render_comps
+from .fitscache import split_hduid
+
+# FFT backend
+try:
+    import scipy.fft as _fft
+    _fft_kwargs={'workers': -1}
+except ImportError:
+    _fft=np.fft
+    _fft_kwargs={}
+
+def rfft2(a, s):
+    return _fft.rfft2(a, s=s, **_fft_kwargs)
+
+def irfft2(a, s):
+    return _fft.irfft2(a, s=s, **_fft_kwargs)
+
+# lengths fast for FFT
+def next_fast_len(n):
+    '''
+    smallest 2^a 3^b 5^c not less than n
+    '''
+    if _fft is not np.fft:
+        return _fft.next_fast_len(n, real=True)
+
+    best=2*n
+    p5=1
+    while p5<best:
+        p35=p5
+        while p35<best:
+            p=p35
+            while p<n:
+                p*=2
+            best=min(best, p)
+            p35*=3
+        p5*=5
+    return best
+
+def fft_shape(shape, psfshape):
+    '''
+    padded shape for linear convolution, with fast FFT lengths
+    '''
+    return tuple(next_fast_len(n+m-1) for n, m in zip(shape, psfshape))
+
+# cache of PSF FFT
+class PSFCache:
+    '''
+    LRU cache of FFT of normalized PSF
+
+    Parameters
+    ----------
+    maxsize: int
+        max number of cached transforms
+    '''
+    def __init__(self, maxsize=64):
+        self.maxsize=maxsize
+        self.items=OrderedDict()
+        self.lock=threading.Lock()
+
+    def get_fft(self, psf, shape, key=None):
+        '''
+        FFT of PSF in padded shape
+
+        Parameters
+        ----------
+        psf: 2d array
+            PSF image, normalized to sum 1 before FFT
+
+        key: hashable or None
+            identity of PSF, e.g. (file, mtime)
+            if None, FFT is not cached
+        '''
+        if key is None:
+            return rfft2(psf/psf.sum(), shape)
+
+        key=(key, tuple(shape))
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+
+        fpsf=rfft2(psf/psf.sum(), shape)
+        with self.lock:
+            self.items[key]=fpsf
+            while len(self.items)>self.maxsize:
+                self.items.popitem(last=False)
+        return fpsf
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+psf_cache=PSFCache()
+
+# convolution
+def convolve(imgs, psf, key=None, cache=None):
+    '''
+    convolve images with PSF, in same shape as input
+
+    Parameters
+    ----------
+    imgs: array with shape (..., ny, nx)
+        many images could be convolved at once
+
+    psf: 2d array
+        PSF, centered at pixel (ny//2, nx//2)
+
+    key: hashable or None
+        identity of PSF to cache its FFT, see `PSFCache.get_fft`
+
+    cache: PSFCache or None
+        if None, use cache in process
+    '''
+    if cache is None:
+        cache=psf_cache
+
+    imgs=np.asarray(imgs, dtype=float)
+    ny, nx=imgs.shape[-2:]
+    py, px=psf.shape
+
+    shape=fft_shape((ny, nx), (py, px))
+    fpsf=cache.get_fft(psf, shape, key)
+
+    conv=irfft2(rfft2(imgs, shape)*fpsf, shape)
+
+    cy, cx=py//2, px//2
+    return conv[..., cy:cy+ny, cx:cx+nx]
+
+def rebin(imgs, factor):
+    '''
+    average blocks of factor x factor pixels
+    '''
+    if factor==1:
+        return imgs
+    ny, nx=imgs.shape[-2:]
+    imgs=imgs.reshape(imgs.shape[:-2]+(ny//factor, factor, nx//factor, factor))
+    return imgs.mean(axis=(-3, -1))
+
+# models not convolved
+no_convolve={'sky'}
+
+class ConvolvedRenderer:
+    '''
+    render model images convolved with PSF, as setup of a GalFit
+
+        frames and PSF are prepared once,
+            and reused for rendering many batches of components
+
+    Parameters
+    ----------
+    gf: GalFit
+
+    exptime: float or None
+        exposure time, if None, take from input image
+
+    oversample, osr, tol:
+        see `render.render_comp`
+
+    Attention:
+        model is rendered in region H extended by half size of PSF,
+            limited by half of convolution box I if it is given,
+            to take light from out of region
+    '''
+    def __init__(self, gf, exptime=None, oversample=1, osr=3, tol=None):
+        self.kwargs=dict(oversample=oversample, osr=osr, tol=tol)
+
+        self.frame=Frame.from_galfit(gf, exptime=exptime)
+
+        self.psf=None
+        self.key=None
+        self.fine_frame=self.frame
+        if gf.head.get_pval('psf')!='none':
+            self._load_psf(gf, exptime)
+
+    def _load_psf(self, gf, exptime):
+        fname, hduid=split_hduid(gf.get_abs_hdp('psf'))
+        self.psf=np.asarray(gf.get_psf_data(), dtype=float)
+        self.key=(os.path.abspath(fname), hduid, os.stat(fname).st_mtime_ns)
+
+        sampling=int(gf.head.get_pval('psfFactor'))
+
+        # margin in data pixels
+        py, px=self.psf.shape
+        margin=[-(-(px//2)//sampling), -(-(py//2)//sampling)]
+        for i, c in enumerate(gf.head.get_pval('conv')):
+            if c>0:
+                margin[i]=min(margin[i], int(c)//2)
+        self.margin=margin
+
+        self.fine_frame=Frame.from_galfit(gf, exptime=exptime,
+                                sampling=sampling, margin=margin)
+
+    def __call__(self, comps):
+        '''
+        convolved image of components over region H
+
+        Parameters
+        ----------
+        comps: list of (name, vals)
+            vals could be batched, see `render.render_comps`
+        '''
+        conv=[c for c in comps if c[0] not in no_convolve]
+        rest=[c for c in comps if c[0] in no_convolve]
+
+        img=render_comps(rest, self.frame, **self.kwargs)
+        if not conv:
+            return img
+
+        cimg=render_comps(conv, self.fine_frame, **self.kwargs)
+        if self.psf is None:
+            return img+cimg
+
+        cimg=convolve(cimg, self.psf, key=self.key)
+
+        # crop margin and rebin to data pixels
+        sampling=self.fine_frame.sampling
+        mx, my=[m*sampling for m in self.margin]
+        ny, nx=cimg.shape[-2:]
+        cimg=cimg[..., my:ny-my, mx:nx-mx]
+
+        return img+rebin(cimg, sampling)
+
+# user function
+def render_convolved(gf, skip=True, **kwargs):
+    '''
+    model image of a GalFit over region H, convolved with PSF
+
+    Parameters
+    ----------
+    skip: bool
+        whether to skip components with Z=1, as output of galfit
+
+    kwargs: see `ConvolvedRenderer`
+    '''
+    return ConvolvedRenderer(gf, **kwargs)(galfit_comps(gf, skip=skip))
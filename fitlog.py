@@ -4,46 +4,136 @@
 cope with standard output file of galfit--fit.log
 '''
 
+import os
 import re
+import json
+import zlib
+import threading
+
+import numpy as np
 
 from .tools import gfname
 
+# flags of parameters in fit.log
+#     encoded as small integers when stored in arrays
+flag_names=('normal', 'unreliable', 'fixed', 'constrainted')
+flag_codes={f: i for i, f in enumerate(flag_names)}
+
+# item in log, like 1.00, [1.00], *1.00*, {1.00}
+item_ends='][()*,}{'
+item_re=re.compile(r'^([{0}]*)([^{0}]*)([{0}]*)$'.format(re.escape(item_ends)))
+item_marks={
+    '**': 'unreliable',
+    '[]': 'fixed',
+    '{}': 'constrainted',
+}
+
 # # convert template file number to its name
 # def gfname(num):
 #     return 'galfit.%02i' % num
 
+# FitLogs shared in process
+_fitlogs_cache={}
+_fitlogs_lock=threading.Lock()
+
+def load_fitlogs(filename='fit.log', index=True, save_index=False):
+    '''
+    FitLogs shared in process, keyed by absolute path
+        it is reloaded when mtime or size of file changes
+            or updated incrementally, if `index` is True
+
+    save_index: bool
+        whether to save the index in a sidecar file, see `FitLogIndex`
+    '''
+    filename=os.path.abspath(filename)
+    st=os.stat(filename)
+    stamp=(st.st_mtime_ns, st.st_size)
+
+    key=(filename, index, index and save_index)
+    with _fitlogs_lock:
+        if key in _fitlogs_cache:
+            stamp0, logs=_fitlogs_cache[key]
+            if stamp0==stamp:
+                return logs
+
+            # index is dropped by `FitLogs.parse_all`, then reload
+            if logs.index is not None:
+                logs.index.update()
+                _fitlogs_cache[key]=(stamp, logs)
+                return logs
+
+        logs=FitLogs(filename, index=index, save_index=save_index)
+        _fitlogs_cache[key]=(stamp, logs)
+    return logs
+
+def clear_fitlogs_cache():
+    with _fitlogs_lock:
+        _fitlogs_cache.clear()
+
 class FitLogs:
-    def __init__(self, filename='fit.log'):
+    '''
+    collection of logs in fit.log
+
+    if `index` is True, logs are not loaded in whole,
+        but found through an index of offsets, see `FitLogIndex`
+        which is saved in a sidecar file only if `save_index` is True
+    '''
+    def __init__(self, filename='fit.log', index=False, save_index=False):
+        self.filename=filename
         self.logs=[]
+        self.index=None
 
-        self._load_file(filename)
+        if index:
+            self.index=FitLogIndex(filename, save=save_index)
+        else:
+            self._load_file(filename)
 
     def _load_file(self, filename):
         with open(filename) as f:
-            log=FitLog()
-            for line in f:
-                line=line.rstrip()
-                if not line or line=='-'*77:
-                    continue
-                
-                key, *fields=line.split(':', maxsplit=1)
-                if len(key)==16:
-                    key='_'.join([s.lower() for s in key.split()])
-                    key=key.replace('.', '')
-                    val=fields[0].strip()
-
-                    if key=='input_image':
-                        log=FitLog(val)
-                        self.logs.append(log)
-                    else:
-                        log[key]=val
-                elif line.startswith(' Chi^2'):
-                    for eqstr in line.split(','):
-                        log._set_chi_fromlog(eqstr)
+            self.logs.extend(self._parse_text(f))
+
+    @staticmethod
+    def _parse_text(lines):
+        '''
+        parse lines of fit.log to list of FitLog
+        '''
+        logs=[]
+        log=FitLog()
+        for line in lines:
+            line=line.rstrip()
+            if not line or line=='-'*77:
+                continue
+            
+            key, *fields=line.split(':', maxsplit=1)
+            if len(key)==16:
+                key='_'.join([s.lower() for s in key.split()])
+                key=key.replace('.', '')
+                val=fields[0].strip()
+
+                if key=='input_image':
+                    log=FitLog(val)
+                    logs.append(log)
                 else:
-                    log.append_lines(line)
+                    log[key]=val
+            elif line.startswith(' Chi^2'):
+                for eqstr in line.split(','):
+                    log._set_chi_fromlog(eqstr)
+            else:
+                log.append_lines(line)
+        return logs
+
+    def to_arrays(self):
+        '''
+        all logs in file as arrays, see `LogArrays`
+        '''
+        with open(self.filename) as f:
+            return LogArrays(_scan_arrays(f))
 
     def parse_all(self):
+        if self.index is not None:
+            self.logs=self.index.read_all()
+            self.index=None
+
         for log in self.logs:
             log._parse_lines()
 
@@ -56,6 +146,27 @@ class FitLogs:
             log._parse_lines()
         return log
 
+    def _find_log(self, init=None, result=None, ind=-1):
+        '''
+        find log by init and result file
+            None for any file
+        '''
+        if type(init)==int:
+            init=gfname(init)
+        if type(result)==int:
+            result=gfname(result)
+
+        if self.index is not None:
+            inds=self.index.find(init, result)
+            if not inds:
+                raise Exception('no log found')
+            return self._get_log([self.index.read_log(inds[ind])], 0)
+
+        logs=[l for l in self.logs
+                    if (init is None or l.init_file==init) and
+                       (result is None or l.result_file==result)]
+        return self._get_log(logs, ind)
+
     def get_log(self, *args, ind=-1):
         if not args:
             return self.get_log_index(ind)
@@ -73,34 +184,337 @@ class FitLogs:
                         'but were given %i' % len(args))
 
     def get_log_index(self, ind):
+        if self.index is not None:
+            return self._get_log([self.index.read_log(ind)], 0)
         return self._get_log(self.logs, ind)
 
     def get_log_init(self, init, ind=-1):
-        if type(init)==int:
-            init=gfname(init)
-        logs=[l for l in self.logs if l.init_file==init]
-        return self._get_log(logs, ind)
+        return self._find_log(init=init, ind=ind)
 
     def get_log_result(self, result, ind=-1):
-        if type(result)==int:
-            result=gfname(result)
-        logs=[l for l in self.logs if l.result_file==result]
-        return self._get_log(logs, ind)
+        return self._find_log(result=result, ind=ind)
 
     def get_log_init_result(self, init, result, ind=-1):
-        if type(init)==int:
-            init=gfname(init)
-        if type(result)==int:
-            result=gfname(result)
+        return self._find_log(init, result, ind)
 
-        logs=[l for l in self.logs
-                    if l.init_file==init and l.result_file==result]
-        return self._get_log(logs, ind)
+class FitLogIndex:
+    '''
+    sidecar index of fit.log
+
+    it maps init and result file to byte offset of each log,
+        and could be stored in a hidden file beside fit.log,
+            like '.fit.log.idx', if `save` is True
+        an existing sidecar file is always used if valid
+
+    fit.log is identified by stamp (mtime_ns, size),
+        and signature of indexed bytes, CRC of bytes at beginning and end
+    when fit.log grows, only the appended bytes are parsed,
+        from offset of the last log, which might be incomplete before
+    otherwise, like same size with new mtime or changed signature,
+        fit.log is taken as rewritten and index is rebuilt
+    '''
+    nsig=4096   # number of bytes at beginning and end as signature
+
+    def __init__(self, filename='fit.log', idxname=None, save=False):
+        self.filename=os.path.abspath(filename)
+        if idxname is None:
+            dirname, basename=os.path.split(self.filename)
+            idxname=os.path.join(dirname, '.%s.idx' % basename)
+        self.idxname=idxname
+        self.autosave=save
+
+        self.stamp=None
+        self.size=0
+        self.sig=None
+        self.entries=[]   # list of [offset, init_file, result_file]
+
+        self._load_index()
+        self._build_maps()
+        self.update()
+
+    def _load_index(self):
+        if not os.path.isfile(self.idxname):
+            return
+
+        try:
+            with open(self.idxname) as f:
+                idx=json.load(f)
+            self.stamp=idx['stamp']
+            self.size=idx['size']
+            self.sig=idx['sig']
+            self.entries=idx['entries']
+        except (OSError, ValueError, KeyError):
+            self.stamp=None
+            self.size=0
+            self.sig=None
+            self.entries=[]
+
+    def _get_sig(self, f, size):
+        '''
+        CRC of bytes at beginning and end of first `size` bytes
+        '''
+        n=min(size, self.nsig)
+        f.seek(0)
+        head=zlib.crc32(f.read(n))
+        f.seek(size-n)
+        return [head, zlib.crc32(f.read(n))]
+
+    def update(self):
+        '''
+        update index with bytes appended since last update
+            it is saved if `autosave` is True
+
+        return True if index changes
+        '''
+        st=os.stat(self.filename)
+        stamp=[st.st_mtime_ns, st.st_size]
+        if stamp==self.stamp:
+            return False
+
+        size=st.st_size
+        with open(self.filename, 'rb') as f:
+            if size<=self.size or \
+               self._get_sig(f, self.size)!=self.sig:
+                # fit.log is rewritten
+                self.entries=[]
+
+            start=0
+            if self.entries:
+                start=self.entries.pop()[0]
+            self._scan(f, start)
+
+            self.stamp=stamp
+            self.size=size
+            self.sig=self._get_sig(f, size)
+
+        self._build_maps()
+        if self.autosave:
+            self.save()
+        return True
+
+    def _scan(self, f, start):
+        keys={b'Init. par. file ': 1, b'Restart file    ': 2}
+
+        f.seek(start)
+        offset=start
+        for line in f:
+            key=line[:16]
+            if key==b'Input image     ':
+                self.entries.append([offset, '', ''])
+            elif key in keys and self.entries:
+                val=line.split(b':', maxsplit=1)[1].strip()
+                self.entries[-1][keys[key]]=val.decode()
+            offset+=len(line)
+
+    def _build_maps(self):
+        self.maps={}
+        for i, (_, init, result) in enumerate(self.entries):
+            for key in [(init, result), (init, None), (None, result)]:
+                self.maps.setdefault(key, []).append(i)
+
+    def save(self):
+        idx={'stamp': self.stamp, 'size': self.size, 'sig': self.sig,
+             'entries': self.entries}
+        try:
+            with open(self.idxname, 'w') as f:
+                json.dump(idx, f)
+        except OSError:
+            pass  # e.g. directory not writable
+
+    # user methods
+    def find(self, init=None, result=None):
+        '''
+        indices of logs with given init and result file
+        '''
+        if init is None and result is None:
+            return list(range(len(self.entries)))
+        return self.maps.get((init, result), [])
+
+    def read_log(self, ind):
+        '''
+        read and parse one log by seek
+        '''
+        entries=self.entries
+        start=entries[ind][0]
+        if ind==-1 or ind==len(entries)-1:
+            end=self.size
+        else:
+            end=entries[ind+1][0]
+
+        with open(self.filename, 'rb') as f:
+            f.seek(start)
+            text=f.read(end-start).decode()
+        return FitLogs._parse_text(text.splitlines())[0]
+
+    def read_all(self):
+        with open(self.filename) as f:
+            return FitLogs._parse_text(f)
+
+    def __len__(self):
+        return len(self.entries)
+
+# columnar logs
+def _scan_arrays(lines):
+    '''
+    single-pass parser of fit.log to dict of arrays
+    '''
+    keys_run=('input_image', 'output_image', 'init_file', 'result_file')
+    keys_chi={'Chi^2': 'chisq', 'ndof': 'ndof', 'Chi^2/nu': 'reduce_chisq'}
+
+    runs={k: [] for k in keys_run+tuple(keys_chi.values())}
+    comps={'run': [], 'comp': [], 'name': [],
+           'val': [], 'uncert': [], 'flag': []}
+
+    irun=-1
+    valline=None   # line of values, waiting for line of uncertainties
+    for line in lines:
+        line=line.rstrip()
+        if not line or line=='-'*77:
+            continue
+
+        key, *fields=line.split(':', maxsplit=1)
+        if len(key)==16:
+            key='_'.join([s.lower() for s in key.split()])
+            key=key.replace('.', '')
+            key=FitLog.alias_keys.get(key, key)
+            if key=='input_image':
+                irun+=1
+                for k in runs:
+                    runs[k].append('' if k in keys_run else np.nan)
+                icomp=0
+                valline=None
+            if key in keys_run:
+                runs[key][irun]=fields[0].strip()
+        elif irun<0:
+            continue
+        elif line.startswith(' Chi^2'):
+            for eqstr in line.split(','):
+                k, v=[i.strip() for i in eqstr.split('=')]
+                runs[keys_chi[k]][irun]=float(v)
+        elif valline is None:
+            valline=line
+        else:
+            lmod=LogMod(valline, line)
+            icomp+=1
+            comps['run'].append(irun)
+            comps['comp'].append(icomp)
+            comps['name'].append(lmod.name)
+            comps['val'].append(lmod.vals)
+            comps['uncert'].append(lmod.uncerts)
+            comps['flag'].append([flag_codes[f] for f in lmod.flags])
+            valline=None
+
+    arrs={}
+    for k in keys_run:
+        arrs[k]=np.array(runs[k], dtype=str)
+    for k in keys_chi.values():
+        arrs[k]=np.array(runs[k], dtype=float)
+
+    for k in ['run', 'comp']:
+        arrs[k]=np.array(comps[k], dtype=int)
+    arrs['name']=np.array(comps['name'], dtype=str)
+
+    # pad parameters of components to same length
+    npar=max([len(v) for v in comps['val']], default=0)
+    arrs['npar']=np.array([len(v) for v in comps['val']], dtype=int)
+    for k, fill, dtype in [('val', np.nan, float),
+                           ('uncert', np.nan, float),
+                           ('flag', -1, np.int8)]:
+        arr=np.full((len(comps[k]), npar), fill, dtype=dtype)
+        for i, v in enumerate(comps[k]):
+            arr[i, :len(v)]=v
+        arrs[k]=arr
+
+    return arrs
+
+class LogArrays:
+    '''
+    all logs in fit.log as arrays
+
+    Properties
+    ----------
+    for runs of galfit:
+        input_image, output_image, init_file, result_file: str
+        chisq, ndof, reduce_chisq: float, nan if missing
+
+    for components in all runs:
+        run: index of run
+        comp: component number in run, starting from 1
+        name: model name
+        npar: number of parameters
+        val, uncert: 2d float, padded with nan
+        flag: 2d int8, codes of `flag_names`, padded with -1
+    '''
+    keys_run=('input_image', 'output_image', 'init_file', 'result_file',
+              'chisq', 'ndof', 'reduce_chisq')
+    keys_comp=('run', 'comp', 'name', 'npar', 'val', 'uncert', 'flag')
+
+    def __init__(self, arrs):
+        self.arrs=arrs
+
+    # number
+    def get_num_of_runs(self):
+        return len(self.arrs['chisq'])
+
+    def get_num_of_comps(self):
+        return len(self.arrs['run'])
+
+    # vectorized filters, return boolean mask of runs
+    def any_flag(self, flag='unreliable'):
+        '''
+        runs with any parameter having the flag
+        '''
+        code=flag_codes[flag]
+        comp_has=(self.arrs['flag']==code).any(axis=1)
+        nums=np.bincount(self.arrs['run'], weights=comp_has,
+                         minlength=self.get_num_of_runs())
+        return nums>0
+
+    def any_unreliable(self):
+        return self.any_flag('unreliable')
+
+    def reduce_chisq_above(self, x):
+        return self.arrs['reduce_chisq']>x
+
+    def reduce_chisq_below(self, x):
+        return self.arrs['reduce_chisq']<x
+
+    # select runs
+    def select(self, mask):
+        '''
+        new LogArrays with runs in mask, boolean or indices
+        '''
+        inds=np.arange(self.get_num_of_runs())[mask]
+
+        arrs={k: self.arrs[k][inds] for k in self.keys_run}
+
+        # map index of old runs to new
+        newind=np.full(self.get_num_of_runs(), -1)
+        newind[inds]=np.arange(len(inds))
+
+        cmask=newind[self.arrs['run']]>=0
+        for k in self.keys_comp:
+            arrs[k]=self.arrs[k][cmask]
+        arrs['run']=newind[arrs['run']]
+
+        return LogArrays(arrs)
+
+    def __getitem__(self, prop):
+        return self.arrs[prop]
+
+    def __len__(self):
+        return self.get_num_of_runs()
 
 class FitLog:
     '''
     container for log of one galfit
     '''
+    # name of keys in fit.log
+    alias_keys={
+        'init_par_file': 'init_file',
+        'restart_file': 'result_file',
+    }
+
     def __init__(self, input_image='', output_image='',
                        init_file='', result_file=''):
         self.input_image=input_image
@@ -132,10 +546,7 @@ class FitLog:
             self.mods.append(LogMod(vals, uncerts))
 
     def __setitem__(self, prop, val):
-        if prop=='init_par_file':
-            prop='init_file'
-        elif prop=='restart_file':
-            prop='result_file'
+        prop=self.alias_keys.get(prop, prop)
         setattr(self, prop, val)
 
 class LogMod:
@@ -178,9 +589,7 @@ class LogMod:
             self.uncerts.append(val)
 
     def _parse_item(self, val):
-        ends='][()*,}{'
-        pattern=r'^([{0}]*)([^{0}]*)([{0}]*)$'.format(ends)
-        m=re.match(pattern, val)
+        m=item_re.match(val)
         if not m:
             return None, None
 
@@ -193,12 +602,6 @@ class LogMod:
         flag='normal'
         head, tail=groups[0], groups[2]
         if head and tail:
-            mark=head[-1]+tail[0]
-            if mark=='**':
-                flag='unreliable'
-            elif mark=='[]':
-                flag='fixed'
-            elif mark=='{}':
-                flag='constrainted'
+            flag=item_marks.get(head[-1]+tail[0], flag)
 
         return val, flag
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+'''
+process-wide cache of fits HDU and WCS shared by all GalFit instances
+
+    files are opened with memory-mapping,
+        and kept in a LRU cache limited by estimated bytes
+    evicted files are not closed explicitly,
+        but by garbage collection after all references to them are dropped,
+        so HDUs and data held by callers remain valid
+
+    Attention:
+        HDUs and WCS are shared, so do not modify them in place
+        data given by `get_data` is read-only, copy it to modify
+'''
+
+import os
+import threading
+from collections import OrderedDict
+
+# parse name of fits file with HDU index, like 'a.fits[1]'
+def split_hduid(fitsname):
+    if fitsname[-1]==']':
+        fitsname, hduid=fitsname[:-1].split('[')
+        hduid=int(hduid)
+    else:
+        hduid=0
+    return fitsname, hduid
+
+class HDUCache:
+    '''
+    LRU cache of HDUs, keyed by (absolute path, HDU index, mtime)
+
+    Parameters
+    ----------
+    maxbytes: int
+        budget of bytes of cached HDUs,
+            estimated from size of header and data
+    '''
+    def __init__(self, maxbytes=2**30):
+        self.maxbytes=maxbytes
+        self.nbytes=0
+
+        self.hdus=OrderedDict()  # key -> (hdul, hdu, nbytes)
+        self.keys={}             # (path, hduid) -> key
+
+        self.lock=threading.RLock()
+
+    def get_hdu(self, fitsname, hduid=0):
+        fitsname=os.path.abspath(fitsname)
+        key=(fitsname, hduid, os.stat(fitsname).st_mtime_ns)
+
+        with self.lock:
+            if key in self.hdus:
+                self.hdus.move_to_end(key)
+                return self.hdus[key][1]
+
+            # file changed
+            if key[:2] in self.keys:
+                self._pop(self.keys[key[:2]])
+
+            from astropy.io import fits
+            # memory-mapped by default, but not strictly,
+            #     so that scaled data (BZERO/BSCALE) could still be read
+            hdul=fits.open(fitsname)
+            hdu=hdul[hduid]
+
+            nbytes=self._get_nbytes(hdu)
+            self.hdus[key]=(hdul, hdu, nbytes)
+            self.keys[key[:2]]=key
+            self.nbytes+=nbytes
+
+            self._evict()
+
+        return hdu
+
+    def _get_nbytes(self, hdu):
+        '''
+        estimated bytes of a HDU, from its header
+        '''
+        header=hdu.header
+        nbytes=len(header)*80
+
+        naxis=header.get('NAXIS', 0)
+        if naxis>0:
+            ndata=abs(header.get('BITPIX', 8))//8
+            for i in range(1, naxis+1):
+                ndata*=header.get('NAXIS%i' % i, 0)
+            nbytes+=ndata
+        return nbytes
+
+    def _pop(self, key):
+        # not closed, since its HDU or data may be still in use
+        hdul, hdu, nbytes=self.hdus.pop(key)
+        del self.keys[key[:2]]
+        self.nbytes-=nbytes
+
+    def _evict(self):
+        # keep the lastest one, even if it exceeds budget
+        while self.nbytes>self.maxbytes and len(self.hdus)>1:
+            self._pop(next(iter(self.hdus)))
+
+    # user methods
+    def set_maxbytes(self, maxbytes):
+        with self.lock:
+            self.maxbytes=maxbytes
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.hdus):
+                self._pop(key)
+
+    def __len__(self):
+        return len(self.hdus)
+
+    def __contains__(self, fitsname):
+        return split_hduid(os.path.abspath(fitsname)) in self.keys
+
+class WCSCache:
+    '''
+    cache of WCS and derived values, keyed as HDUCache
+
+    Parameters
+    ----------
+    maxsize: int
+        max number of cached WCS
+    '''
+    def __init__(self, maxsize=128, hdus=None):
+        self.maxsize=maxsize
+        self.hdus=hdus
+
+        self.items=OrderedDict()  # key -> dict of wcs and derived values
+        self.keys={}              # (path, hduid) -> key
+
+        self.lock=threading.RLock()
+
+    def _get_item(self, fitsname, hduid=0, warnings_filter='ignore'):
+        fitsname=os.path.abspath(fitsname)
+        key=(fitsname, hduid, os.stat(fitsname).st_mtime_ns)
+
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                return self.items[key]
+
+            if key[:2] in self.keys:
+                self._pop(self.keys[key[:2]])
+
+            import warnings
+            from astropy.wcs import WCS as wcs
+            hdus=hdu_cache if self.hdus is None else self.hdus
+            fhead=hdus.get_hdu(fitsname, hduid).header
+            with warnings.catch_warnings():
+                warnings.simplefilter(warnings_filter)
+                item={'wcs': wcs(fhead)}
+
+            self.items[key]=item
+            self.keys[key[:2]]=key
+            while len(self.items)>self.maxsize:
+                self._pop(next(iter(self.items)))
+
+        return item
+
+    def _pop(self, key):
+        self.items.pop(key)
+        del self.keys[key[:2]]
+
+    # user methods
+    def get_wcs(self, fitsname, hduid=0, warnings_filter='ignore'):
+        return self._get_item(fitsname, hduid, warnings_filter)['wcs']
+
+    def get_pixscales(self, fitsname, hduid=0, warnings_filter='ignore'):
+        '''
+        pixel scales along axes, in unit of arcsec/pixel
+        '''
+        item=self._get_item(fitsname, hduid, warnings_filter)
+        if 'pixscales' not in item:
+            from astropy.wcs.utils import proj_plane_pixel_scales
+            item['pixscales']=proj_plane_pixel_scales(item['wcs'])*3600
+        return item['pixscales']
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.keys.clear()
+
+# read part of HDU
+def get_data(hdu):
+    '''
+    data of a cached HDU, which is made read-only
+        since it is shared by all callers
+    '''
+    data=hdu.data
+    if data is not None:
+        data.flags.writeable=False
+    return data
+
+def get_shape(hdu):
+    '''
+    shape of data, from header only
+    '''
+    header=hdu.header
+    naxis=header.get('NAXIS', 0)
+    return tuple(header['NAXIS%i' % i] for i in range(naxis, 0, -1))
+
+def get_data_region(hdu, region, dtype=None):
+    '''
+    data in a region, reading only needed part of file
+
+    Parameters
+    ----------
+    region: [xmin, xmax, ymin, ymax]
+        1-based and inclusive, as head parameter H
+
+    dtype: None or numpy dtype
+        if given, data is converted to it, like float32
+    '''
+    xmin, xmax, ymin, ymax=region
+    data=hdu.section[(ymin-1):ymax, (xmin-1):xmax]
+    if dtype is not None:
+        data=data.astype(dtype, copy=False)
+    return data
+
+# cache used in process
+hdu_cache=HDUCache()
+wcs_cache=WCSCache()
+
+def get_hdu(fitsname, hduid=None):
+    '''
+    HDU in cache
+        if `hduid` is None, it could be given in `fitsname`, like 'a.fits[1]'
+    '''
+    if hduid is None:
+        fitsname, hduid=split_hduid(fitsname)
+    return hdu_cache.get_hdu(fitsname, hduid)
+
+def set_cache_bytes(maxbytes):
+    hdu_cache.set_maxbytes(maxbytes)
+
+def get_wcs(fitsname, hduid=None, **kwargs):
+    '''
+    WCS in cache, shared by all callers
+    '''
+    if hduid is None:
+        fitsname, hduid=split_hduid(fitsname)
+    return wcs_cache.get_wcs(fitsname, hduid, **kwargs)
+
+def get_pixscales(fitsname, hduid=None, **kwargs):
+    if hduid is None:
+        fitsname, hduid=split_hduid(fitsname)
+    return wcs_cache.get_pixscales(fitsname, hduid, **kwargs)
+
+def clear_cache():
+    wcs_cache.clear()
+    hdu_cache.clear()
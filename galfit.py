@@ -4,16 +4,20 @@
 class to hold parameters to run galfit
 '''
 import os
+import re
 
 from functools import partial
 
 import numpy as np
 
 from .head import Head
-from .model import Model
+from .collection import install_descrs
+from .model import Model, no_gc
 from .constraint import Constraints
 
-from .fitlog import FitLogs
+from .fitlog import load_fitlogs
+from .fitscache import hdu_cache, wcs_cache, split_hduid,\
+                       get_data, get_shape, get_data_region
 from .tools import gfname
 from .tools_gf import keys_patt, radec2skycoord,\
                       support_list_indices
@@ -22,19 +26,26 @@ import os.path as ospath
 from .tools_path import abs_dirname, abs_join
 
 class GalFit:
+    # pattern of head methods, like chinput, set_region
+    head_method_re=keys_patt(Head.alias_keys, ['ch', 'set_'])
+
     log_props=['ndof', 'chisq', 'reduce_chisq'] # properties in figlog to store
 
     valid_props={'comps', 'head',
                  'gfcons',
                  'logname', '_log', *log_props,
-                 'init_file', 'gfpath'}
+                 'init_file', 'gfpath', 'parrs', '_logfile'}
 
-    def __init__(self, filename=None, loadlog=False, loadcons=False, loadall=False):
+    def __init__(self, filename=None, loadlog=False, loadcons=False, loadall=False,
+                       arrays=False, fast=False):
         self.comps=[]  # collection of components
         self.head=Head()
 
         self.gfcons=Constraints(self.comps)   # constraints
 
+        self.parrs=None   # ParamArrays, if parameters stored in arrays
+        self._logfile=None  # fit.log to load lazily
+
         if filename!=None:
             if type(filename)==int:
                 filename=gfname(filename)
@@ -42,18 +53,54 @@ class GalFit:
             self.gfpath=abs_dirname(filename)
             self.logname=ospath.basename(filename) # name in fitlog
 
-            self._load_file(filename)
+            if fast:
+                self._load_file_fast(filename)
+            else:
+                self._load_file(filename)
         else:
             self.gfpath=os.getcwd()
 
         if loadall or loadlog:
-            fitlog=self.get_abs_fname('fit.log')
-            self._load_fitlog(fitlog)
+            # fit.log is loaded when log or parameters are first accessed
+            self._logfile=self.get_abs_fname('fit.log')
+            for mod in self.comps:
+                mod.logloader=self._load_pending_log
 
         if (loadall or loadcons) and not self.is_none_cons():
             cons=self.get_abs_hdp('cons')
             self.gfcons._load_file(cons)
 
+        if arrays:
+            self.use_arrays()
+
+    # construct many templates
+    @staticmethod
+    def load_many(paths, workers=None, loadlog=False):
+        '''
+        load many templates into a columnar table
+            see `catalog.load_many` for details
+        '''
+        from .catalog import load_many
+        return load_many(paths, workers=workers, loadlog=loadlog)
+
+    @staticmethod
+    def from_arrays(comps, head=None, heads=None, gfpath=None):
+        '''
+        build many templates from arrays, e.g. columns of a catalog
+            see `catalog.build_many` for details
+        '''
+        from .catalog import build_many
+        return build_many(comps, head=head, heads=heads, gfpath=gfpath)
+
+    @staticmethod
+    def write_many(gfs, paths, workers=None, **kwargs):
+        '''
+        write many templates by a thread pool
+            see `writer.write_many` for details
+        '''
+        from .writer import write_many
+        return write_many(gfs, paths, workers=workers, **kwargs)
+
     # construct from file
     def _load_file(self, filename):
         modid=1   # model id
@@ -79,11 +126,64 @@ class GalFit:
                     self.comps.append(blk)
                     modid+=1
 
-                if key in blk.valid_keys:
+                if key in blk.valid_keys or (key=='Z' and blk is not self.head):
                     blk._feed_key_fields(key, vals)
 
+    ## faster parser, by one regex pass over whole text
+    line_re=re.compile(r'^[ \t]*(\w+)\)[ \t]+(.*)$', re.M)
+
+    def _load_file_fast(self, filename):
+        '''
+        faster parser of template
+            models are looked up in registry
+                and built with typed fields directly, see `Model.from_fields`
+        '''
+        with open(filename) as f:
+            text=f.read()
+
+        i=text.find('#  Input menu file: ')
+        if i>=0:
+            self.init_file=text[i:text.find('\n', i)].split()[-1]
+
+        head=self.head
+        hkeys=head.valid_keys
+        models=Model.get_model
+
+        comps=self.comps
+        cls=None
+        fields=None
+        with no_gc():
+            for key, val in self.line_re.findall(text):
+                if key=='0':
+                    if cls is not None:
+                        comps.append(cls.from_fields(fields, id=len(comps)+1))
+                    cls=models(val.split(None, 1)[0])
+                    fields={}
+                elif cls is not None:
+                    fields[key]=val.split()
+                elif key in hkeys:
+                    head._feed_key_fields(key, val.split())
+
+            if cls is not None:
+                comps.append(cls.from_fields(fields, id=len(comps)+1))
+
+    def _load_pending_log(self):
+        '''
+        load fit.log if pending
+            it must be done before components are changed,
+                since logs are fed to components in order
+        '''
+        fitlog=self._logfile
+        if fitlog is None:
+            return
+
+        self._logfile=None
+        for mod in self.comps:
+            mod.logloader=None
+        self._load_fitlog(fitlog)
+
     def _load_fitlog(self, fitlog):
-        logs=FitLogs(fitlog)
+        logs=load_fitlogs(fitlog)
         if not hasattr(self, 'init_file'):
             log=logs.get_log(self.logname)
         else:
@@ -108,14 +208,19 @@ class GalFit:
         return self.get_abs_fname(self.head.get_pval(prop))
 
     ## handle fits
-    def get_fits_hdu(self, fitsname):
-        from astropy.io import fits
-        if fitsname[-1]==']':
-            fitsname, hduid=fitsname[:-1].split('[')
-            hduid=int(hduid)
-        else:
-            hduid=0
+    def get_fits_hdu(self, fitsname, cache=True):
+        '''
+        HDU of a fits file, like 'a.fits' or 'a.fits[1]'
 
+        if `cache` is True, HDU is read through a process-wide cache
+            which is shared by all instances, see `fitscache` for details
+        '''
+        fitsname, hduid=split_hduid(fitsname)
+
+        if cache:
+            return hdu_cache.get_hdu(fitsname, hduid)
+
+        from astropy.io import fits
         return fits.open(fitsname)[hduid]
 
     ## handle input
@@ -127,15 +232,37 @@ class GalFit:
         return self.get_input_hdu().header
 
     def get_input_data(self):
-        return self.get_input_hdu().data
+        '''
+        data of input image
+            it is read-only, since shared by all instances
+            copy it to modify, like `gf.get_input_data().copy()`
+        '''
+        return get_data(self.get_input_hdu())
 
-    def get_input_data_region(self):
-        xmin, xmax, ymin, ymax=self.head.get_pval('region')
-        data=self.get_input_data()
-        return data[(ymin-1):ymax, (xmin-1):xmax]
+    def get_input_data_region(self, dtype=None):
+        '''
+        data in region, reading only needed part of file
+
+        dtype: None or numpy dtype, like float32
+            if given, data is converted to it
+        '''
+        return get_data_region(self.get_input_hdu(),
+                               self.head.get_pval('region'), dtype=dtype)
 
     def get_input_shape(self):
-        return self.get_input_data().shape
+        '''
+        shape of input image, from header only
+        '''
+        return get_shape(self.get_input_hdu())
+
+    def make_sigma(self, **kwargs):
+        '''
+        generate sigma file for region H if not cached,
+            and point head C to it
+        see `sigma.make_sigma` for arguments
+        '''
+        from .sigma import make_sigma
+        return make_sigma(self, **kwargs)
 
     ### application of input head
     def get_exptime(self):
@@ -175,13 +302,11 @@ class GalFit:
     def get_wcs(self, warnings_filter='ignore'):
         '''
         return wcs of input image
+            which is cached and shared among instances with same input
         '''
-        import warnings
-        from astropy.wcs import WCS as wcs
-        fhead=self.get_input_head()
-        with warnings.catch_warnings():
-            warnings.simplefilter(warnings_filter)
-            return wcs(fhead)
+        fits_input=self.get_abs_hdp('input')
+        return wcs_cache.get_wcs(*split_hduid(fits_input),
+                                 warnings_filter=warnings_filter)
 
     def func_wcs(self, method, **kwargs_wcs):
         '''
@@ -273,9 +398,9 @@ class GalFit:
         return pixel scale of input fits
             in unit of arcsec/pixel
         '''
-        from astropy.wcs.utils import proj_plane_pixel_scales
-        w=self.get_wcs(**kwargs_wcs)
-        pixel_scales=proj_plane_pixel_scales(w)*3600 # arcsec/pixel
+        fits_input=self.get_abs_hdp('input')
+        pixel_scales=wcs_cache.get_pixscales(*split_hduid(fits_input),
+                                             **kwargs_wcs) # arcsec/pixel
         return np.average(pixel_scales)
 
     def func_pix2sec(self, **kwargs_wcs):
@@ -298,7 +423,10 @@ class GalFit:
         return self.get_psf_hdu().header
 
     def get_psf_data(self):
-        return self.get_psf_hdu().data
+        '''
+        data of PSF image, read-only as `get_input_data`
+        '''
+        return get_data(self.get_psf_hdu())
 
     def get_psf_fwhm(self):
         fhead=self.get_psf_head()
@@ -306,6 +434,22 @@ class GalFit:
             return None
         return float(fhead['FWHM'])
 
+    ## render model
+    def render_model(self, convolve=False, **kwargs):
+        '''
+        model image over region H in numpy, without running galfit
+            see `render.render` for arguments
+
+        if `convolve` is True, it is convolved with PSF,
+            see `convolve.render_convolved`
+        '''
+        if convolve:
+            from .convolve import render_convolved
+            return render_convolved(self, **kwargs)
+
+        from .render import render
+        return render(self, **kwargs)
+
     ## handle region
     def get_region_shape(self):
         xmin, xmax, ymin, ymax=self.head.get_pval('region')
@@ -396,12 +540,41 @@ class GalFit:
 
         return num_tot-num_fixed-num_hard
 
+    ## parameters stored in arrays
+    def use_arrays(self):
+        '''
+        store parameters of all components in contiguous arrays
+            see `parray.ParamArrays` for details
+        '''
+        from .parray import ParamArrays
+        self.parrs=ParamArrays(self.comps)
+
+    def _rebind_arrays(self):
+        # rebuild arrays after change of components
+        if self.parrs is not None:
+            self.parrs.bind(self.comps)
+
+    def get_free_mask(self):
+        return self.parrs.get_free_mask()
+
+    def get_free_vals(self):
+        '''
+        values of free parameters, ordered by components
+        '''
+        return self.parrs.get_free_vals()
+
+    def set_free_vals(self, vals):
+        self.parrs.set_free_vals(vals)
+
     ## add/remove component
     def add_comp(self, mod, vals=None, tofits=None, Z=0, index=None):
         '''
         add component before index
             if index is None, append it to comps
         '''
+        # fit.log is fed to components in order of template
+        self._load_pending_log()
+
         if isinstance(mod, Model):
             modnew=mod
         elif type(mod)==str or type(mod)==type:
@@ -418,16 +591,23 @@ class GalFit:
         else:
             self.comps.insert(index, modnew)
 
+        self._rebind_arrays()
+
     def del_comp(self, index=0):
         '''
         delete comp
         '''
+        self._load_pending_log()
+        if self.parrs is not None:
+            self.parrs.unbind(self.comps[index])
         del self.comps[index]
+        self._rebind_arrays()
 
     def dup_comp(self, index=0, index_dup=None):
         '''
         duplicate component inserted just after it by default
         '''
+        self._load_pending_log()
         if index<0:
             index+=len(self.comps)
 
@@ -437,6 +617,14 @@ class GalFit:
             index_dup=index+1
 
         self.comps.insert(index_dup, newcomp)
+        self._rebind_arrays()
+
+    def variant(self):
+        '''
+        copy-on-write variant of this template, see `variant.Variant`
+        '''
+        from .variant import Variant
+        return Variant(self)
 
     ### frequently used models
     def add_sersic(self, *args, **keys):
@@ -519,11 +707,11 @@ class GalFit:
             if wrpath!=self.gfpath:
                 self.head.chdir(self.gfpath, wrpath)
 
+        # streamed to file, and constraint file kept if unchanged
+        from .writer import write_template, write_cons
         with open(filename, 'w') as f:
-            f.write(self._str()+'\n')
-
-        if not self.gfcons.is_empty():
-            self.gfcons.write(self.get_abs_hdp('cons'))
+            write_template(self, f)
+        write_cons(self)
 
         # resume path of head
         if chdir:
@@ -550,12 +738,21 @@ class GalFit:
         if prop=='ncomp':
             return len(self.comps)
 
+        # lazy loading of fit.log
+        if prop=='_log' or prop in GalFit.log_props:
+            if self._logfile is not None:
+                self._load_pending_log()
+                return getattr(self, prop)
+            raise AttributeError(prop)
+
+        # head parameters and methods are mostly found as
+        #     precompiled accessors, see `HeadValue` and `_head_setter`
         Hkeys=self.head.alias_keys
         if prop in Hkeys:
             return getattr(self.head, prop)
 
         # some head methods
-        Hmatch=keys_patt(Hkeys, ['ch', 'set_']).match(prop)
+        Hmatch=GalFit.head_method_re.match(prop)
         if Hmatch:
             key=Hmatch.groupdict()['key']
             return partial(self.head._set_param, key)
@@ -571,6 +768,13 @@ class GalFit:
         else:
             raise AttributeError(prop)
 
+    def __reduce__(self):
+        '''
+        pickle through compact serialization, see `serial`
+        '''
+        from .serial import dumps, loads
+        return (loads, (dumps(self),))
+
     def __getitem__(self, prop):
         if support_list_indices(prop):
             return self.comps[prop]
@@ -579,3 +783,29 @@ class GalFit:
 
     def __str__(self):
         return self._str()
+
+# precompiled accessors of head parameters, like gf.region, gf.chinput(...)
+class HeadValue:
+    '''
+    descriptor of value of head parameter
+    '''
+    __slots__=('key',)
+
+    def __init__(self, key):
+        self.key=key
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.head._peek_param(self.key).get()
+
+def _head_setter(key):
+    def set_head(self, val):
+        self.head._set_param(key, val)
+    return set_head
+
+install_descrs(GalFit, Head.alias_keys, HeadValue)
+for _key in Head.alias_keys:
+    for _name in ['ch'+_key, 'set_'+_key]:
+        if not hasattr(GalFit, _name):
+            setattr(GalFit, _name, _head_setter(_key))
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+'''
+content-addressed cache of galfit results
+
+    a run is keyed by hash of
+        template text, with paths made absolute
+        content of constraint file
+        referenced images: path, size and mtime, or digest of content
+    the cached result template and fit.log entry are restored
+        without running galfit
+
+    Attention:
+        output image block (head B) is not cached,
+            so it would not be produced for a cache hit
+'''
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+from .fitscache import split_hduid
+from .tools_path import abs_dirname
+
+# files referenced in head
+image_keys='ACDF'   # input, sigma, psf and mask images
+cons_key='G'
+
+class ResultCache:
+    '''
+    on-disk store of results, bounded by bytes with LRU eviction
+        access time of entry is recorded by its mtime
+
+    Parameters
+    ----------
+    path: str or None
+        directory of the store, default ~/.cache/galfit
+
+    maxbytes: int
+        budget of bytes of all entries
+
+    digest: bool
+        if True, images are identified by sha256 of content,
+        otherwise by path, size and mtime
+    '''
+    def __init__(self, path=None, maxbytes=2**28, digest=False):
+        if path is None:
+            path=os.path.join(os.path.expanduser('~'), '.cache', 'galfit')
+        os.makedirs(path, exist_ok=True)
+
+        self.path=path
+        self.maxbytes=maxbytes
+        self.digest=digest
+
+        self.lock=threading.Lock()
+
+    # key
+    def key(self, gf, fname=None):
+        '''
+        key of a GalFit
+
+        fname: str or None
+            file of the template
+            if given, template text is taken from it,
+                so that lines not parsed in GalFit, like hidden parameters,
+                    are also counted
+        '''
+        h=hashlib.sha256()
+
+        gfpath=gf.gfpath
+        if fname is None:
+            text=canonical_text(gf)
+        else:
+            text=canonical_file(fname)
+        h.update(text.encode())
+
+        for k in image_keys:
+            fname=gf.head.get_param(k).get()
+            if fname=='none':
+                continue
+            fname, hduid=split_hduid(os.path.join(gfpath, fname))
+            h.update(('%s:%s\n' % (k, self._file_sig(fname))).encode())
+
+        cons=gf.head.get_param(cons_key).get()
+        if cons!='none':
+            cons=os.path.join(gfpath, cons)
+            if os.path.isfile(cons):
+                with open(cons, 'rb') as f:
+                    h.update(f.read())
+
+        return h.hexdigest()
+
+    def _file_sig(self, fname):
+        if not os.path.exists(fname):
+            return 'missing'
+
+        fname=os.path.abspath(fname)
+        if not self.digest:
+            st=os.stat(fname)
+            return '%s %i %i' % (fname, st.st_size, st.st_mtime_ns)
+
+        h=hashlib.sha256()
+        with open(fname, 'rb') as f:
+            for chunk in iter(lambda: f.read(2**20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    # store
+    def _entry(self, key):
+        return os.path.join(self.path, key+'.json')
+
+    def get(self, key):
+        '''
+        cached result for a key, or None
+
+        Returns
+        -------
+        dict with
+            result: text of result template,
+                with paths relative to root directory
+            log: text of fit.log entry
+        '''
+        fname=self._entry(key)
+        try:
+            with open(fname) as f:
+                entry=json.load(f)
+            os.utime(fname)   # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, result, log):
+        '''
+        store a result, and evict old entries if needed
+        '''
+        text=json.dumps({'result': result, 'log': log})
+
+        # write atomically
+        fd, tmpname=tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        os.replace(tmpname, self._entry(key))
+
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            entries=[]
+            for fname in os.listdir(self.path):
+                if not fname.endswith('.json'):
+                    continue
+                fname=os.path.join(self.path, fname)
+                try:
+                    st=os.stat(fname)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, fname))
+
+            nbytes=sum([e[1] for e in entries])
+            entries.sort()
+            for _, size, fname in entries[:-1]:  # keep the latest one
+                if nbytes<=self.maxbytes:
+                    break
+                try:
+                    os.remove(fname)
+                except FileNotFoundError:
+                    pass
+                nbytes-=size
+
+    def clear(self):
+        for fname in os.listdir(self.path):
+            if fname.endswith('.json'):
+                os.remove(os.path.join(self.path, fname))
+
+    def __len__(self):
+        return len([f for f in os.listdir(self.path) if f.endswith('.json')])
+
+# template text
+def canonical_text(gf):
+    '''
+    text of template, with paths in head relative to root directory
+    '''
+    gfpath=gf.gfpath
+    gf.head.chdir(gfpath, os.sep, change_b=True)
+    try:
+        return gf._str()
+    finally:
+        gf.head.chdir(os.sep, gfpath, change_b=True)
+
+def canonical_file(fname):
+    '''
+    text of template file, with paths in head relative to root directory
+        and comment lines removed
+    '''
+    from .batch import rewrite_head_paths
+
+    with open(fname) as f:
+        text=f.read()
+    text=rewrite_head_paths(text, abs_dirname(fname), os.sep)
+    return ''.join([l for l in text.splitlines(True)
+                        if not l.lstrip().startswith('#')])
+
+# cache used by default
+_default_cache=None
+
+def get_cache(cache):
+    '''
+    ResultCache from argument `cache`
+        True for default cache, str for directory of store
+    '''
+    global _default_cache
+    if cache is True:
+        if _default_cache is None:
+            _default_cache=ResultCache()
+        return _default_cache
+    if type(cache)==str:
+        return ResultCache(cache)
+    return cache
@@ -4,13 +4,65 @@
 class for galfit supported model
 '''
 
-from functools import partial
+import gc
+from contextlib import contextmanager
 
-from .collection import Collection
+import numpy as np
+
+from .collection import Collection, install_descrs
 from .parameter import Parameter
-from .containers import Container
+from .containers import Container, Scalar
+
+# descriptors of accessors in model
+class FieldList:
+    '''
+    list of a field of all parameters, like `mod.vals`, `mod.tofits`
+    '''
+    __slots__=('field',)
+
+    def __init__(self, field):
+        self.field=field
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if obj.parrs is not None:
+            parrs, sl=obj.parrs
+            return parrs.get_field(sl, self.field)
+
+        # as `[p.get_pval(field) for p in obj]`, with fields read directly
+        if obj.logloader is not None:
+            obj.logloader()
+
+        field=self.field
+        params=obj.params
+        vals=[]
+        for k in obj.sorted_keys:
+            p=params[k] if k in params else obj._get_param(k)
+            fields=p.params
+            if field in fields:
+                vals.append(fields[field].get())
+            else:
+                vals.append(p.get_pval(field))
+        return vals
+
+class ParamGetter:
+    '''
+    Parameter of a key, like `mod.par_re`
+    '''
+    __slots__=('key',)
+
+    def __init__(self, key):
+        self.key=key
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj._get_param(self.key)
 
-from .tools_gf import keys_set
+# registry of models, by lower-case name of class
+#     filled when subclasses of Model are created
+models={}
 
 class Model(Collection):
     '''
@@ -33,14 +85,22 @@ class Model(Collection):
         'Z' : 'Skip this model? (yes=1, no=0)'
     }
 
-    valid_props={'params', 'id', 'name', 'Z'}
+    valid_props={'params', 'fmt', 'id', 'name', 'Z', 'parrs', 'logloader'}
+
+    container=Parameter
 
     def __init__(self, vals=None, tofits=None, Z=0, id=-1):
-        super().__init__(Parameter)
+        super().__init__()
         self.id=int(id)  # id used for output
         self.Z=Container(0)
         self.name=self.__class__.__name__.lower()
 
+        # (ParamArrays, slice) if parameters are stored in arrays
+        self.parrs=None
+
+        # callable to load fit.log lazily, before parameters are accessed
+        self.logloader=None
+
         self.Z.set(Z)
         if vals!=None:
             self.set_vals(vals)
@@ -49,6 +109,9 @@ class Model(Collection):
 
     # copy
     def copy(self):
+        if self.logloader is not None:
+            self.logloader()
+
         newobj=super().copy()
         newobj.id=-1
         newobj.Z=self.Z.copy()
@@ -56,10 +119,18 @@ class Model(Collection):
 
     # basic methods
     def _get_param(self, key):
+        if self.logloader is not None:
+            self.logloader()
+
         if key.lower()=='z':
             return self.Z
         return super()._get_param(key)
 
+    def _peek_param(self, key):
+        if key.lower()=='z':
+            return self.Z
+        return super()._peek_param(key)
+
     def _feed_key_fields(self, key, fields):
         '''
         feed in fields in a line seperated by whitespace
@@ -96,11 +167,37 @@ class Model(Collection):
 
     # methods to set parameters
     def _gen_set_field(self, vals, field):
+        if self.parrs is not None and type(vals)!=dict:
+            parrs, sl=self.parrs
+            parrs.set_field(sl, field, vals)
+            return
+
         if type(vals)!=dict:
-            vals=dict(zip(self.sorted_keys, vals))
+            vals=zip(self.sorted_keys, vals)
+        else:
+            vals=vals.items()
+
+        get_param=self._get_param
+        for k, v in vals:
+            get_param(k)._set_param(field, v)
+
+    ## fields of all parameters, and methods to set them
+    vals=FieldList('val')
+    tofits=FieldList('tofit')
+    uncerts=FieldList('uncert')
+    flags=FieldList('flag')
+
+    def set_vals(self, vals):
+        self._gen_set_field(vals, 'val')
+
+    def set_tofits(self, tofits):
+        self._gen_set_field(tofits, 'tofit')
 
-        for k in vals:
-            getattr(self._get_param(k), 'set_'+field)(vals[k])
+    def set_uncerts(self, uncerts):
+        self._gen_set_field(uncerts, 'uncert')
+
+    def set_flags(self, flags):
+        self._gen_set_field(flags, 'flag')
 
     ## free/freeze all parameters
     def set_all_params_fit(self, tofit):
@@ -163,13 +260,164 @@ class Model(Collection):
     def keep_mod(self):
         self._set_param('Z', 0)
 
+    # construct many models at once
+    @classmethod
+    def _param_columns(cls, arr, dtype, n, default, name):
+        '''
+        2d array of fields with shape (n, number of parameters)
+            columns ordered as `sorted_keys`
+
+        arr: 2d array-like, 1d array shared by all models,
+             dict of parameter key (or alias) to 1d arrays or scalars,
+             or None for default values
+        '''
+        nkey=len(cls.sorted_keys)
+        cols=np.empty((n, nkey), dtype=dtype)
+        cols[:]=default
+
+        if arr is None:
+            return cols
+
+        if type(arr)==dict:
+            for k, v in arr.items():
+                k=cls.alias_keys.get(k, k)
+                if k not in cls.valid_keys:
+                    raise Exception('invalid parameter for %s: %s'
+                                        % (cls.__name__.lower(), k))
+                cols[:, cls.sorted_keys.index(k)]=v
+            return cols
+
+        arr=np.asarray(arr, dtype=dtype)
+        if arr.shape[-1:]!=(nkey,) or arr.ndim>2:
+            raise Exception('expect %s with %i columns, but got shape %s'
+                                % (name, nkey, arr.shape))
+        cols[:]=arr
+        return cols
+
+    @classmethod
+    def from_arrays(cls, vals, tofits=None, Z=0, num=None):
+        '''
+        build many models of this type from arrays at once
+
+            arrays are validated once,
+            and parameters are created directly,
+                without dispatch per key in `set_vals`
+
+        Parameters
+        ----------
+        vals: 2d array-like or dict
+            values of parameters, with shape (n, number of parameters),
+                columns ordered as `sorted_keys`
+            if dict, it maps key or alias, like 'mag', to 1d arrays,
+                and missing parameters take default values
+
+        tofits: None, 2d or 1d array-like, or dict
+            fit toggles, similar as `vals`
+            1d array is shared by all models, and None means all fixed
+
+        Z: int or 1d array-like
+            whether to skip models
+
+        num: int or None
+            number of models
+            if None, it is given by length of arrays in `vals`
+
+        Returns
+        -------
+        list of models
+        '''
+        if type(vals)==dict:
+            n=max([np.size(v) for v in vals.values()], default=0)
+            defaults=cls._get_defaults()
+            default=[defaults[k] for k in cls.sorted_keys]
+        else:
+            n=len(vals)
+            default=0
+
+        if num is not None:
+            if type(vals)!=dict and n!=num:
+                raise Exception('expect %i models, but got %i' % (num, n))
+            n=num
+
+        vals=cls._param_columns(vals, float, n, default, 'vals')
+        tofits=cls._param_columns(tofits, int, n, 0, 'tofits')
+        if np.any((tofits!=0) & (tofits!=1)):
+            raise Exception('tofits should be 0 or 1')
+        Zs=np.broadcast_to(np.asarray(Z, dtype=int), (n,)).tolist()
+
+        # python scalars, converted once
+        vals=vals.tolist()
+        tofits=tofits.tolist()
+
+        fmt=cls.fmt_value
+        strfv=Scalar.get_strf(fmt)
+        keys=cls.sorted_keys
+
+        # no cycle in models, and garbage collection is paused,
+        #     which otherwise dominates when many objects are created
+        mods=[]
+        with no_gc():
+            for vs, ts, z in zip(vals, tofits, Zs):
+                params={k: _new_param(fmt, strfv, v, t)
+                            for k, v, t in zip(keys, vs, ts)}
+                mods.append(cls._new_direct(params, z))
+        return mods
+
+    @classmethod
+    def _new_direct(cls, params, Z=0, id=-1):
+        '''
+        model with given dict of parameters, bypassing `__init__`
+        '''
+        mod=object.__new__(cls)
+        object.__setattr__(mod, 'fmt', cls.fmt_value)
+        object.__setattr__(mod, 'params', params)
+        mod.__dict__.update(id=id, Z=_scalar(Z, int, str),
+                            name=cls.__name__.lower(),
+                            parrs=None, logloader=None)
+        return mod
+
+    @classmethod
+    def from_fields(cls, fields, id=-1):
+        '''
+        model from fields of lines in template, with typed assignment
+            as `_feed_key_fields`, but without dispatch per key
+
+        fields: dict
+            key of line to list of str, like {'3': ['20.0', '1'], ...}
+        '''
+        fmt=cls.fmt_value
+        strfv=Scalar.get_strf(fmt)
+        valid_keys=cls.valid_keys
+
+        params={}
+        Z=0
+        for key, fs in fields.items():
+            if key=='Z':
+                Z=int(fs[0])
+            elif key=='1' and not cls.is_sky(cls):  # not depend on instance
+                params['1']=_new_param(fmt, strfv, float(fs[0]), int(fs[2]))
+                params['2']=_new_param(fmt, strfv, float(fs[1]), int(fs[3]))
+            elif key in valid_keys:
+                t=int(fs[1]) if len(fs)>1 else None
+                params[key]=_new_param(fmt, strfv, float(fs[0]), t)
+        return cls._new_direct(params, Z, id)
+
+    # registry of models
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        models[cls.__name__.lower()]=cls
+
+        # accessors of Parameter, like `par_re`
+        install_descrs(cls, {'par_'+k: k for k in cls.alias_keys},
+                       ParamGetter)
+
     @classmethod
     def get_all_models(cls):
-        return {m.__name__.lower(): m for m in cls.__subclasses__()}
+        return dict(models)
 
     @staticmethod
     def get_model(name):
-        return Model.get_all_models()[name.lower()]
+        return models[name.lower()]
 
     # magic methods
     def __contains__(self, prop):
@@ -181,29 +429,62 @@ class Model(Collection):
         return iter([self._get_param(k) for k in self.sorted_keys])
 
     def __getattr__(self, prop):
-        Pkeys=Parameter.valid_keys
-        # collect fields, like vals, tofits
-        if prop in keys_set(Pkeys, suff='s'):
-            return [p[prop[:-1]].get() for p in self]
-
-        # methods to set single field, like set_vals, set_frees
-        if prop in keys_set(Pkeys, 'set_', 's'):
-            return partial(self._gen_set_field, field=prop[4:-1])
-
+        # fields, aliases and `par_` accessors are found as descriptors
+        #     see `FieldList`, `ParamGetter` and `collection.ParamValue`
         if not self.is_sky() and prop=='xy':
             return self.get_xy()
 
-        # return Parameter type
-        if prop in keys_set(self.alias_keys, 'par_'):
-            return self._get_param(prop[4:])
-
         # return value of parameter
         if prop in self.alias_keys or prop.lower()=='z':
             return super().__getattr__(prop)
 
+    def __reduce__(self):
+        '''
+        pickle through compact serialization, see `serial`
+        '''
+        from .serial import dumps_comp, loads_comp
+        return (loads_comp, (dumps_comp(self),))
+
     def __str__(self):
         return self._str()
 
+@contextmanager
+def no_gc():
+    '''
+    pause garbage collection in a block
+    '''
+    enabled=gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _scalar(val, typef, strf):
+    '''
+    container of scalar, created without checks
+    '''
+    s=object.__new__(Scalar)
+    s.val=val
+    s.typef=typef
+    s.strf=strf
+    return s
+
+def _new_param(fmt, strfv, val, tofit=None):
+    '''
+    parameter with typed val and tofit, created without checks
+        tofit is left default if None
+    '''
+    fields={'val': _scalar(val, float, strfv)}
+    if tofit is not None:
+        fields['tofit']=_scalar(tofit, int, str)
+
+    p=object.__new__(Parameter)
+    object.__setattr__(p, 'fmt', fmt)
+    object.__setattr__(p, 'params', fields)
+    return p
+
 class Sersic(Model):
     '''
     sersic model
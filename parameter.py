@@ -4,8 +4,6 @@
 class for parameters
 '''
 
-from functools import partial
-
 from .collection import Collection
 
 class Parameter(Collection):
@@ -17,6 +15,8 @@ class Parameter(Collection):
         val: value
         tofit: free for fit if 1; hold fixed if 0
     '''
+    __slots__=()
+
     sorted_keys=('val', 'tofit', 'uncert', 'flag')
     valid_keys=set(sorted_keys)
 
@@ -24,7 +24,12 @@ class Parameter(Collection):
 
     def __init__(self, val=0., tofit=0, uncert=-1., fmt=4):
         super().__init__(fmt=fmt)
-        self.set([val, tofit, uncert])
+
+        # fields with default value are left to be created lazily
+        for key, v, d in zip(self.sorted_keys, [val, tofit, uncert],
+                                               self.default_values):
+            if type(v)!=type(d) or v!=d:
+                self._set_param(key, v)
 
     def keys(self):
         return Parameter.sorted_keys
@@ -44,7 +49,10 @@ class Parameter(Collection):
 
     # methods of a container
     def get(self):  # return representative parameter
-        return self._get_param('val').get()
+        params=self.params
+        if 'val' in params:
+            return params['val'].get()
+        return self.get_pval('val')
 
     def set(self, val):
         self._set_params(val)
@@ -68,13 +76,6 @@ class Parameter(Collection):
         self.set_par_fit(False)
 
     # magic methods
-    def __getattr__(self, prop):
-        if prop[:4] in {'set_', 'get_'} and prop[4:] in self.valid_keys:
-            # methods, like get_val, set_val
-            return partial(getattr(self, '_%s_param' % prop[:3]),
-                           prop[4:])
-        return super().__getattr__(prop)
-
     def __getitem__(self, prop):
         return self._get_param(prop)
 
@@ -82,4 +83,22 @@ class Parameter(Collection):
         return '%-11s %s' % tuple(self._str_fields())
 
     def _str_fields(self):
-        return [str(self._get_param(s)) for s in self.sorted_keys[:2]]
+        return [str(self._peek_param(s)) for s in self.sorted_keys[:2]]
+
+# methods for each field, like get_val, set_tofit
+#     get_ returns container of the field
+def _field_methods(key):
+    def get_field(self):
+        return self._get_param(key)
+
+    def set_field(self, val):
+        self._set_param(key, val)
+
+    get_field.__name__='get_'+key
+    set_field.__name__='set_'+key
+    return get_field, set_field
+
+for _key in Parameter.sorted_keys:
+    _get, _set=_field_methods(_key)
+    setattr(Parameter, _get.__name__, _get)
+    setattr(Parameter, _set.__name__, _set)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+'''
+array-backed storage of parameters in components
+
+    values, fit toggles, uncertainties and flags of all components
+        are kept in contiguous numpy arrays,
+    and each parameter in Model is an `ArrayParameter`,
+        a thin view of one element of these arrays,
+        which replaces Parameter and containers of its fields
+
+    containers of fields, like `param.get_val()`,
+        are created only when asked, as views of the arrays
+'''
+
+from types import MappingProxyType
+
+import numpy as np
+
+from .containers import Scalar
+from .parameter import Parameter
+from .fitlog import flag_names, flag_codes
+
+# index of field in tuple of arrays
+field_index={f: i for i, f in enumerate(Parameter.sorted_keys)}
+
+valid_tofits={0, 1}
+
+def _to_code(field, val):
+    '''
+    value of a field to store in array, checked as containers
+    '''
+    if field=='flag':
+        if val not in flag_codes:
+            raise Exception('invalid value: %s' % val)
+        return flag_codes[val]
+
+    if field=='tofit':
+        val=int(val)
+        if val not in valid_tofits:
+            raise Exception('invalid value: %s' % val)
+        return val
+
+    return float(val)
+
+class FieldView:
+    '''
+    container of one field of an ArrayParameter, created only when asked
+    '''
+    __slots__=('param', 'field')
+
+    def __init__(self, param, field):
+        self.param=param
+        self.field=field
+
+    # copy: detached from array
+    def copy(self):
+        newobj=Scalar(self.get())
+        newobj.strf=self._strf()
+        return newobj
+
+    def get(self):
+        return self.param.get_pval(self.field)
+
+    def set(self, val):
+        self.param._set_param(self.field, val)
+
+    def _strf(self):
+        if self.field in ('val', 'uncert'):
+            return Scalar.get_strf(self.param.fmt)
+        return str
+
+    def __str__(self):
+        return self._strf()(self.get())
+
+class ArrayField:
+    '''
+    descriptor of a field of ArrayParameter, like `param.val`
+        read from array directly
+    '''
+    __slots__=('field',)
+
+    def __init__(self, field):
+        self.field=field
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.get_pval(self.field)
+
+class ArrayParameter(Parameter):
+    '''
+    parameter stored in an element of arrays of ParamArrays
+
+    Parameters
+    ----------
+    arrs: tuple of arrays
+        val, tofit, uncert and flag
+
+    ind: int
+        index in arrays
+    '''
+    __slots__=('arrs', 'ind')
+
+    # no container of fields is held
+    params=MappingProxyType({})
+
+    valid_props={'params', 'fmt', 'arrs', 'ind'}
+
+    val=ArrayField('val')
+    tofit=ArrayField('tofit')
+    uncert=ArrayField('uncert')
+    flag=ArrayField('flag')
+
+    def __init__(self, arrs, ind, fmt=4):
+        object.__setattr__(self, 'arrs', arrs)
+        object.__setattr__(self, 'ind', ind)
+        object.__setattr__(self, 'fmt', fmt)
+
+    # copy: detached from arrays
+    def copy(self):
+        newobj=Parameter(*[self.get_pval(f) for f in self.sorted_keys[:3]],
+                         fmt=self.fmt)
+        flag=self.get_pval('flag')
+        if flag!='normal':
+            newobj._set_param('flag', flag)
+        return newobj
+
+    # fields in arrays
+    def _get_param(self, key):
+        return FieldView(self, self._get_key(key))
+
+    _peek_param=_get_param
+
+    def _set_param(self, key, val):
+        key=self._get_key(key)
+        if isinstance(val, (Scalar, FieldView)):
+            val=val.get()
+        self.arrs[field_index[key]][self.ind]=_to_code(key, val)
+
+    def get_pval(self, key):
+        key=self._get_key(key)
+        v=self.arrs[field_index[key]][self.ind]
+        if key=='flag':
+            return flag_names[v]
+        if key=='tofit':
+            return int(v)
+        return float(v)
+
+    def get(self):
+        return float(self.arrs[0][self.ind])
+
+class ParamArrays:
+    '''
+    arrays of parameters in a list of components
+
+    Properties
+    ----------
+    val, tofit, uncert, flag: 1d arrays
+        fields of all parameters, ordered by components
+            and `sorted_keys` of each component
+        flag is stored as codes, see `fitlog.flag_names`
+
+    slices: list of slice
+        range of each component in arrays
+    '''
+    fields=Parameter.sorted_keys
+    dtypes={
+        'val': float,
+        'tofit': np.int8,
+        'uncert': float,
+        'flag': np.int8,
+    }
+
+    def __init__(self, comps):
+        self.bind(comps)
+
+    def bind(self, comps):
+        '''
+        copy parameters of components to new arrays,
+            and replace them by ArrayParameter pointing to the arrays
+        '''
+        nums=[len(mod.sorted_keys) for mod in comps]
+        ntot=sum(nums)
+
+        cols={f: [] for f in self.fields}
+        for mod in comps:
+            for key in mod.sorted_keys:
+                param=mod._get_param(key)
+                for f in self.fields:
+                    cols[f].append(param.get_pval(f))
+        cols['flag']=[flag_codes[f] for f in cols['flag']]
+
+        arrs=tuple(np.array(cols[f], dtype=self.dtypes[f]).reshape(ntot)
+                        for f in self.fields)
+
+        # parameters bound before are moved to new arrays in place,
+        #     so that references to them held by users remain valid
+        self.slices=[]
+        i0=0
+        for mod, n in zip(comps, nums):
+            params=mod.params
+            for i, key in enumerate(mod.sorted_keys, i0):
+                p=params[key]
+                if type(p) is ArrayParameter:
+                    object.__setattr__(p, 'arrs', arrs)
+                    object.__setattr__(p, 'ind', i)
+                else:
+                    params[key]=ArrayParameter(arrs, i, p.fmt)
+
+            sl=slice(i0, i0+n)
+            mod.parrs=(self, sl)
+            self.slices.append(sl)
+            i0+=n
+
+        for f, arr in zip(self.fields, arrs):
+            setattr(self, f, arr)
+
+    def unbind(self, mod):
+        '''
+        detach a component from arrays
+        '''
+        params=mod.params
+        for key in mod.sorted_keys:
+            params[key]=params[key].copy()
+        mod.parrs=None
+
+    # get/set fields of a component
+    def get_field(self, sl, field):
+        vals=getattr(self, field)[sl]
+        if field=='flag':
+            return [flag_names[i] for i in vals]
+        return vals.tolist()
+
+    def set_field(self, sl, field, vals):
+        arr=getattr(self, field)[sl]
+        if len(vals)>len(arr):
+            raise Exception('Excepted %i parameters at most ' % len(arr) +
+                            'but got %i ' % len(vals))
+
+        vals=[_to_code(field, v) for v in vals]
+        arr[:len(vals)]=vals
+
+    # free parameters
+    def get_free_mask(self):
+        return self.tofit!=0
+
+    def get_free_vals(self):
+        '''
+        values of free parameters
+
+        free parameters are scattered in `val`,
+            so it returns a copy. `val` itself could be used zero-copy
+        '''
+        return self.val[self.get_free_mask()]
+
+    def set_free_vals(self, vals):
+        mask=self.get_free_mask()
+        if len(vals)!=mask.sum():
+            raise Exception('Excepted %i free parameters ' % mask.sum() +
+                            'but got %i ' % len(vals))
+        self.val[mask]=vals
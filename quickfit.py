@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+'''
+quick fit of small stamps in process, by Levenberg-Marquardt
+
+    it uses numpy renderer and PSF convolution,
+        so that no galfit process is spawned
+
+    parameters:
+        only those with tofit=1 are fitted
+        components with Z=1 are skipped, as galfit
+        hard constraints (offset, ratio) tie parameters to a leading one,
+            with offsets or ratios at initial values
+        soft constraints are kept by projection after each step
+            fromto, around: bounds of a parameter
+            sub, div: bounds of difference or ratio between two components
+
+    Jacobian is computed by finite difference,
+        with all perturbed vectors rendered in one batch
+'''
+
+import numpy as np
+
+from .chisq import ChiSquare, fit_comps, get_vector, split_vector
+
+# bounds of parameters to keep profiles valid, by model and key
+param_bounds={
+    'sersic': {'4': (1e-2, None), '5': (0.05, 20), '9': (1e-2, None)},
+    'devauc': {'4': (1e-2, None), '9': (1e-2, None)},
+    'expdisk': {'4': (1e-2, None), '9': (1e-2, None)},
+    'gaussian': {'4': (1e-2, None), '9': (1e-2, None)},
+    'moffat': {'4': (1e-2, None), '5': (1.01, None), '9': (1e-2, None)},
+    'king': {'4': (1e-2, None), '5': (1e-2, None), '6': (1e-2, None),
+             '9': (1e-2, None)},
+    'nuker': {'4': (1e-2, None), '5': (1e-2, None), '9': (1e-2, None)},
+    'ferrer': {'4': (1e-2, None), '5': (0, None), '6': (0, 1.99),
+               '9': (1e-2, None)},
+    'edgedisk': {'4': (1e-2, None), '5': (1e-2, None)},
+}
+
+class QuickFit:
+    '''
+    Levenberg-Marquardt fitter for a template
+
+    Parameters
+    ----------
+    gf: GalFit
+        load it with `loadcons=True` to honor constraints
+
+    maxiter: int
+        max number of iterations
+
+    tol: float
+        stop when relative decrease of chi-square is below it
+
+    kwargs: optional arguments for `chisq.ChiSquare`
+    '''
+    def __init__(self, gf, maxiter=100, tol=1e-6, **kwargs):
+        self.gf=gf
+        self.maxiter=maxiter
+        self.tol=tol
+
+        self.ev=ChiSquare(gf, **kwargs)
+        self.sqrtw=np.sqrt(self.ev.weight)
+
+        self.v0=get_vector(gf)
+        self._setup_params()
+
+    # parameters
+    def _setup_params(self):
+        '''
+        indices of free parameters, ties and bounds
+        '''
+        gf=self.gf
+        self.comps=fit_comps(gf)
+
+        # offset of each component in vector
+        self.offsets={}
+        tofit=[]
+        lo, hi=[], []
+        i=0
+        for mod in self.comps:
+            self.offsets[id(mod)]=i
+            tofit.extend(mod.tofits)
+            bounds=param_bounds.get(mod.name, {})
+            for k in mod.sorted_keys:
+                l, h=bounds.get(k, (None, None))
+                lo.append(-np.inf if l is None else l)
+                hi.append(np.inf if h is None else h)
+            i+=len(mod.sorted_keys)
+        free=np.array(tofit, dtype=bool)
+        lo, hi=np.array(lo), np.array(hi)
+
+        # constraints
+        self.ties=[]     # (index, lead index, type, initial relation)
+        self.pairs=[]    # (index, other index, type, range)
+        for cons in gf.gfcons.cons:
+            # constraints on skipped components take no effect
+            if any([id(mod) not in self.offsets for mod in cons.comps]):
+                continue
+
+            inds=[self._index(mod, cons.param_mod) for mod in cons.comps]
+            ctype=cons.cons_type
+
+            if cons.is_hard():
+                fixed=[i for i in inds if not free[i]]
+                lead=fixed[0] if fixed else inds[0]
+                for i in inds:
+                    if i==lead or not free[i]:
+                        continue
+                    free[i]=False
+                    if ctype=='offset':
+                        rel=self.v0[i]-self.v0[lead]
+                    else:
+                        if self.v0[lead]==0:
+                            raise Exception('ratio constraint of %s with '
+                                            'zero value in leading component'
+                                                % cons.param)
+                        rel=self.v0[i]/self.v0[lead]
+                    self.ties.append((i, lead, ctype, rel))
+            elif ctype=='soft_fromto':
+                for i in inds:
+                    lo[i]=max(lo[i], min(cons.range))
+                    hi[i]=min(hi[i], max(cons.range))
+            elif ctype=='soft_around':
+                for i in inds:
+                    lo[i]=max(lo[i], self.v0[i]+min(cons.range))
+                    hi[i]=min(hi[i], self.v0[i]+max(cons.range))
+            else:
+                self.pairs.append((inds[0], inds[1], ctype, cons.range))
+
+        self.free=np.nonzero(free)[0]
+        self.lo, self.hi=lo, hi
+
+    def _index(self, mod, key):
+        return self.offsets[id(mod)]+mod.sorted_keys.index(mod._get_key(key))
+
+    def expand(self, u):
+        '''
+        full vectors of parameters from free ones
+            u could be batched, with shape (..., nfree)
+        '''
+        u=np.asarray(u, dtype=float)
+        v=np.broadcast_to(self.v0, u.shape[:-1]+self.v0.shape).copy()
+        v[..., self.free]=u
+
+        for i, lead, ctype, rel in self.ties:
+            if ctype=='offset':
+                v[..., i]=v[..., lead]+rel
+            else:
+                v[..., i]=v[..., lead]*rel
+
+        for i, j, ctype, (a, b) in self.pairs:
+            # move the first parameter into range
+            if ctype=='soft_sub':
+                v[..., i]=v[..., j]+np.clip(v[..., i]-v[..., j], a, b)
+            else:
+                v[..., i]=v[..., j]*np.clip(v[..., i]/v[..., j], a, b)
+
+        return np.clip(v, self.lo, self.hi)
+
+    def project(self, u):
+        '''
+        free parameters within bounds
+        '''
+        return np.clip(u, self.lo[self.free], self.hi[self.free])
+
+    # residuals
+    def residuals(self, u):
+        '''
+        weighted residuals (data-model)/sigma for free parameters
+            u could be batched, with shape (..., nfree)
+        '''
+        model=self.ev.renderer(split_vector(self.gf, self.expand(u)))
+        res=self.ev.data-model
+        res*=self.sqrtw
+        return res
+
+    def jacobian(self, u, res0):
+        '''
+        Jacobian of residuals, by forward difference in one batch
+        '''
+        nfree=len(u)
+        h=1e-4*np.maximum(np.abs(u), 1)
+
+        # step backward if forward one is out of bounds
+        hi=self.hi[self.free]
+        h=np.where(u+h>hi, -h, h)
+
+        us=np.tile(u, (nfree, 1))
+        us[np.arange(nfree), np.arange(nfree)]+=h
+
+        res=self.residuals(us)
+        jac=(res-res0)/h[:, None, None]
+        return jac.reshape(nfree, -1).T
+
+    # fit
+    def fit(self):
+        '''
+        run Levenberg-Marquardt iterations
+
+        return chi-square at best-fit
+        '''
+        u=self.project(self.v0[self.free])
+        res=self.residuals(u)
+        chisq=np.sum(res*res)
+
+        nfree=len(u)
+        if nfree==0:
+            return self._finish(u, chisq, None)
+
+        lam=1e-3
+        jac=None
+        for it in range(self.maxiter):
+            if jac is None:
+                jac=self.jacobian(u, res)
+                jtj=jac.T@jac
+                jtr=jac.T@res.ravel()
+
+            a=jtj+lam*np.diag(np.diag(jtj))
+            try:
+                step=np.linalg.solve(a, -jtr)
+            except np.linalg.LinAlgError:
+                step=-np.linalg.lstsq(a, jtr, rcond=None)[0]
+
+            unew=self.project(u+step)
+            rnew=self.residuals(unew)
+            cnew=np.sum(rnew*rnew)
+
+            if cnew<chisq:
+                converged=(chisq-cnew)<self.tol*chisq
+                u, res, chisq=unew, rnew, cnew
+                jac=None
+                lam=max(lam/10, 1e-10)
+                if converged:
+                    break
+            else:
+                lam*=10
+                if lam>1e10:
+                    break
+
+        if jac is None:
+            jac=self.jacobian(u, res)
+            jtj=jac.T@jac
+        return self._finish(u, chisq, jtj)
+
+    def _finish(self, u, chisq, jtj):
+        '''
+        write best-fit values and uncertainties back to template
+        '''
+        v=self.expand(u)
+
+        uncert=np.zeros_like(v)
+        if jtj is not None:
+            cov=np.linalg.pinv(jtj)
+            uncert[self.free]=np.sqrt(np.abs(np.diag(cov)))
+
+        # tied parameters
+        for i, lead, ctype, rel in self.ties:
+            uncert[i]=uncert[lead]*(1 if ctype=='offset' else abs(rel))
+
+        i=0
+        for mod in self.comps:
+            n=len(mod.sorted_keys)
+            mod.set_vals(list(v[i:i+n]))
+            mod.set_uncerts(list(uncert[i:i+n]))
+            i+=n
+
+        ev=self.ev
+        self.chisq=chisq
+        self.gf.chisq=chisq
+        self.gf.ndof=ev.ndof
+        self.gf.reduce_chisq=chisq/ev.ndof
+
+        return chisq
+
+# user function
+def quickfit(gf, **kwargs):
+    '''
+    fit a template in process, and write results back to it
+
+    kwargs: optional arguments for `QuickFit`
+
+    return chi-square at best-fit
+    '''
+    return QuickFit(gf, **kwargs).fit()
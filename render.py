@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+
+'''
+render model image of galfit templates in numpy
+
+    profiles follow definitions in manual of galfit,
+        and image is rendered over region H, without PSF convolution
+
+    parameters of a component could be batched,
+        i.e. array with shape (..., nkeys) for keys in `sorted_keys` of model,
+        and then image has shape (..., ny, nx)
+'''
+
+import math
+
+import numpy as np
+
+from .model import Model
+
+# lookup table of sersic profile
+class SersicTable:
+    '''
+    kappa (b_n) and normalization of sersic profile, tabulated in index n
+
+        flux = Ie * re^2 * q * exp(lnorm(n))
+            lnorm(n) = ln(2 pi n) + kappa - 2n ln(kappa) + lgamma(2n)
+    '''
+    def __init__(self, nmin=0.05, nmax=20, num=20000):
+        self.n=np.linspace(nmin, nmax, num)
+        self.kappa=self._get_kappa(self.n)
+        lgam=np.array([math.lgamma(2*n) for n in self.n])
+        self.lnorm=np.log(2*np.pi*self.n)+self.kappa-\
+                   2*self.n*np.log(self.kappa)+lgam
+
+    @staticmethod
+    def _get_kappa(n):
+        try:
+            from scipy.special import gammaincinv
+        except ImportError:
+            pass
+        else:
+            return gammaincinv(2*n, 0.5)
+
+        # Ciotti & Bertin (1999), and MacArthur et al. (2003) for small n
+        k=2*n-1/3+4/(405*n)+46/(25515*n**2)+131/(1148175*n**3)-\
+          2194697/(30690717750*n**4)
+        ks=0.01945-0.8902*n+10.95*n**2-19.67*n**3+13.43*n**4
+        return np.where(n>0.36, k, ks)
+
+    def __call__(self, n):
+        '''
+        kappa and lnorm at index n, interpolated in table
+        '''
+        return np.interp(n, self.n, self.kappa), \
+               np.interp(n, self.n, self.lnorm)
+
+_sersic_table=None
+
+def get_sersic_table():
+    global _sersic_table
+    if _sersic_table is None:
+        _sersic_table=SersicTable()
+    return _sersic_table
+
+# frame of rendering
+class Frame:
+    '''
+    pixel grid and photometric setup for region H
+
+    Parameters
+    ----------
+    region: [xmin, xmax, ymin, ymax]
+        1-based and inclusive, as head parameter H
+
+    zerop: float
+        magnitude zeropoint, head parameter J
+
+    pscale: [dx, dy]
+        plate scale in arcsec/pixel, head parameter K
+            used for surface brightness
+
+    exptime: float
+        exposure time, used in conversion of magnitude
+
+    sampling: int
+        number of sub-pixels along each axis in a data pixel,
+            like head parameter E for fine sampling of PSF
+
+    margin: (int, int)
+        pixels extended out of region along x and y,
+            e.g. to take light out of region in convolution
+    '''
+    def __init__(self, region, zerop=20., pscale=(1., 1.), exptime=1.,
+                       sampling=1, margin=(0, 0)):
+        xmin, xmax, ymin, ymax=region
+        mx, my=margin
+
+        self.region=list(region)
+        self.center=((xmin+xmax)/2, (ymin+ymax)/2)
+
+        # centers of (sub-)pixels
+        self.sampling=sampling
+        self.step=1/sampling
+        self.x=self._centers(xmin-mx, xmax+mx)
+        self.y=self._centers(ymin-my, ymax+my)
+        self.shape=(len(self.y), len(self.x))
+
+        self.zerop=zerop
+        self.pixarea=pscale[0]*pscale[1]
+        self.exptime=exptime
+
+    def _centers(self, pmin, pmax):
+        n=(pmax-pmin+1)*self.sampling
+        return pmin-0.5+(np.arange(n)+0.5)*self.step
+
+    @classmethod
+    def from_galfit(cls, gf, exptime=None, **kwargs):
+        '''
+        frame from head of GalFit
+            if `exptime` is None, take EXPTIME of input image if existed
+        '''
+        head=gf.head
+        if exptime is None:
+            exptime=1.
+            if head.get_pval('input')!='none':
+                exptime=gf.get_exptime()
+        return cls(head.get_pval('region'), zerop=head.get_pval('zerop'),
+                   pscale=head.get_pval('pscale'), exptime=exptime, **kwargs)
+
+    def index(self, x, y):
+        '''
+        index of (sub-)pixels in image, as float
+        '''
+        return (x-self.x[0])/self.step, (y-self.y[0])/self.step
+
+    # photometry
+    def flux(self, mag):
+        '''
+        total counts from magnitude
+        '''
+        return self.exptime*10**(-0.4*(mag-self.zerop))
+
+    def sb(self, mu):
+        '''
+        counts per pixel from surface brightness in mag/arcsec^2
+        '''
+        return self.flux(mu)*self.pixarea
+
+# geometry
+def _offsets(p, x, y):
+    '''
+    offsets along major and minor axis
+
+    PA is measured from +y axis to left, as galfit
+    '''
+    dx=x-p['1']
+    dy=y-p['2']
+
+    pa=np.deg2rad(p['10'])
+    s, c=np.sin(pa), np.cos(pa)
+    return dy*c-dx*s, dx*c+dy*s
+
+def _radius2(p, x, y, scale=None):
+    '''
+    squared elliptical radius, in unit of `scale` if given
+
+    operations on full image are done in place
+    '''
+    dx=x-p['1']
+    dy=y-p['2']
+
+    pa=np.deg2rad(p['10'])
+    s, c=np.sin(pa), np.cos(pa)
+    if scale is not None:
+        s, c=s/scale, c/scale
+    sq, cq=s/p['9'], c/p['9']
+
+    a=dy*c-dx*s
+    b=dx*cq+dy*sq
+    a*=a
+    b*=b
+    a+=b
+    return a
+
+# profiles
+## function(p, x, y, frame) -> image
+##     p: dict of parameter arrays, with shape (..., 1, 1)
+##     x: shape (1, nx), y: shape (ny, 1)
+def _sersic(p, x, y, frame, n=None):
+    if n is None:
+        n=p['5']
+    kappa, lnorm=get_sersic_table()(n)
+    re=p['4']
+    ie=frame.flux(p['3'])/(re*re*p['9']*np.exp(lnorm))
+
+    img=_radius2(p, x, y, scale=re)
+    np.power(img, 0.5/n, out=img)
+    img*=-kappa
+    np.exp(img, out=img)
+    img*=ie*np.exp(kappa)
+    return img
+
+def _devauc(p, x, y, frame):
+    return _sersic(p, x, y, frame, n=np.full_like(p['4'], 4.))
+
+def _expdisk(p, x, y, frame):
+    rs=p['4']
+    i0=frame.flux(p['3'])/(2*np.pi*rs*rs*p['9'])
+    return i0*np.exp(-np.sqrt(_radius2(p, x, y))/rs)
+
+def _gaussian(p, x, y, frame):
+    sig2=(p['4']/(2*np.sqrt(2*np.log(2))))**2
+    i0=frame.flux(p['3'])/(2*np.pi*sig2*p['9'])
+    return i0*np.exp(-0.5*_radius2(p, x, y)/sig2)
+
+def _moffat(p, x, y, frame):
+    pl=p['5']
+    rd2=p['4']**2/(4*(2**(1/pl)-1))
+    i0=frame.flux(p['3'])*(pl-1)/(np.pi*rd2*p['9'])
+    return i0*(1+_radius2(p, x, y)/rd2)**(-pl)
+
+def _king(p, x, y, frame):
+    rc2=p['4']**2
+    rt2=p['5']**2
+    alpha=p['6']
+
+    ft=(1+rt2/rc2)**(-1/alpha)
+    r2=_radius2(p, x, y)
+    img=frame.sb(p['3'])*(1-ft)**(-alpha)*\
+        np.clip((1+r2/rc2)**(-1/alpha)-ft, 0, None)**alpha
+    return np.where(r2<rt2, img, 0)
+
+def _nuker(p, x, y, frame):
+    rb=p['4']
+    alpha, beta, gamma=p['5'], p['6'], p['7']
+
+    r=np.sqrt(_radius2(p, x, y))/rb
+    r=np.maximum(r, 1e-6)   # avoid singularity at center
+    return frame.sb(p['3'])*2**((beta-gamma)/alpha)*r**(-gamma)*\
+           (1+r**alpha)**((gamma-beta)/alpha)
+
+def _ferrer(p, x, y, frame):
+    rout2=p['4']**2
+    alpha, beta=p['5'], p['6']
+
+    r2=_radius2(p, x, y)/rout2
+    img=frame.sb(p['3'])*np.clip(1-r2**(1-beta/2), 0, None)**alpha
+    return np.where(r2<1, img, 0)
+
+def _xk1(x):
+    '''
+    x*K1(x), with polynomial approximation if no scipy
+    '''
+    try:
+        from scipy.special import k1
+    except ImportError:
+        pass
+    else:
+        return np.where(x>0, x*k1(np.maximum(x, 1e-300)), 1.)
+
+    # Abramowitz & Stegun 9.8.3, 9.8.7 and 9.8.8
+    x=np.maximum(x, 1e-300)
+    small=x<=2
+    xs=np.minimum(x, 2)
+    t=(xs/3.75)**2
+    i1=xs*(0.5+t*(0.87890594+t*(0.51498869+t*(0.15084934+
+           t*(0.02658733+t*(0.00301532+t*0.00032411))))))
+    t=(xs/2)**2
+    ks=xs*np.log(xs/2)*i1+(1+t*(0.15443144+t*(-0.67278579+
+        t*(-0.18156897+t*(-0.01919402+t*(-0.00110404-t*0.00004686))))))
+
+    xl=np.maximum(x, 2)
+    t=2/xl
+    kl=np.sqrt(xl)*np.exp(-xl)*(1.25331414+t*(0.23498619+
+        t*(-0.03655620+t*(0.01504268+t*(-0.00780353+
+        t*(0.00325614-t*0.00068245))))))
+    return np.where(small, ks, kl)
+
+def _edgedisk(p, x, y, frame):
+    a, b=_offsets(p, x, y)
+    hs, rs=p['4'], p['5']
+    e=np.exp(-2*np.abs(b/hs))   # sech^2 without overflow
+    return frame.sb(p['3'])*_xk1(np.abs(a)/rs)*4*e/(1+e)**2
+
+def _sky(p, x, y, frame):
+    xc, yc=frame.center
+    return p['1']+p['2']*(x-xc)+p['3']*(y-yc)
+
+def _psf(p, x, y, frame):
+    '''
+    point source without PSF, shared to nearest 4 pixels bilinearly
+    '''
+    step=frame.step
+    flux=frame.flux(p['3'])*frame.sampling**2
+    wx=np.clip(1-np.abs(x-p['1'])/step, 0, None)
+    wy=np.clip(1-np.abs(y-p['2'])/step, 0, None)
+    return flux*wx*wy
+
+profiles={
+    'sersic': _sersic,
+    'devauc': _devauc,
+    'expdisk': _expdisk,
+    'gaussian': _gaussian,
+    'moffat': _moffat,
+    'king': _king,
+    'nuker': _nuker,
+    'ferrer': _ferrer,
+    'edgedisk': _edgedisk,
+    'sky': _sky,
+    'psf': _psf,
+}
+
+# models without oversampling near center
+no_oversample={'sky', 'psf'}
+
+# radius along major axis, beyond which profile is below `level`
+## function(p, frame, level) -> radius
+##     p: dict of parameter arrays, with shape (...,)
+def _cut_sersic(p, frame, level, n=None):
+    if n is None:
+        n=p['5']
+    kappa, lnorm=get_sersic_table()(n)
+    re=p['4']
+    ie=frame.flux(p['3'])/(re*re*p['9']*np.exp(lnorm))
+    return re*np.clip(1+np.log(ie/level)/kappa, 0, None)**n
+
+def _cut_devauc(p, frame, level):
+    return _cut_sersic(p, frame, level, n=np.full_like(p['4'], 4.))
+
+def _cut_expdisk(p, frame, level):
+    rs=p['4']
+    i0=frame.flux(p['3'])/(2*np.pi*rs*rs*p['9'])
+    return rs*np.clip(np.log(i0/level), 0, None)
+
+def _cut_gaussian(p, frame, level):
+    sig2=(p['4']/(2*np.sqrt(2*np.log(2))))**2
+    i0=frame.flux(p['3'])/(2*np.pi*sig2*p['9'])
+    return np.sqrt(2*sig2*np.clip(np.log(i0/level), 0, None))
+
+def _cut_moffat(p, frame, level):
+    pl=p['5']
+    rd2=p['4']**2/(4*(2**(1/pl)-1))
+    i0=frame.flux(p['3'])*(pl-1)/(np.pi*rd2*p['9'])
+    return np.sqrt(rd2*np.clip((i0/level)**(1/pl)-1, 0, None))
+
+cutoffs={
+    'sersic': _cut_sersic,
+    'devauc': _cut_devauc,
+    'expdisk': _cut_expdisk,
+    'gaussian': _cut_gaussian,
+    'moffat': _cut_moffat,
+    'king': lambda p, frame, level: p['5'],
+    'ferrer': lambda p, frame, level: p['4'],
+    'psf': lambda p, frame, level: np.ones_like(p['1']),
+}
+
+def _cutoff_box(name, vals, keys, frame, tol):
+    '''
+    box of pixels to render, as slices of image
+        covering all batched components
+
+    return None if all pixels are needed
+    '''
+    if tol is None or name not in cutoffs:
+        return None
+
+    p={k: vals[..., i] for i, k in enumerate(keys)}
+    level=tol*frame.flux(p['3'])
+    r=cutoffs[name](p, frame, level)+1
+
+    ny, nx=frame.shape
+    x0, y0=p['1'], p['2']
+    i0, j0=frame.index(np.min(x0-r), np.min(y0-r))
+    i1, j1=frame.index(np.max(x0+r), np.max(y0+r))
+    i0, i1=np.clip([np.floor(i0), np.ceil(i1)+1], 0, nx).astype(int)
+    j0, j1=np.clip([np.floor(j0), np.ceil(j1)+1], 0, ny).astype(int)
+    return slice(j0, max(j0, j1)), slice(i0, max(i0, i1))
+
+# render components
+def render_comp(name, vals, frame, oversample=1, osr=3, tol=None):
+    '''
+    image of a component
+
+    Parameters
+    ----------
+    name: str
+        name of model
+
+    vals: array-like, shape (..., nkeys)
+        values of parameters, ordered as `sorted_keys` of model
+
+    frame: Frame
+
+    oversample: int
+        factor of sub-pixel sampling for pixels near center
+
+    osr: int
+        half size of box near center to oversample, in pixel
+
+    tol: float or None
+        if given, only render pixels where profile is above
+            `tol` times total flux, which is much faster for small sources
+        it works for models with known profile cutoff,
+            and others are rendered in all pixels
+
+    Returns
+    -------
+    image with shape (..., ny, nx)
+    '''
+    vals=np.asarray(vals, dtype=float)
+    img=np.zeros(vals.shape[:-1]+frame.shape)
+    add_comp(img, name, vals, frame, oversample, osr, tol)
+    return img
+
+def add_comp(img, name, vals, frame, oversample=1, osr=3, tol=None):
+    '''
+    add image of a component to `img` in place
+
+    leading shape of `vals` should be broadcastable to that of `img`
+    '''
+    vals=np.asarray(vals, dtype=float)
+    keys=Model.get_model(name).sorted_keys
+    p={k: vals[..., i, None, None] for i, k in enumerate(keys)}
+
+    prof=profiles[name]
+    box=_cutoff_box(name, vals, keys, frame, tol)
+    if box is None:
+        box=(slice(0, frame.shape[0]), slice(0, frame.shape[1]))
+
+    sy, sx=box
+    img[..., sy, sx]+=prof(p, frame.x[None, sx], frame.y[sy, None], frame)
+
+    if oversample>1 and name not in no_oversample:
+        _oversample_center(img, prof, vals, keys, frame, box, oversample, osr)
+
+def _oversample_center(img, prof, vals, keys, frame, box, oversample, osr):
+    '''
+    correct pixels near center in image with sub-pixel sampling, in place
+        only pixels in `box` are corrected, which are rendered before
+    '''
+    sy, sx=box
+
+    # offsets of sub-pixels
+    sub=(np.arange(oversample)+0.5)/oversample-0.5
+
+    bshape=np.broadcast_shapes(vals.shape[:-1], img.shape[:-2])
+    vals=np.broadcast_to(vals, bshape+vals.shape[-1:])
+    for ind in np.ndindex(*bshape):
+        v=vals[ind]
+        x0, y0=[int(round(t)) for t in frame.index(v[0], v[1])]
+        r=osr*frame.sampling
+
+        i0, i1=max(x0-r, sx.start), min(x0+r+1, sx.stop)
+        j0, j1=max(y0-r, sy.start), min(y0+r+1, sy.stop)
+        if i0>=i1 or j0>=j1:
+            continue
+
+        x=frame.x[i0:i1]
+        y=frame.y[j0:j1]
+        xs=(x[:, None]+sub*frame.step).ravel()
+        ys=(y[:, None]+sub*frame.step).ravel()
+
+        p={k: v[i] for i, k in enumerate(keys)}
+        fine=prof(p, xs[None, :], ys[:, None], frame)
+        fine=fine.reshape(j1-j0, oversample, i1-i0, oversample)
+        coarse=prof(p, x[None, :], y[:, None], frame)
+        img[ind+(slice(j0, j1), slice(i0, i1))]+=fine.mean(axis=(1, 3))-coarse
+
+def render_comps(comps, frame, oversample=1, osr=3, tol=None):
+    '''
+    image of many components
+
+    Parameters
+    ----------
+    comps: list of (name, vals)
+        vals could be batched, with broadcastable leading shape
+
+    others: see `render_comp`
+    '''
+    comps=[(name, np.asarray(vals, dtype=float)) for name, vals in comps]
+    bshape=np.broadcast_shapes(*[v.shape[:-1] for _, v in comps])
+
+    img=np.zeros(bshape+frame.shape)
+    for name, vals in comps:
+        add_comp(img, name, vals, frame, oversample, osr, tol)
+    return img
+
+# user function
+def render(gf, oversample=1, osr=3, tol=None, skip=True, exptime=None):
+    '''
+    model image of a GalFit over region H, without PSF convolution
+
+    Parameters
+    ----------
+    gf: GalFit
+
+    oversample, osr, tol: see `render_comp`
+
+    skip: bool
+        whether to skip components with Z=1, as output of galfit
+
+    exptime: float or None
+        exposure time, if None, take from input image
+    '''
+    frame=Frame.from_galfit(gf, exptime=exptime)
+    return render_comps(galfit_comps(gf, skip=skip), frame,
+                        oversample, osr, tol)
+
+def galfit_comps(gf, skip=True):
+    '''
+    list of (name, vals) for components in GalFit
+    '''
+    comps=[]
+    for mod in gf.comps:
+        if skip and mod.Z.get():
+            continue
+        comps.append((mod.name, mod.vals))
+    return comps
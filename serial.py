@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+'''
+compact binary serialization of GalFit
+
+    it is used to cache templates on disk,
+        and to send them to other processes, see `GalFit.__reduce__`
+
+    layout of bytes:
+        magic, b'GFB1'
+        length of meta, uint32 little-endian
+        meta in JSON:
+            head, gfpath, logname, init_file, fit.log metrics,
+            names of components, constraints,
+            and descriptors of arrays (name, dtype, length)
+        arrays of parameters, concatenated by components:
+            val, tofit, uncert, flag (codes of `fitlog.flag_names`)
+        each array is padded to 8 bytes
+'''
+
+import os
+import json
+import struct
+import tempfile
+
+import numpy as np
+
+from .model import Model
+from .parameter import Parameter
+from .constraint import Constraint
+from .fitlog import flag_names, flag_codes
+
+magic=b'GFB1'
+
+# dtypes of arrays of parameters
+field_dtypes={
+    'val': '<f8',
+    'tofit': '<i1',
+    'uncert': '<f8',
+    'flag': '<u1',
+}
+
+# pack and unpack
+def _pack(meta, arrays):
+    '''
+    bytes of meta and arrays
+    '''
+    descrs=[]
+    chunks=[]
+    for name, arr in arrays.items():
+        arr=np.ascontiguousarray(arr, dtype=field_dtypes.get(name))
+        descrs.append([name, arr.dtype.str, len(arr)])
+
+        buf=arr.tobytes()
+        chunks.append(buf+b'\0'*(-len(buf)%8))
+    meta['arrays']=descrs
+
+    mbuf=json.dumps(meta, separators=(',', ':')).encode()
+    mbuf+=b' '*(-(len(mbuf)+8)%8)
+    return b''.join([magic, struct.pack('<I', len(mbuf)), mbuf, *chunks])
+
+def _unpack(data):
+    '''
+    meta and arrays from bytes
+    '''
+    data=memoryview(data)
+    if bytes(data[:4])!=magic:
+        raise Exception('invalid serialized GalFit')
+
+    mlen,=struct.unpack('<I', data[4:8])
+    meta=json.loads(bytes(data[8:8+mlen]))
+
+    arrays={}
+    offset=8+mlen
+    for name, dtype, n in meta['arrays']:
+        dtype=np.dtype(dtype)
+        arrays[name]=np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset+=-(-dtype.itemsize*n//8)*8
+    return meta, arrays
+
+# components
+def _comps_state(comps):
+    '''
+    meta and arrays of components
+    '''
+    names=[]
+    Zs=[]
+    fmts={}
+    vals, tofits, uncerts, flags=[], [], [], []
+    lists=(vals, tofits, uncerts, flags)
+    pdefaults=Parameter.default_values
+    for i, mod in enumerate(comps):
+        names.append(mod.name)
+        Zs.append(mod.Z.get())
+        if mod.fmt!=type(mod).fmt_value and type(mod.fmt) in (int, str):
+            fmts[i]=mod.fmt
+
+        # fields in arrays, see `parray`
+        if mod.parrs is not None:
+            parrs, sl=mod.parrs
+            for arr, f in zip(lists, Parameter.sorted_keys):
+                arr.extend(parrs.get_field(sl, f))
+            continue
+
+        # fields read directly, without loading fit.log pending
+        defaults=mod._get_defaults()
+        params=mod.params
+        for k in mod.sorted_keys:
+            p=params.get(k)
+            if p is None:
+                vals.append(defaults[k])
+                tofits.append(0)
+                uncerts.append(-1.)
+                flags.append('normal')
+                continue
+
+            fields=p.params
+            for arr, f, d in zip(lists, Parameter.sorted_keys, pdefaults):
+                arr.append(fields[f].get() if f in fields else d)
+
+    flags=[flag_codes[f] for f in flags]
+
+    meta={'names': names, 'Z': Zs, 'fmts': fmts}
+    arrays={'val': vals, 'tofit': tofits, 'uncert': uncerts, 'flag': flags}
+    return meta, arrays
+
+def _comps_from_state(meta, arrays):
+    '''
+    components from meta and arrays
+    '''
+    names=meta['names']
+    classes=[Model.get_model(name) for name in names]
+
+    # offsets of components in arrays
+    offsets=np.cumsum([0]+[len(c.sorted_keys) for c in classes])
+
+    # build models of same type at once
+    comps=[None]*len(names)
+    groups={}
+    for i, cls in enumerate(classes):
+        groups.setdefault(cls, []).append(i)
+
+    val, tofit=arrays['val'], arrays['tofit']
+    for cls, inds in groups.items():
+        rows=np.concatenate([np.arange(offsets[i], offsets[i+1]) for i in inds])
+        nkey=len(cls.sorted_keys)
+        mods=cls.from_arrays(val[rows].reshape(-1, nkey),
+                             tofit[rows].reshape(-1, nkey),
+                             Z=[meta['Z'][i] for i in inds])
+        for i, mod in zip(inds, mods):
+            comps[i]=mod
+
+    # uncertainties and flags, only those not default
+    uncert, flag=arrays['uncert'], arrays['flag']
+    for j in np.nonzero((uncert!=-1) | (flag!=0))[0]:
+        i=np.searchsorted(offsets, j, side='right')-1
+        p=comps[i]._get_param(comps[i].sorted_keys[j-offsets[i]])
+        p._set_param('uncert', float(uncert[j]))
+        p._set_param('flag', flag_names[flag[j]])
+
+    for i, fmt in meta['fmts'].items():
+        comps[int(i)].fmt=fmt
+
+    return comps
+
+# constraints
+def _cons_state(gf):
+    inds={id(mod): i for i, mod in enumerate(gf.comps)}
+
+    state=[]
+    for cons in gf.gfcons.cons:
+        item={'comps': [inds[id(mod)] for mod in cons.comps],
+              'param': cons.param,
+              'type': cons.cons_type,
+              'sep': cons.sep}
+        if cons.is_soft():
+            item['range']=list(cons.range)
+        state.append(item)
+    return state
+
+def _cons_from_state(gf, state):
+    for item in state:
+        cons=object.__new__(Constraint)
+        cons.comps=[gf.comps[i] for i in item['comps']]
+        cons.param=item['param']
+        cons.param_mod=cons.get_name_of_param_in_mod(cons.param)
+        cons.cons_type=item['type']
+        cons.sep=item['sep']
+        if 'range' in item:
+            cons.range=item['range']
+        gf.gfcons.cons.append(cons)
+
+# user function
+def dumps(gf):
+    '''
+    serialize GalFit to bytes
+    '''
+    meta, arrays=_comps_state(gf.comps)
+
+    meta['head']={k: p.get() for k, p in gf.head.params.items()}
+
+    # properties of GalFit, if set
+    props=gf.__dict__
+    for k in ['gfpath', 'logname', 'init_file', '_logfile',
+              *gf.log_props]:
+        if props.get(k) is not None:
+            meta[k]=props[k]
+    meta['parrs']=gf.parrs is not None
+
+    meta['cons']=_cons_state(gf)
+
+    return _pack(meta, arrays)
+
+def loads(data):
+    '''
+    GalFit from bytes given by `dumps`
+    '''
+    from .galfit import GalFit
+
+    meta, arrays=_unpack(data)
+
+    gf=GalFit()
+    for k, v in meta['head'].items():
+        gf.head._set_param(k, v)
+
+    gf.comps.extend(_comps_from_state(meta, arrays))
+    _cons_from_state(gf, meta['cons'])
+
+    for k in ['gfpath', 'logname', 'init_file', *gf.log_props]:
+        if k in meta:
+            setattr(gf, k, meta[k])
+
+    # fit.log pending
+    if '_logfile' in meta:
+        gf._logfile=meta['_logfile']
+        for mod in gf.comps:
+            mod.logloader=gf._load_pending_log
+
+    if meta['parrs']:
+        gf.use_arrays()
+
+    return gf
+
+def dump(gf, filename):
+    '''
+    write serialized GalFit to a file, atomically
+    '''
+    data=dumps(gf)
+
+    dirname=os.path.dirname(os.path.abspath(filename))
+    fd, tmpname=tempfile.mkstemp(dir=dirname, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
+def load(filename):
+    with open(filename, 'rb') as f:
+        return loads(f.read())
+
+## single component, used in pickle
+def dumps_comp(mod):
+    meta, arrays=_comps_state([mod])
+    meta['id']=mod.id
+    return _pack(meta, arrays)
+
+def loads_comp(data):
+    meta, arrays=_unpack(data)
+    mod=_comps_from_state(meta, arrays)[0]
+    mod.id=meta['id']
+    return mod
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+'''
+sigma image for templates with head C = none
+
+    sigma is computed from input data and header keywords
+        GAIN, RDNOISE, NCOMBINE and EXPTIME,
+    only within region H
+
+    sigma file has same size as input image, as needed by galfit,
+        but only rows in region are written, others left as holes,
+        which makes a sparse file in most file systems
+    it is cached per (input file, region) in a directory
+'''
+
+import os
+import hashlib
+import tempfile
+
+import numpy as np
+
+from .fitscache import split_hduid
+
+# keywords in header of input image, and default values
+sigma_keys={
+    'GAIN': 1.,
+    'RDNOISE': 0.,
+    'NCOMBINE': 1,
+    'EXPTIME': 1.,
+}
+
+def get_noise_params(gf, **kwargs):
+    '''
+    noise parameters from header of input image
+        values in `kwargs` take precedence, like GAIN=2.
+    '''
+    fhead=gf.get_input_head()
+
+    params={}
+    for k, v in sigma_keys.items():
+        if k in kwargs:
+            params[k]=kwargs[k]
+        else:
+            params[k]=type(v)(fhead.get(k, v))
+    return params
+
+def calc_sigma(data, GAIN=1., RDNOISE=0., NCOMBINE=1, EXPTIME=1.,
+                     per_second=False):
+    '''
+    sigma of data in ADU
+
+        sigma^2 = (data*g + NCOMBINE*RDNOISE^2)/g^2,
+            with effective gain g = GAIN*NCOMBINE,
+                 multiplied by EXPTIME if data is in ADU per second
+        negative data is taken as 0 in Poisson noise
+
+    Attention:
+        data should contain sky, otherwise noise of sky is missed
+    '''
+    gain=GAIN*NCOMBINE
+    if per_second:
+        gain*=EXPTIME
+
+    var=np.clip(data, 0, None)*gain+NCOMBINE*RDNOISE**2
+    sigma=np.sqrt(var)/gain
+
+    # avoid zero sigma
+    return np.where(sigma>0, sigma, np.inf)
+
+def sigma_region(gf, per_second=False, **kwargs):
+    '''
+    sigma in region H of a template
+
+    kwargs: noise parameters, see `get_noise_params`
+    '''
+    data=gf.get_input_data_region(dtype=float)
+    params=get_noise_params(gf, **kwargs)
+    return calc_sigma(data, per_second=per_second, **params)
+
+# write sigma file
+def sigma_key(gf, per_second=False, **kwargs):
+    '''
+    key of sigma for (input file, region, noise parameters)
+    '''
+    fname, hduid=split_hduid(gf.get_abs_hdp('input'))
+    st=os.stat(fname)
+
+    params=get_noise_params(gf, **kwargs)
+    items=[os.path.abspath(fname), hduid, st.st_size, st.st_mtime_ns,
+           gf.head.get_pval('region'), sorted(params.items()), per_second]
+    return hashlib.sha256(repr(items).encode()).hexdigest()
+
+def write_sparse(fname, shape, region, data):
+    '''
+    write float32 fits with given shape, where only data in region is filled
+
+    region: [xmin, xmax, ymin, ymax], 1-based and inclusive
+    '''
+    from astropy.io import fits
+
+    ny, nx=shape
+    xmin, xmax, ymin, ymax=region
+
+    header=fits.Header()
+    header['SIMPLE']=True
+    header['BITPIX']=-32
+    header['NAXIS']=2
+    header['NAXIS1']=nx
+    header['NAXIS2']=ny
+    header['COMMENT']='sigma generated in region %i %i %i %i' % tuple(region)
+    hstr=header.tostring().encode()
+
+    ndata=nx*ny*4
+    nbytes=len(hstr)+-(-ndata//2880)*2880
+
+    rows=np.asarray(data, dtype='>f4')
+    with open(fname, 'wb') as f:
+        f.write(hstr)
+        f.truncate(nbytes)   # holes, filled with zeros when read
+        for j, row in enumerate(rows, ymin-1):
+            f.seek(len(hstr)+(j*nx+xmin-1)*4)
+            f.write(row.tobytes())
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser('~'), '.cache', 'galfit', 'sigma')
+
+# user function
+def make_sigma(gf, cache_dir=None, per_second=False, **kwargs):
+    '''
+    generate sigma file for a template, and point head C to it
+
+    Parameters
+    ----------
+    cache_dir: str or None
+        directory of sigma files, default ~/.cache/galfit/sigma
+        file exists for same (input file, region) is reused
+
+    per_second: bool
+        whether input image is in unit of ADU per second
+
+    kwargs: noise parameters, see `get_noise_params`
+
+    Returns
+    -------
+    name of sigma file
+    '''
+    if cache_dir is None:
+        cache_dir=default_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    key=sigma_key(gf, per_second=per_second, **kwargs)
+    fname=os.path.join(cache_dir, 'sigma_%s.fits' % key)
+
+    if not os.path.isfile(fname):
+        sigma=sigma_region(gf, per_second=per_second, **kwargs)
+        sigma=np.where(np.isfinite(sigma), sigma, 0)  # 0 for bad in galfit
+
+        # write atomically
+        fd, tmpname=tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            write_sparse(tmpname, gf.get_input_shape(),
+                         gf.head.get_pval('region'), sigma)
+            os.replace(tmpname, fname)
+        except:
+            os.remove(tmpname)
+            raise
+
+    gf.head.sigma=os.path.relpath(fname, gf.gfpath)
+    return fname
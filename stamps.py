@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+'''
+stream stamps and templates for objects in a large mosaic
+
+    for each object in catalog, it gives
+        region of stamp in mosaic
+        stamp cutout, read from memory-mapped mosaic
+        template with Sersic and Sky components, ready to run
+
+    header of mosaic is read once,
+        and cutouts are written by a thread pool,
+        with bounded number of pending writes,
+    so memory use does not grow with size of catalog
+'''
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .fitscache import get_hdu, get_shape
+
+# keywords copied from mosaic to cutout
+copy_keys=['EXPTIME', 'GAIN', 'RDNOISE', 'NCOMBINE', 'BUNIT', 'MAGZERO']
+
+class Stamp:
+    '''
+    stamp of an object
+
+    Properties
+    ----------
+    index: int
+        index in catalog
+
+    name: str
+        name of object, used as directory of stamp
+
+    region: [xmin, xmax, ymin, ymax]
+        region in mosaic, 1-based and inclusive
+
+    fitsname, gfname: str
+        file of cutout and template
+
+    gf: GalFit
+        template
+    '''
+    def __init__(self, index, name, region, fitsname, gfname, gf):
+        self.index=index
+        self.name=name
+        self.region=region
+        self.fitsname=fitsname
+        self.gfname=gfname
+        self.gf=gf
+
+    def __repr__(self):
+        return 'Stamp(%s, region=%s)' % (self.name, self.region)
+
+# region of stamp
+def in_mosaic(x, y, shape):
+    '''
+    whether center (x, y) is in mosaic
+    '''
+    ny, nx=shape
+    return 1<=int(round(x))<=nx and 1<=int(round(y))<=ny
+
+def stamp_region(x, y, size, shape, factor=5, minhalf=10, maxhalf=200):
+    '''
+    region of stamp around (x, y), within mosaic
+
+    Parameters
+    ----------
+    size: float
+        size of object, e.g. effective radius, in pixel
+        half width of stamp is `factor` times it, bounded in [minhalf, maxhalf]
+
+    shape: (ny, nx)
+        shape of mosaic
+
+    center (x, y) should be in mosaic,
+        otherwise no valid region and exception raised
+    '''
+    if not in_mosaic(x, y, shape):
+        raise Exception('object at (%g, %g) is out of mosaic' % (x, y))
+
+    ny, nx=shape
+    xc, yc=int(round(x)), int(round(y))
+    half=int(np.clip(np.ceil(factor*size), minhalf, maxhalf))
+    return [max(xc-half, 1), min(xc+half, nx),
+            max(yc-half, 1), min(yc+half, ny)]
+
+# mosaic
+def mosaic_data(hdu):
+    '''
+    memory-mapped data of mosaic
+        for scaled data, like with BZERO, use section,
+        to avoid scaling whole image
+    '''
+    header=hdu.header
+    if 'BSCALE' in header or 'BZERO' in header:
+        return hdu.section
+    return hdu.data
+
+def mosaic_wcs(header):
+    '''
+    celestial WCS of mosaic, or None
+    '''
+    import warnings
+    from astropy.wcs import WCS
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            wcs=WCS(header)
+    except Exception:
+        return None
+
+    if not wcs.has_celestial:
+        return None
+    return wcs
+
+# cutout
+def cutout_header(header, region, wcs=None):
+    '''
+    header of cutout, with WCS shifted to region
+
+    wcs: WCS of mosaic, or None
+    '''
+    from astropy.io import fits
+
+    xmin, xmax, ymin, ymax=region
+
+    hdr=fits.Header()
+    for k in copy_keys:
+        if k in header:
+            hdr[k]=header[k]
+
+    if wcs is not None:
+        hdr.update(wcs[(ymin-1):ymax, (xmin-1):xmax].to_header())
+
+    # offset to mosaic, as IRAF
+    hdr['LTV1']=-(xmin-1)
+    hdr['LTV2']=-(ymin-1)
+    return hdr
+
+def write_cutout(fitsname, data, header):
+    '''
+    write data of cutout
+    '''
+    from astropy.io import fits
+    fits.PrimaryHDU(data, header=header).writeto(fitsname, overwrite=True)
+
+# template
+def make_template(stamp_dir, region, x, y, mag, size, ba, pa,
+                  n=2.5, sky=0., zerop=None, pscale=None, psf=None,
+                  fitsname='stamp.fits'):
+    '''
+    template with Sersic and Sky for a stamp
+        coordinates are converted to those in cutout
+    '''
+    from .galfit import GalFit
+
+    gf=GalFit()
+    gf.gfpath=os.path.abspath(stamp_dir)
+
+    xmin, xmax, ymin, ymax=region
+    head=gf.head
+    head.input=fitsname
+    head.output='imgblock.fits'
+    head.region=[1, xmax-xmin+1, 1, ymax-ymin+1]
+    head.conv=[xmax-xmin+1, ymax-ymin+1]
+    if psf is not None:
+        head.psf=os.path.relpath(os.path.abspath(psf), gf.gfpath)
+    if zerop is not None:
+        head.zerop=zerop
+    if pscale is not None:
+        head.pscale=pscale
+
+    gf.add_sersic(vals=[x-xmin+1, y-ymin+1, mag, size, n, ba, pa],
+                  tofits=[1]*7)
+    gf.add_sky(vals=[sky, 0, 0], tofits=[1, 0, 0])
+    return gf
+
+# user function
+def iter_stamps(cat, mosaic, outdir, names=None, workers=4, max_pending=64,
+                     factor=5, minhalf=10, maxhalf=200, skip_outside=True,
+                     **kwargs):
+    '''
+    stream stamps and templates for objects in catalog
+
+    Parameters
+    ----------
+    cat: dict-like of arrays
+        with keys x, y, mag, size, ba, pa,
+            coordinates are 1-based pixels in mosaic
+        arrays could be memory-mapped, read row by row
+
+    mosaic: str
+        fits file of mosaic, like 'a.fits' or 'a.fits[1]'
+
+    outdir: str
+        directory of outputs
+        for each object, a sub-directory is created with
+            stamp.fits: cutout
+            galfit.01: template
+
+    names: list of str or None
+        names of objects, used as sub-directories
+        if None, use index in catalog, like '000012'
+
+    workers: int
+        number of threads to write cutouts and templates
+
+    max_pending: int
+        max number of stamps pending to write,
+            which bounds cutouts held in memory
+
+    factor, minhalf, maxhalf: size of stamps, see `stamp_region`
+
+    skip_outside: bool
+        whether to skip objects with center out of mosaic
+        if False, exception is raised for them
+
+    kwargs: optional arguments for `make_template`,
+        like zerop, pscale, psf, n, sky
+
+    Yields
+    ------
+    Stamp, after its files are written, in order of catalog
+        objects skipped are not yielded
+    '''
+    # header is read only once
+    hdu=get_hdu(mosaic)
+    header=hdu.header
+    shape=get_shape(hdu)
+    wcs=mosaic_wcs(header)
+    mdata=mosaic_data(hdu)
+
+    nobj=len(cat['x'])
+
+    # data is read in main thread, since file handle of mosaic is shared
+    def write(stamp, data):
+        os.makedirs(os.path.dirname(stamp.fitsname), exist_ok=True)
+        write_cutout(stamp.fitsname, data,
+                     cutout_header(header, stamp.region, wcs))
+        stamp.gf.writeto_file(stamp.gfname)
+        return stamp
+
+    pending=deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i in range(nobj):
+            x, y, mag, size, ba, pa=[float(cat[k][i]) for k in
+                                        ('x', 'y', 'mag', 'size', 'ba', 'pa')]
+            if skip_outside and not in_mosaic(x, y, shape):
+                continue
+
+            name=names[i] if names is not None else '%06i' % i
+            stamp_dir=os.path.join(outdir, name)
+
+            region=stamp_region(x, y, size, shape, factor, minhalf, maxhalf)
+            gf=make_template(stamp_dir, region, x, y, mag, size, ba, pa,
+                             **kwargs)
+
+            stamp=Stamp(i, name, region,
+                        os.path.join(stamp_dir, gf.head.get_pval('input')),
+                        os.path.join(stamp_dir, 'galfit.01'), gf)
+            xmin, xmax, ymin, ymax=region
+            data=np.array(mdata[(ymin-1):ymax, (xmin-1):xmax])
+            pending.append(executor.submit(write, stamp, data))
+
+            while len(pending)>=max_pending:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
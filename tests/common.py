@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+'''
+common tools for tests
+'''
+
+import os
+import sys
+import importlib
+
+# import modules of the package from its source directory
+pkgdir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+pkgname=os.path.basename(pkgdir)
+if os.path.dirname(pkgdir) not in sys.path:
+    sys.path.insert(0, os.path.dirname(pkgdir))
+
+def import_module(name):
+    return importlib.import_module('%s.%s' % (pkgname, name))
+
+# a template with head paths, hidden parameters and comments
+template='''#  Input menu file: galfit.00
+#  Chi^2/nu = 1.234,  Chi^2 = 123.4,  Ndof = 100
+
+================================================================================
+# IMAGE and GALFIT CONTROL PARAMETERS
+A) img.fits            # Input data image (FITS file)
+B) imgblock.fits       # Output data image block
+C) none                # Sigma image
+D) psf.fits            # Input PSF image
+E) 1                   # PSF fine sampling factor relative to data
+F) none                # Bad pixel mask
+G) none                # File with parameter constraints (ASCII file)
+H) 1 50 1 40           # Image region
+I) 20 20               # Size for convolution (x y)
+J) 25.000              # Magnitude photometric zeropoint
+K) 0.060 0.060         # Plate scale (dx dy)   [arcsec per pixel]
+O) regular             # Display type (regular, curses, both)
+P) 0                   # 0=optimize, 1=model, 2=imgblock, 3=subcomps
+
+# Component number: 1
+ 0) sersic                   # Component type
+ 1) 25.0000 20.0000 1 1      # Position x, y
+ 3) 18.0000     1            # Integrated magnitude
+ 4) 5.0000      1            # R_e (effective radius) [pix]
+ 5) 2.5000      1            # Sersic index n (de Vaucouleurs n=4)
+ 9) 0.7000      1            # Axis ratio (b/a)
+10) 30.0000     1            # Position angle [deg: Up=0, Left=90]
+C0) 0.1000      1            # diskyness(-)/boxyness(+)
+ Z) 0                        # Skip this model? (yes=1, no=0)
+
+# Component number: 2
+ 0) sky                      # Component type
+ 1) 0.1000      1            # Sky background at center of fitting region [ADUs]
+ 2) 0.0000      0            # dsky/dx (sky gradient in x)
+ 3) 0.0000      0            # dsky/dy (sky gradient in y)
+ Z) 0                        # Skip this model? (yes=1, no=0)
+
+================================================================================
+'''
+
+def write_template(path, fname='galfit.01', text=template):
+    fname=os.path.join(str(path), fname)
+    with open(fname, 'w') as f:
+        f.write(text)
+    return fname
+
+def read(fname):
+    with open(str(fname)) as f:
+        return f.read()
+
+def galfit_all_models():
+    '''
+    GalFit with one component of every model, and the last one skipped
+    '''
+    GalFit=import_module('galfit').GalFit
+    Model=import_module('model').Model
+
+    gf=GalFit()
+    gf.region=[1, 100, 1, 80]
+    for name, cls in sorted(Model.get_all_models().items()):
+        vals=[10.*(i+1)+0.123456 for i in range(len(cls.sorted_keys))]
+        tofits=[i%2 for i in range(len(cls.sorted_keys))]
+        gf.add_comp(name, vals=vals, tofits=tofits)
+    gf.comps[-1].skip_mod()
+    return gf
+
+# stamp of a sersic on sky, with image, sigma and PSF in fits files
+stamp_comps=[
+    ('sersic', [25.3, 20.6, 16., 4., 1.5, 0.7, 30.]),
+    ('sky', [1., 0., 0.]),
+]
+
+def write_fits(fname, data, header=None):
+    from astropy.io import fits
+    hdu=fits.PrimaryHDU(data)
+    if header:
+        hdu.header.update(header)
+    hdu.writeto(str(fname), overwrite=True)
+
+def write_stamp(path, shape=(40, 50), noise=0.5, seed=0):
+    '''
+    write a stamp of `stamp_comps` convolved with a gaussian PSF
+
+    return name of template, which has true parameters
+    '''
+    import numpy as np
+    GalFit=import_module('galfit').GalFit
+    render_convolved=import_module('convolve').render_convolved
+
+    path=str(path)
+    ny, nx=shape
+
+    y, x=np.mgrid[-7:8, -7:8]
+    write_fits(os.path.join(path, 'psf.fits'), np.exp(-0.5*(x*x+y*y)/1.5**2))
+    write_fits(os.path.join(path, 'sigma.fits'), np.full(shape, noise))
+
+    gf=GalFit()
+    gf.gfpath=path
+    gf.head.input='img.fits'
+    gf.head.sigma='sigma.fits'
+    gf.head.psf='psf.fits'
+    gf.head.region=[1, nx, 1, ny]
+    gf.head.conv=[nx, ny]
+    gf.head.zerop=25.
+    for name, vals in stamp_comps:
+        gf.add_comp(name, vals=vals)
+
+    img=render_convolved(gf, exptime=1., oversample=5)
+    img+=np.random.default_rng(seed).normal(0, noise, shape)
+    write_fits(os.path.join(path, 'img.fits'), img, {'EXPTIME': 1.})
+
+    return gf.writeto_file(os.path.join(path, 'galfit.01'))
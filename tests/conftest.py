@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import import_module
+
+# fake galfit: copy template to result, with comments of galfit
+fake_galfit='''#!%s
+import sys
+init=sys.argv[1]
+text=open(init).read()
+with open('galfit.02', 'w') as f:
+    f.write('#  Input menu file: %%s\\n' %% init)
+    f.write('#  Chi^2/nu = 1.000,  Chi^2 = 10.000,  Ndof = 10\\n\\n')
+    f.write(text[text.index('===='):])
+head={}
+for line in text.split('\\n'):
+    if line[:2] in ('A)', 'B)'):
+        head[line[0]]=line.split()[1]
+with open('fit.log', 'a') as f:
+    f.write('Input image     : %%s[1:50,1:40]\\n' %% head['A'])
+    f.write('Init. par. file : %%s\\n' %% init)
+    f.write('Restart file    : galfit.02\\n')
+    f.write('Output image    : %%s\\n' %% head['B'])
+''' % sys.executable
+
+@pytest.fixture
+def galfit(tmp_path, monkeypatch):
+    '''
+    directory of data, with galfit replaced by the fake one
+    '''
+    exe=tmp_path/'fake_galfit'
+    exe.write_text(fake_galfit)
+    exe.chmod(0o755)
+    monkeypatch.setattr(import_module('batch'), 'galfit_exe', str(exe))
+
+    data=tmp_path/'data'
+    data.mkdir()
+    return data
@@ -0,0 +1,60 @@
+import pytest
+
+from common import import_module, write_template
+
+GalFit=import_module('galfit').GalFit
+Model=import_module('model').Model
+Parameter=import_module('parameter').Parameter
+
+@pytest.fixture
+def fname(tmp_path):
+    return write_template(tmp_path)
+
+def test_model_aliases():
+    mod=Model.get_model('sersic')()
+    assert mod.re==mod._get_param('4').get()==10
+
+    mod.re=3
+    mod.pa=45
+    assert mod.vals[3]==3 and mod.vals[6]==45
+    assert isinstance(mod.par_re, Parameter)
+    assert mod.par_re is mod._get_param('4')
+
+    mod.par_re.set_val(4)
+    mod.par_re.set_tofit(1)
+    assert mod.re==4 and mod.par_re.get_tofit().get()==1
+
+def test_model_fields():
+    mod=Model.get_model('sersic')()
+    mod.set_vals([1, 2, 18, 5, 2.5, 0.7, 30])
+    mod.set_tofits({'4': 1, '9': 1})
+    mod.set_uncerts([0.1]*7)
+    mod.set_flags(['']*6+['*'])
+
+    assert mod.vals==[1, 2, 18, 5, 2.5, 0.7, 30]
+    assert mod.tofits==[0, 0, 0, 1, 0, 1, 0]
+    assert mod.uncerts==[0.1]*7
+    assert mod.flags==['']*6+['*']
+    assert ' 4) 5.0000      1 ' in str(mod)
+
+def test_fallback(fname):
+    # left to `__getattr__`
+    gf=GalFit(fname)
+    mod=gf.comps[0]
+    assert tuple(mod.xy)==(25, 20)
+    assert mod.Z.get()==0
+
+    mod.skip_mod()
+    assert mod.Z.get()==1
+
+def test_head_accessors(fname):
+    gf=GalFit(fname)
+    assert gf.region==gf.head.region==[1, 50, 1, 40]
+    assert gf.zerop==25
+
+    gf.chinput('new.fits')
+    gf.set_zerop(26)
+    gf.set_region([1, 20, 1, 30])
+    assert gf.input.endswith('new.fits')
+    assert gf.head.zerop==26
+    assert 'H) 1 20 1 30 ' in str(gf)
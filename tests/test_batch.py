@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from common import import_module, write_template, read
+
+batch=import_module('batch')
+tools=import_module('tools')
+
+def test_rewrite_head_paths(tmp_path):
+    src=str(tmp_path/'a')
+    dest=str(tmp_path/'b')
+    os.makedirs(src)
+    os.makedirs(dest)
+
+    text=read(write_template(tmp_path))
+    new=batch.rewrite_head_paths(text, src, dest)
+    assert 'A) ../a/img.fits ' in new
+    assert 'D) ../a/psf.fits ' in new
+    assert 'C) none ' in new
+
+    # other lines kept
+    lines=[l for l in text.split('\n') if l[:2] not in ('A)', 'B)', 'D)')]
+    assert [l for l in new.split('\n') if l[:2] not in ('A)', 'B)', 'D)')]==lines
+
+def test_run_keeps_hidden_params(galfit):
+    init=write_template(galfit)
+    result=tools.gfname(tools.rungf(init), str(galfit))
+
+    text=read(result)
+    assert text.startswith('#  Input menu file: galfit.01\n')
+    assert '#  Chi^2/nu = 1.000' in text
+    assert 'C0) 0.1000      1 ' in text
+    assert 'A) img.fits ' in text
+    assert 'B) imgblock.fits ' in text
+
+    log=read(galfit/'fit.log')
+    assert 'Init. par. file : galfit.01' in log
+    assert 'Restart file    : %s' % os.path.basename(result) in log
+
+    # paths of images relative to directory of fit.log
+    assert 'Input image     : img.fits[1:50,1:40]\n' in log
+    assert 'Output image    : imgblock.fits\n' in log
+
+def test_rewrite_log_paths(tmp_path):
+    log='''Input image     : img.fits[1:50,1:40]
+Init. par. file : galfit.01
+Output image    : out/imgblock.fits
+'''
+    new=batch.rewrite_log_paths(log, str(tmp_path/'a'), str(tmp_path/'b'))
+    assert new=='''Input image     : ../a/img.fits[1:50,1:40]
+Init. par. file : galfit.01
+Output image    : ../a/out/imgblock.fits
+'''
+
+def test_run_change(galfit):
+    init=write_template(galfit)
+
+    def change(gf):
+        gf.comps[0].mag=17
+
+    result=tools.gfname(tools.rungf(init, change), str(galfit))
+    assert os.path.basename(result)=='galfit.03'
+    assert 'Input menu file: galfit.02' in read(result)
+    assert '17' in read(galfit/'galfit.02')
+
+def test_run_many(galfit):
+    inits=[write_template(galfit, 'galfit.%02i' % i) for i in (1, 11, 21)]
+    results=batch.rungf_many(inits, workers=3)
+    assert [os.path.basename(r) for r in results]==\
+                ['galfit.02', 'galfit.12', 'galfit.22']
+    for r in results:
+        assert 'C0) 0.1000' in read(r)
+
+def test_cache(galfit, tmp_path, monkeypatch):
+    cache=str(tmp_path/'cache')
+    init=write_template(galfit)
+    first=read(tools.gfname(tools.rungf(init, cache=cache), str(galfit)))
+
+    # restored without galfit
+    monkeypatch.setattr(batch, 'galfit_exe', str(tmp_path/'missing'))
+    second=read(tools.gfname(tools.rungf(init, cache=cache), str(galfit)))
+    assert second==first
+
+    # paths of images in log from cache
+    log=read(galfit/'fit.log')
+    assert log.count('Input image     : img.fits[1:50,1:40]\n')==2
+    assert log.count('Output image    : imgblock.fits\n')==2
+    assert 'C0) 0.1000' in second
+
+    # hidden parameters are in key
+    text=read(init).replace('C0) 0.1000', 'C0) 0.2000')
+    init=write_template(galfit, 'galfit.11', text)
+    with pytest.raises(Exception):
+        tools.rungf(init, cache=cache)
+
+def test_release_on_write_failure(galfit, monkeypatch):
+    GalFit=import_module('galfit').GalFit
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(GalFit, 'writeto_file', fail)
+
+    init=write_template(galfit)
+    with pytest.raises(OSError):
+        tools.rungf(init, change=lambda gf: None)
+    assert sorted(os.listdir(galfit))==['galfit.01']
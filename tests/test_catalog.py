@@ -0,0 +1,96 @@
+import numpy as np
+
+from common import import_module, write_template
+
+catalog=import_module('catalog')
+GalFit=import_module('galfit').GalFit
+Sersic=import_module('model').Model.get_model('sersic')
+
+def test_load_many_matches_galfit(tmp_path):
+    # hidden parameter C0 has no column
+    fnames=[write_template(tmp_path, 'galfit.%02i' % i) for i in (1, 2)]
+    table=catalog.load_many(fnames, workers=1)
+
+    assert table['id'].tolist()==[1, 2, 1, 2]
+    assert table['name'].tolist()==['sersic', 'sky']*2
+    assert table['file'].tolist()==[fnames[0]]*2+[fnames[1]]*2
+    assert table['init_file'].tolist()==['galfit.00']*4
+    assert table['J'].tolist()==[25.]*4
+    assert table['H'].tolist()==[[1, 50, 1, 40]]*4
+
+    gf=GalFit(fnames[0])
+    for i, mod in enumerate(gf.comps):
+        cols=[catalog.param_index[k] for k in mod.sorted_keys]
+        assert table['val'][i, cols].tolist()==mod.vals
+        assert table['tofit'][i, cols].tolist()==mod.tofits
+
+        rest=np.ones(len(catalog.param_keys), dtype=bool)
+        rest[cols]=False
+        assert np.isnan(table['val'][i, rest]).all()
+        assert (table['tofit'][i, rest]==-1).all()
+
+    assert np.isnan(table['uncert']).all()
+    assert (table['flag']=='').all()
+
+def test_load_many_empty():
+    table=catalog.load_many([], workers=1)
+    assert table['val'].shape==(0, len(catalog.param_keys))
+    assert table['id'].shape==(0,)
+
+def test_from_arrays_same_as_set():
+    mods=Sersic.from_arrays({'1': [1, 2], 'mag': [18, 19]}, tofits=[1]*7, Z=[0, 1])
+
+    mod=Sersic()
+    mod.set_vals([2, 0, 19, 10, 2, 1, 0])
+    mod.set_tofits([1]*7)
+    mod.skip_mod()
+
+    assert str(mods[1])==str(mod)
+    assert mods[0].Z.get()==0
+    assert mods[1].re==10
+
+    # parameters not shared between models
+    mods[0].re=3
+    assert mods[0].vals[3]==3 and mods[1].re==10
+
+def test_from_arrays_invalid():
+    for vals in [{'foo': [1]}, np.zeros((2, 3))]:
+        try:
+            Sersic.from_arrays(vals)
+        except Exception:
+            continue
+        raise AssertionError('no exception for %s' % vals)
+
+def test_build_many_round_trip(tmp_path):
+    vals=np.array([[25, 20, 18, 5, 2.5, 0.7, 30],
+                   [26, 21, 19, 6, 1.5, 0.5, 60.]])
+    gfs=GalFit.from_arrays([('sersic', vals, [1]*7),
+                            ('sky', {'1': [0.1, 0.2]})],
+                           head={'zerop': 26},
+                           heads={'input': ['a.fits', 'b.fits']},
+                           gfpath=str(tmp_path))
+    assert len(gfs)==2
+
+    fnames=[]
+    for i, gf in enumerate(gfs):
+        fnames.append(str(tmp_path/('galfit.%02i' % (i+1))))
+        gf.writeto(fnames[-1])
+
+    table=catalog.load_many(fnames, workers=1)
+    assert table['name'].tolist()==['sersic', 'sky']*2
+    assert table['A'].tolist()==['a.fits']*2+['b.fits']*2
+    assert table['J'].tolist()==[26.]*4
+
+    cols=[catalog.param_index[k] for k in Sersic.sorted_keys]
+    assert np.allclose(table['val'][::2][:, cols], vals)
+    assert (table['tofit'][::2][:, cols]==1).all()
+    assert table['val'][1::2, catalog.param_index['1']].tolist()==[0.1, 0.2]
+
+def test_build_many_mismatch():
+    try:
+        GalFit.from_arrays([('sersic', np.zeros((2, 7))),
+                            ('sky', np.zeros((3, 3)))])
+    except Exception as e:
+        assert 'mismatched' in str(e)
+    else:
+        raise AssertionError('no exception for mismatched arrays')
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from common import import_module, write_stamp, stamp_comps
+
+GalFit=import_module('galfit').GalFit
+chisq=import_module('chisq')
+render_convolved=import_module('convolve').render_convolved
+fitscache=import_module('fitscache')
+
+@pytest.fixture
+def fname(tmp_path):
+    return write_stamp(tmp_path)
+
+def chisq_direct(gf, **kwargs):
+    '''
+    chi-square from rendered model, with Z=1 components skipped
+    '''
+    data=gf.get_input_data_region(dtype=float)
+    sigma=fitscache.get_data_region(gf.get_fits_hdu(gf.get_abs_hdp('sigma')),
+                                    gf.head.get_pval('region'), dtype=float)
+    model=render_convolved(gf, skip=True, **kwargs)
+    return np.sum(((data-model)/sigma)**2)
+
+def test_truth(fname):
+    gf=GalFit(fname)
+    gf.comps[0].free_all()
+
+    c, ndof, rchisq=chisq.eval_chisq(gf, oversample=5)
+    assert ndof==40*50-7
+    assert abs(c-40*50)<300
+    assert np.isclose(c, chisq_direct(gf, oversample=5))
+
+    # worse away from truth
+    gf.comps[0].mag=16.5
+    assert chisq.eval_chisq(gf, oversample=5)[0]>2*c
+
+def test_batch(fname):
+    gf=GalFit(fname)
+    ev=chisq.ChiSquare(gf, chunk=2)
+    vec=chisq.get_vector(gf)
+    vecs=np.tile(vec, (5, 1))
+    vecs[:, 2]+=np.linspace(-0.2, 0.2, 5)
+
+    cs=ev(vecs.reshape(5, 1, -1))
+    assert cs.shape==(5, 1)
+    for v, c in zip(vecs, cs[:, 0]):
+        assert np.isclose(c, ev(v))
+    assert np.argmin(cs[:, 0])==2
+
+def test_skip_comp(fname):
+    gf=GalFit(fname)
+    c0=chisq.eval_chisq(gf)[0]
+
+    gf.add_comp('gaussian', vals=[10., 10., 15., 3., 1., 0.], tofits=[1]*6)
+    gf.comps[-1].skip_mod()
+    assert len(chisq.get_vector(gf))==sum([len(v) for _, v in stamp_comps])
+
+    c, ndof, _=chisq.eval_chisq(gf)
+    assert c==c0 and ndof==40*50
+    assert np.isclose(c, chisq_direct(gf))
+
+    # a skipped component in the middle
+    gf.comps[0].skip_mod()
+    gf.comps[-1].keep_mod()
+    assert np.isclose(chisq.eval_chisq(gf)[0], chisq_direct(gf))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from common import import_module, write_stamp
+
+GalFit=import_module('galfit').GalFit
+convolve=import_module('convolve')
+render=import_module('render')
+
+def gauss_psf(sig=1.5, half=7):
+    y, x=np.mgrid[-half:half+1, -half:half+1]
+    return np.exp(-0.5*(x*x+y*y)/sig**2)
+
+def test_convolve_delta():
+    psf=gauss_psf()
+    img=np.zeros((2, 30, 40))
+    img[0, 12, 20]=3.
+    img[1, 10, 15]=1.
+
+    cache=convolve.PSFCache()
+    conv=convolve.convolve(img, psf, key='psf', cache=cache)
+    assert conv.shape==img.shape
+    assert np.allclose(conv[0, 5:20, 13:28], 3*psf/psf.sum())
+    assert np.allclose(conv.sum(axis=(1, 2)), [3., 1.])
+    assert len(cache)==1
+
+def test_psf_cache_lru():
+    cache=convolve.PSFCache(maxsize=2)
+    psf=gauss_psf()
+    for key in ['a', 'b', 'a', 'c']:
+        cache.get_fft(psf, (32, 32), key=key)
+    assert len(cache)==2
+    assert ('b', (32, 32)) not in cache.items
+    assert ('a', (32, 32)) in cache.items
+
+def test_rebin():
+    img=np.arange(16.).reshape(4, 4)
+    assert np.allclose(convolve.rebin(img, 2), [[2.5, 4.5], [10.5, 12.5]])
+
+@pytest.fixture
+def gf(tmp_path):
+    return GalFit(write_stamp(tmp_path))
+
+def test_convolved_flux(gf):
+    # light of sersic kept by convolution, apart from that out of region
+    gf.comps[1].skip_mod()
+    img=convolve.render_convolved(gf, exptime=1., oversample=5)
+    raw=render.render(gf, exptime=1., oversample=5)
+    assert np.isclose(img.sum(), raw.sum(), rtol=0.01)
+
+    # PSF is centered
+    y, x=np.mgrid[1:41, 1:51]
+    assert np.isclose((img*x).sum()/img.sum(), (raw*x).sum()/raw.sum(),
+                      atol=0.02)
+    assert np.isclose((img*y).sum()/img.sum(), (raw*y).sum()/raw.sum(),
+                      atol=0.02)
+
+def test_psf_extension(gf, tmp_path):
+    from astropy.io import fits
+
+    psf=fits.getdata(str(tmp_path/'psf.fits'))
+    fits.HDUList([fits.PrimaryHDU(), fits.ImageHDU(psf)]).writeto(
+        str(tmp_path/'psfs.fits'))
+
+    img0=convolve.render_convolved(gf, exptime=1.)
+
+    gf.head.psf='psfs.fits[1]'
+    renderer=convolve.ConvolvedRenderer(gf, exptime=1.)
+    assert renderer.key[:2]==(str(tmp_path/'psfs.fits'), 1)
+    img=renderer(render.galfit_comps(gf))
+    assert np.allclose(img, img0)
@@ -0,0 +1,163 @@
+import os
+
+import numpy as np
+import pytest
+
+from common import import_module
+
+fitlog=import_module('fitlog')
+
+entry='''-----------------------------------------------------------------------------
+
+Input image     : input.fits[1:100,1:100]
+Init. par. file : %s
+Restart file    : %s
+Output image    : out.fits
+
+ sersic    : (   50.20,    49.80)   %5.2f     10.32    2.54    0.80    30.12
+               (    0.01,     0.01)    0.01      0.10    0.02    0.01     0.50
+ Chi^2 = 10000.12345,  ndof = 9993
+ Chi^2/nu = 1.001
+
+'''
+
+def write_log(fname, runs, mode='w', mtime=None):
+    with open(fname, mode) as f:
+        for init, result, mag in runs:
+            f.write(entry % (init, result, mag))
+    if mtime is not None:
+        os.utime(fname, ns=(mtime, mtime))
+
+def get_mag(logs, init, result):
+    return logs.get_log(init, result).mods[0].vals[2]
+
+@pytest.fixture
+def fname(tmp_path):
+    fitlog.clear_fitlogs_cache()
+    return str(tmp_path/'fit.log')
+
+def test_index_append(fname):
+    write_log(fname, [('galfit.01', 'galfit.02', 18)])
+    idx=fitlog.FitLogIndex(fname)
+    assert len(idx)==1
+
+    write_log(fname, [('galfit.02', 'galfit.03', 17)], mode='a')
+    assert idx.update()
+    assert not idx.update()
+    assert idx.find('galfit.02', 'galfit.03')==[1]
+
+    logs=fitlog.FitLogs(fname, index=True)
+    assert get_mag(logs, 'galfit.02', 'galfit.03')==17
+
+def test_rewrite_same_size(fname):
+    '''
+    fit.log rewritten to same size, with same beginning
+    '''
+    runs=[('galfit.01', 'galfit.02', 18)]*100
+    write_log(fname, runs, mtime=10**18)
+    assert get_mag(fitlog.load_fitlogs(fname), 'galfit.01', 'galfit.02')==18
+
+    runs[50]=('galfit.01', 'galfit.09', 17)
+    write_log(fname, runs, mtime=2*10**18)
+    logs=fitlog.load_fitlogs(fname)
+    assert get_mag(logs, 'galfit.01', 'galfit.09')==17
+
+def test_rewrite_longer(fname):
+    '''
+    fit.log rewritten to longer one, with same beginning and old size
+    '''
+    runs=[('galfit.01', 'galfit.02', 18)]*100
+    write_log(fname, runs)
+    logs=fitlog.load_fitlogs(fname)
+    size=os.path.getsize(fname)
+
+    runs[-2]=('galfit.01', 'galfit.99', 17)
+    write_log(fname, runs+runs[:1])
+    assert os.path.getsize(fname)>size
+    assert get_mag(fitlog.load_fitlogs(fname), 'galfit.01', 'galfit.99')==17
+
+def test_sidecar_opt_in(fname):
+    idxname=os.path.join(os.path.dirname(fname), '.fit.log.idx')
+
+    write_log(fname, [('galfit.01', 'galfit.02', 18)])
+    fitlog.load_fitlogs(fname)
+    assert not os.path.exists(idxname)
+
+    fitlog.load_fitlogs(fname, save_index=True)
+    assert os.path.exists(idxname)
+
+    # sidecar is used, and checked against file
+    write_log(fname, [('galfit.01', 'galfit.02', 17)], mtime=10**18)
+    logs=fitlog.FitLogs(fname, index=True)
+    assert get_mag(logs, 'galfit.01', 'galfit.02')==17
+
+def test_sidecar_not_writable(fname):
+    write_log(fname, [('galfit.01', 'galfit.02', 18)])
+    idx=fitlog.FitLogIndex(fname, idxname='/nonexistent/.fit.log.idx',
+                                  save=True)
+    assert len(idx)==1
+
+def test_shared_after_parse_all(fname):
+    write_log(fname, [('galfit.01', 'galfit.02', 18)], mtime=10**18)
+    logs=fitlog.load_fitlogs(fname)
+    logs.parse_all()
+    assert get_mag(logs, 'galfit.01', 'galfit.02')==18
+
+    write_log(fname, [('galfit.02', 'galfit.03', 17)], mode='a')
+    logs=fitlog.load_fitlogs(fname)
+    assert get_mag(logs, 'galfit.02', 'galfit.03')==17
+
+# a run with two components, one parameter unreliable
+entry_flags='''-----------------------------------------------------------------------------
+
+Input image     : input.fits[1:100,1:100]
+Init. par. file : %s
+Restart file    : %s
+Output image    : out.fits
+
+ sersic    : (   50.20,    49.80)   18.52     *10.32*    2.54    0.80    30.12
+               (    0.01,     0.01)    0.01     *0.10*    0.02    0.01     0.50
+ sky       : [   50.00,    50.00]  1.23e-02  [0.000e+00]  [0.000e+00]
+                                  1.00e-03   0.00e+00      0.00e+00
+ Chi^2 = 30000.5,  ndof = 9990
+ Chi^2/nu = 3.003
+
+'''
+
+def test_to_arrays(fname):
+    write_log(fname, [('galfit.01', 'galfit.02', 18)])
+    with open(fname, 'a') as f:
+        f.write(entry_flags % ('galfit.02', 'galfit.03'))
+    write_log(fname, [('galfit.03', 'galfit.04', 17)], mode='a')
+
+    arrs=fitlog.FitLogs(fname).to_arrays()
+    assert len(arrs)==3 and arrs.get_num_of_comps()==4
+    assert arrs['result_file'].tolist()==['galfit.02', 'galfit.03', 'galfit.04']
+    assert arrs['input_image'][0]=='input.fits[1:100,1:100]'
+    assert np.allclose(arrs['reduce_chisq'], [1.001, 3.003, 1.001])
+    assert arrs['run'].tolist()==[0, 1, 1, 2]
+    assert arrs['comp'].tolist()==[1, 1, 2, 1]
+    assert arrs['name'].tolist()==['sersic', 'sersic', 'sky', 'sersic']
+    assert arrs['npar'].tolist()==[7, 7, 3, 7]
+
+    # same as parsed logs, padded
+    logs=fitlog.FitLogs(fname)
+    logs.parse_all()
+    mods=[m for log in logs.logs for m in log.mods]
+    for i, m in enumerate(mods):
+        n=len(m.vals)
+        assert np.allclose(arrs['val'][i, :n], m.vals)
+        assert np.allclose(arrs['uncert'][i, :n], m.uncerts)
+        assert [fitlog.flag_names[c] for c in arrs['flag'][i, :n]]==m.flags
+        assert np.isnan(arrs['val'][i, n:]).all()
+        assert (arrs['flag'][i, n:]==-1).all()
+
+    # filters
+    assert arrs.any_unreliable().tolist()==[False, True, False]
+    assert arrs.any_flag('fixed').tolist()==[False, True, False]
+    assert arrs.reduce_chisq_above(2).tolist()==[False, True, False]
+
+    sub=arrs.select(~arrs.any_unreliable())
+    assert sub['result_file'].tolist()==['galfit.02', 'galfit.04']
+    assert sub['run'].tolist()==[0, 1]
+    assert sub['val'][1, 2]==17
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from common import import_module, write_template
+
+fitscache=import_module('fitscache')
+GalFit=import_module('galfit').GalFit
+
+def write_fits(fname, value, shape=(40, 50)):
+    fits.PrimaryHDU(np.full(shape, value, dtype='f4')).writeto(str(fname))
+    return str(fname)
+
+def test_evicted_hdu_valid(tmp_path):
+    cache=fitscache.HDUCache(maxbytes=1)
+    a=write_fits(tmp_path/'a.fits', 1)
+    b=write_fits(tmp_path/'b.fits', 2)
+
+    data=cache.get_hdu(a).data
+    hdu=cache.get_hdu(a)
+
+    cache.get_hdu(b)   # a is evicted
+    assert a not in cache and b in cache
+
+    assert data.sum()==40*50
+    assert hdu.data.sum()==40*50
+
+def test_data_read_only(tmp_path):
+    write_fits(tmp_path/'img.fits', 1)
+    write_fits(tmp_path/'psf.fits', 1, shape=(5, 5))
+    gf1=GalFit(write_template(tmp_path))
+    gf2=GalFit(write_template(tmp_path, 'galfit.02'))
+
+    data=gf1.get_input_data()
+    with pytest.raises(ValueError):
+        data[0, 0]=10
+    with pytest.raises(ValueError):
+        gf1.get_psf_data()[0, 0]=10
+
+    # copy could be modified, without effect on others
+    data=data.copy()
+    data[0, 0]=10
+    assert gf2.get_input_data()[0, 0]==1
+
+def test_changed_file(tmp_path):
+    import os
+    fname=write_fits(tmp_path/'a.fits', 1)
+    old=fitscache.get_hdu(fname).data
+
+    write_fits(tmp_path/'b.fits', 2)
+    os.replace(str(tmp_path/'b.fits'), fname)
+    os.utime(fname, ns=(0, 0))
+    assert fitscache.get_hdu(fname).data[0, 0]==2
+    assert old[0, 0]==1
+
+def write_wcs_fits(fname, pscale):
+    hdu=fits.PrimaryHDU(np.zeros((40, 50), dtype='f4'))
+    h=hdu.header
+    h['CTYPE1'], h['CTYPE2']='RA---TAN', 'DEC--TAN'
+    h['CRPIX1'], h['CRPIX2']=25., 20.
+    h['CRVAL1'], h['CRVAL2']=150., 2.
+    h['CD1_1'], h['CD2_2']=-pscale/3600, pscale/3600
+    h['CD1_2'], h['CD2_1']=0., 0.
+    hdu.writeto(str(fname), overwrite=True)
+    return str(fname)
+
+def test_wcs_shared(tmp_path):
+    write_wcs_fits(tmp_path/'img.fits', 0.06)
+    write_wcs_fits(tmp_path/'img2.fits', 0.2)
+    gf1=GalFit(write_template(tmp_path))
+    gf2=GalFit(write_template(tmp_path, 'galfit.02'))
+
+    assert gf1.get_wcs() is gf2.get_wcs()
+    assert np.isclose(gf1.get_pixscale(), 0.06)
+    ra, dec=gf1.get_radec_at(25, 20)
+    assert np.isclose(ra, 150.) and np.isclose(dec, 2.)
+
+    # follows head A
+    gf2.head.input='img2.fits'
+    assert np.isclose(gf2.get_pixscale(), 0.2)
+    assert np.isclose(gf1.get_pixscale(), 0.06)
+
+def test_wcs_changed_file(tmp_path):
+    import os
+    fname=write_wcs_fits(tmp_path/'img.fits', 0.06)
+    w=fitscache.get_wcs(fname)
+    assert np.allclose(fitscache.get_pixscales(fname), 0.06)
+
+    write_wcs_fits(fname, 0.1)
+    os.utime(fname, ns=(1, 1))
+    assert fitscache.get_wcs(fname) is not w
+    assert np.allclose(fitscache.get_pixscales(fname), 0.1)
+    assert len(fitscache.wcs_cache.items)==len(fitscache.wcs_cache.keys)
+
+def test_scaled_data(tmp_path):
+    data=np.arange(2000, dtype='i2').reshape(40, 50)
+    hdu=fits.PrimaryHDU(data.copy())
+    hdu.scale('int16', bzero=100)   # stored as data-100
+    hdu.writeto(str(tmp_path/'img.fits'))
+
+    hdu=fitscache.get_hdu(str(tmp_path/'img.fits'))
+    assert np.array_equal(fitscache.get_data(hdu), data)
+
+def test_data_region(tmp_path):
+    data=np.arange(2000, dtype='i2').reshape(40, 50)
+    hdu=fits.PrimaryHDU(data.copy())
+    hdu.scale('int16', bzero=100)
+    hdu.writeto(str(tmp_path/'img.fits'))
+
+    gf=GalFit(write_template(tmp_path))
+    gf.region=[5, 15, 3, 12]
+    assert gf.get_input_shape()==(40, 50)
+
+    reg=gf.get_input_data_region()
+    assert reg.shape==(10, 11)
+    assert np.array_equal(reg, data[2:12, 4:15])
+
+    reg=gf.get_input_data_region(dtype=np.float32)
+    assert reg.dtype==np.float32
+    assert np.array_equal(reg, data[2:12, 4:15])
+
+def test_shape_without_data(tmp_path, monkeypatch):
+    write_fits(tmp_path/'img.fits', 1)
+    gf=GalFit(write_template(tmp_path))
+    hdu=gf.get_input_hdu()
+
+    # data is not loaded for shape
+    monkeypatch.setattr(type(hdu), 'data', property(lambda self: 1/0))
+    assert gf.get_input_shape()==(40, 50)
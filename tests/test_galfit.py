@@ -0,0 +1,85 @@
+import pytest
+
+from common import import_module, write_template, galfit_all_models
+
+GalFit=import_module('galfit').GalFit
+fitlog=import_module('fitlog')
+
+def test_fast_parser_same_as_str(tmp_path):
+    for gf in [galfit_all_models(), GalFit(write_template(tmp_path))]:
+        fname=gf.writeto_file(str(tmp_path/'galfit.02'))
+        gf0=GalFit(fname)
+        gf1=GalFit(fname, fast=True)
+        assert str(gf1)==str(gf0)==str(gf)
+        for m0, m1 in zip(gf0.comps, gf1.comps):
+            assert m1.name==m0.name
+            assert m1.vals==m0.vals and m1.tofits==m0.tofits
+            assert m1.Z.get()==m0.Z.get()
+
+def test_fast_parser_head(tmp_path):
+    fname=write_template(tmp_path)
+    gf0=GalFit(fname)
+    gf1=GalFit(fname, fast=True)
+    assert gf1.init_file==gf0.init_file=='galfit.00'
+    assert gf1.region==gf0.region==[1, 50, 1, 40]
+    assert gf1.head.pscale==[0.06, 0.06]
+
+# log of common.template, run as galfit.00 -> galfit.01
+log_entry='''-----------------------------------------------------------------------------
+
+Input image     : img.fits[1:50,1:40]
+Init. par. file : galfit.00
+Restart file    : galfit.01
+Output image    : imgblock.fits
+
+ sersic    : (   25.00,    20.00)   18.00      5.00    2.50    0.70    30.00
+               (    0.01,     0.02)    0.03      0.04    0.05    0.06     0.07
+ sky       : [   25.00,    20.00]  1.00e-01  [0.000e+00]  [0.000e+00]
+                                  9.00e-04   0.00e+00      0.00e+00
+ Chi^2 = 123.4,  ndof = 100
+ Chi^2/nu = 1.234
+
+'''
+
+sersic_uncerts=[0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07]
+sky_uncerts=[0.0009, 0., 0.]
+
+@pytest.fixture
+def fname(tmp_path):
+    fitlog.clear_fitlogs_cache()
+    (tmp_path/'fit.log').write_text(log_entry)
+    return write_template(tmp_path)
+
+def test_lazy_log(fname):
+    gf=GalFit(fname, loadlog=True)
+    assert gf.chisq==123.4
+    assert gf.comps[0].uncerts==sersic_uncerts
+    assert gf.comps[1].uncerts==sky_uncerts
+
+def test_log_before_changing_comps(fname):
+    gf=GalFit(fname, loadlog=True)
+    gf.dup_comp(0)
+    assert [m.name for m in gf.comps]==['sersic', 'sersic', 'sky']
+    assert gf.comps[1].uncerts==sersic_uncerts
+    assert gf.comps[2].uncerts==sky_uncerts
+
+    gf=GalFit(fname, loadlog=True)
+    gf.add_comp('sky', index=0)
+    assert gf.comps[1].uncerts==sersic_uncerts
+    assert gf.comps[2].uncerts==sky_uncerts
+
+    gf=GalFit(fname, loadlog=True)
+    gf.del_comp(0)
+    assert gf.comps[0].uncerts==sky_uncerts
+
+def test_log_before_copy(fname):
+    gf=GalFit(fname, loadlog=True)
+    mod=gf.comps[0].copy()
+    assert mod.uncerts==sersic_uncerts
+
+    gf=GalFit(fname, loadlog=True)
+    var=gf.variant()
+    var.set_param(1, '1', 0.2)
+    view=var.view()
+    assert view.comps[1].vals[0]==0.2
+    assert view.comps[1].uncerts==sky_uncerts
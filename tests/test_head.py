@@ -0,0 +1,21 @@
+from common import import_module
+
+GalFit=import_module('galfit').GalFit
+Head=import_module('head').Head
+
+def test_default_vector_in_place():
+    gf=GalFit()
+    gf.region[0]=5
+    gf.head.region[1]=7
+    gf.conv[0]=3
+    assert gf.region==[5, 7, 0, 0]
+    assert gf.head.get_pval('conv')==[3, 0]
+    assert 'H) 5 7 0 0 ' in str(gf)
+
+def test_default_scalar_lazy():
+    head=Head()
+    assert head.zerop==20. and head.input=='none'
+    assert 'J' not in head.params and 'A' not in head.params
+
+def test_default_str_unchanged():
+    assert str(GalFit().head)==str(Head())
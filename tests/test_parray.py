@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+
+from common import import_module, write_template
+
+GalFit=import_module('galfit').GalFit
+parray=import_module('parray')
+serial=import_module('serial')
+
+@pytest.fixture
+def fname(tmp_path):
+    return write_template(tmp_path)
+
+def test_same_as_containers(fname):
+    gf=GalFit(fname)
+    gfa=GalFit(fname, arrays=True)
+    assert str(gfa)==str(gf)
+    for mod, moda in zip(gf.comps, gfa.comps):
+        for f in ['vals', 'tofits', 'uncerts', 'flags']:
+            assert getattr(moda, f)==getattr(mod, f)
+
+def test_thin_views(fname):
+    gf=GalFit(fname, arrays=True)
+    mod=gf.comps[0]
+    for key in mod.sorted_keys:
+        p=mod.params[key]
+        assert type(p) is parray.ArrayParameter
+        assert not p.params   # no container held
+
+    p=mod.par_mag
+    p.set_val(17)
+    assert mod.mag==17 and gf.parrs.val[2]==17
+    p.get_val().set(16)
+    assert p.val==16 and str(p)=='16.0000     1'
+
+    p.freeze()
+    assert p.tofit==0 and gf.parrs.tofit[2]==0
+    p.set_flag('fixed')
+    assert mod.flags[2]=='fixed'
+
+def test_tofit_checked(fname):
+    gf=GalFit(fname, arrays=True)
+    mod=gf.comps[0]
+    with pytest.raises(Exception):
+        mod.par_mag.set_tofit(2)
+    with pytest.raises(Exception):
+        mod.set_tofits([1, 1, 300])
+    with pytest.raises(Exception):
+        mod.set_flags(['unknown'])
+    assert mod.tofits==[1]*7
+
+    mod.set_tofits(['0', 0, False])
+    assert mod.tofits==[0, 0, 0, 1, 1, 1, 1]
+
+def test_rebind(fname):
+    gf=GalFit(fname, arrays=True)
+    p=gf.comps[1]._get_param('1')
+
+    # references stay valid after arrays are rebuilt
+    gf.add_comp('sersic', index=0)
+    p.set_val(5)
+    assert gf.comps[2].vals[0]==5
+
+    mod=gf.comps[0]
+    gf.del_comp(0)
+    assert mod.parrs is None
+    assert type(mod.params['3']) is not parray.ArrayParameter
+    assert len(gf.parrs.val)==sum([len(m.sorted_keys) for m in gf.comps])
+
+def test_copy_detached(fname):
+    gf=GalFit(fname, arrays=True)
+    mod=gf.comps[0].copy()
+    mod.mag=10
+    assert gf.comps[0].mag==18
+    assert str(mod)==str(GalFit(fname).comps[0].copy())\
+                        .replace('18.0000', '10.0000')
+
+def test_serialize(fname):
+    gf=GalFit(fname, arrays=True)
+    gf.comps[0].par_mag.set_uncert(0.5)
+    for new in [serial.loads(serial.dumps(gf)), pickle.loads(pickle.dumps(gf))]:
+        assert new.parrs is not None
+        assert str(new)==str(gf)
+        assert new.comps[0].uncerts==gf.comps[0].uncerts
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from common import import_module, write_stamp, stamp_comps
+
+GalFit=import_module('galfit').GalFit
+quickfit=import_module('quickfit')
+chisq=import_module('chisq')
+
+@pytest.fixture
+def gf(tmp_path):
+    gf=GalFit(write_stamp(tmp_path))
+    gf.comps[0].free_all()
+    gf.comps[1].set_tofits([1, 0, 0])
+    return gf
+
+def perturb(gf):
+    mod=gf.comps[0]
+    mod.set_vals([25.8, 20.1, 16.3, 5., 1.2, 0.8, 40.])
+
+def test_recover_truth(gf):
+    perturb(gf)
+    c0=chisq.eval_chisq(gf)[0]
+    c=quickfit.quickfit(gf)
+    assert c<c0
+
+    truth=stamp_comps[0][1]
+    vals=gf.comps[0].vals
+    assert np.allclose(vals[:2], truth[:2], atol=0.05)
+    assert np.isclose(vals[2], truth[2], atol=0.02)
+    assert np.allclose(vals[3:6], truth[3:6], rtol=0.05)
+    assert np.isclose(gf.comps[1].vals[0], 1., atol=0.05)
+
+    assert np.isclose(gf.chisq, c) and gf.ndof==40*50-8
+    assert all([u>0 for u in gf.comps[0].uncerts])
+    assert np.isclose(c, chisq.eval_chisq(gf)[0])
+
+def test_fixed_and_skipped(gf):
+    perturb(gf)
+    gf.comps[0].freeze_pars(['re'])
+    gf.add_comp('gaussian', vals=[10., 10., 15., 3., 1., 0.], tofits=[1]*6)
+    gf.comps[-1].skip_mod()
+    gaussian=gf.comps[-1].vals
+
+    quickfit.quickfit(gf)
+    assert gf.comps[0].vals[3]==5.
+    assert gf.comps[-1].vals==gaussian
+
+def test_hard_constraints(gf):
+    perturb(gf)
+    gf.add_comp('sersic', vals=[20., 15., 19., 2., 1., 0.9, 10.],
+                tofits=[1]*7)
+    gf.add_cons('13', 'x', 'offset')
+    gf.add_cons('13', ['pa'], 'ratio')
+
+    qf=quickfit.QuickFit(gf, maxiter=5)
+    qf.fit()
+    m0, m1=gf.comps[0], gf.comps[2]
+    assert np.isclose(m1.vals[0]-m0.vals[0], 20.-25.8)
+    assert np.isclose(m1.vals[6]/m0.vals[6], 10./40.)
+
+def test_ratio_zero_lead(gf):
+    gf.add_comp('sersic', vals=[20., 15., 19., 2., 1., 0.9, 10.],
+                tofits=[1]*7)
+    gf.comps[0].pa=0.
+    gf.add_cons('13', ['pa'], 'ratio')
+    with pytest.raises(Exception, match='zero'):
+        quickfit.QuickFit(gf)
@@ -0,0 +1,76 @@
+from math import erf, sqrt
+
+import numpy as np
+
+from common import import_module
+
+render=import_module('render')
+Model=import_module('model').Model
+
+# region large enough to hold almost all light of profiles
+frame=render.Frame([1, 201, 1, 201], zerop=25., exptime=2.)
+xc, yc=101.3, 100.6
+
+# name, (re/rs/fwhm, shape parameters...)
+profiles=[
+    ('sersic', [5., 1.5]),
+    ('sersic', [3., 0.7]),
+    ('expdisk', [4.]),
+    ('gaussian', [3.]),
+    ('moffat', [4., 3.]),
+]
+
+def comp_vals(name, size, mag=18.):
+    mod=Model.get_model(name)(vals=[xc, yc, mag]+size)
+    mod.set_param('9', 0.6)
+    mod.set_param('10', 35.)
+    return mod.vals
+
+def test_total_flux():
+    total=frame.flux(18.)
+    assert np.isclose(total, 2*10**(-0.4*(18.-25.)))
+
+    for name, size in profiles:
+        vals=comp_vals(name, size)
+        img=render.render_comp(name, vals, frame, oversample=5)
+        assert img.shape==(201, 201)
+        assert np.isclose(img.sum(), total, rtol=0.01), name
+
+def test_gaussian_pixel_integral():
+    # pixels oversampled near center, within `osr`,
+    #     against exact integral over pixel
+    fwhm=3.
+    sig=fwhm/(2*sqrt(2*np.log(2)))
+    vals=comp_vals('gaussian', [fwhm])
+    vals[4]=1.  # round
+
+    def cdf(t, c):
+        return 0.5*(1+erf((t-c)/(sqrt(2)*sig)))
+
+    img=render.render_comp('gaussian', vals, frame, oversample=9)
+    for j in range(97, 104):
+        for i in range(97, 104):
+            x, y=frame.x[i], frame.y[j]
+            exact=frame.flux(18.)*(cdf(x+0.5, xc)-cdf(x-0.5, xc))*\
+                                  (cdf(y+0.5, yc)-cdf(y-0.5, yc))
+            assert np.isclose(img[j, i], exact, rtol=5e-3), (i, j)
+
+def test_centroid():
+    # flux weighted center at position of component
+    y, x=np.meshgrid(frame.y, frame.x, indexing='ij')
+    for name, size in profiles:
+        img=render.render_comp(name, comp_vals(name, size), frame, oversample=5)
+        assert np.isclose((img*x).sum()/img.sum(), xc, atol=0.01), name
+        assert np.isclose((img*y).sum()/img.sum(), yc, atol=0.01), name
+
+def test_batched_same_as_single():
+    vals=np.array([comp_vals('sersic', [5., 1.5], mag=m) for m in (17., 19.)])
+    imgs=render.render_comp('sersic', vals, frame)
+    for v, img in zip(vals, imgs):
+        assert np.allclose(img, render.render_comp('sersic', v, frame))
+
+def test_tol_keeps_flux():
+    vals=comp_vals('gaussian', [3.])
+    full=render.render_comp('gaussian', vals, frame, oversample=5)
+    cut=render.render_comp('gaussian', vals, frame, oversample=5, tol=1e-8)
+    assert np.isclose(cut.sum(), full.sum(), rtol=1e-4)
@@ -0,0 +1,47 @@
+import pickle
+
+from common import import_module, write_template
+
+GalFit=import_module('galfit').GalFit
+serial=import_module('serial')
+
+def sample(tmp_path, **kwargs):
+    gf=GalFit(write_template(tmp_path), **kwargs)
+    gf.comps[0].set_uncerts([0.1*(i+1) for i in range(len(gf.comps[0].vals))])
+    gf.comps[0].set_flags(['unreliable', 'fixed']+
+                          ['normal']*(len(gf.comps[0].vals)-2))
+    gf.comps[1].skip_mod()
+    gf.add_cons(1, 'x', 'offset')
+    gf.add_cons(1, 're', '1 to 10')
+    return gf
+
+def assert_same(gf1, gf0):
+    assert str(gf1)==str(gf0)
+    assert str(gf1.gfcons)==str(gf0.gfcons)
+    assert gf1.gfpath==gf0.gfpath
+    for m0, m1 in zip(gf0.comps, gf1.comps):
+        assert m1.name==m0.name and m1.id==m0.id
+        assert m1.vals==m0.vals and m1.tofits==m0.tofits
+        assert m1.uncerts==m0.uncerts and m1.flags==m0.flags
+        assert m1.Z.get()==m0.Z.get()
+    assert (gf1.parrs is None)==(gf0.parrs is None)
+
+def test_dumps_loads(tmp_path):
+    for arrays in [False, True]:
+        gf=sample(tmp_path, arrays=arrays)
+        assert_same(serial.loads(serial.dumps(gf)), gf)
+
+def test_dump_load_file(tmp_path):
+    gf=sample(tmp_path)
+    fname=str(tmp_path/'gf.bin')
+    serial.dump(gf, fname)
+    assert_same(serial.load(fname), gf)
+
+def test_pickle(tmp_path):
+    gf=sample(tmp_path)
+    assert_same(pickle.loads(pickle.dumps(gf)), gf)
+
+    mod=gf.comps[0]
+    mod1=pickle.loads(pickle.dumps(mod))
+    assert str(mod1)==str(mod)
+    assert mod1.uncerts==mod.uncerts and mod1.flags==mod.flags
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from common import import_module, write_fits
+
+GalFit=import_module('galfit').GalFit
+sigma=import_module('sigma')
+
+def test_calc_sigma():
+    data=np.array([100., -5., 0.])
+    s=sigma.calc_sigma(data, GAIN=2., RDNOISE=3.)
+    assert np.allclose(s, np.sqrt([209., 9., 9.])/2)
+
+    # combined and per second
+    s=sigma.calc_sigma(data, GAIN=2., NCOMBINE=2, EXPTIME=10.,
+                       per_second=True)
+    assert np.allclose(s[0], np.sqrt(100*40)/40)
+
+    # zero sigma is bad pixel
+    assert np.isinf(sigma.calc_sigma(data)[2])
+
+@pytest.fixture
+def gf(tmp_path):
+    data=np.arange(600.).reshape(20, 30)
+    write_fits(tmp_path/'img.fits', data, {'GAIN': 2., 'RDNOISE': 3.})
+
+    gf=GalFit()
+    gf.gfpath=str(tmp_path)
+    gf.head.input='img.fits'
+    gf.head.region=[5, 15, 3, 12]
+    return gf
+
+def test_noise_params(gf):
+    params=sigma.get_noise_params(gf, RDNOISE=1.)
+    assert params=={'GAIN': 2., 'RDNOISE': 1., 'NCOMBINE': 1, 'EXPTIME': 1.}
+
+def test_make_sigma(gf, tmp_path):
+    from astropy.io import fits
+
+    cache=str(tmp_path/'cache')
+    fname=gf.make_sigma(cache_dir=cache)
+    assert os.path.dirname(fname)==cache
+    assert gf.get_abs_hdp('sigma')==fname
+
+    s=fits.getdata(fname)
+    assert s.shape==(20, 30) and s.dtype.kind=='f'
+
+    expect=sigma.calc_sigma(np.arange(600.).reshape(20, 30)[2:12, 4:15],
+                            GAIN=2., RDNOISE=3.)
+    assert np.allclose(s[2:12, 4:15], expect, rtol=1e-6)
+    s[2:12, 4:15]=0
+    assert (s==0).all()
+
+    # reused for same input and region
+    mtime=os.stat(fname).st_mtime_ns
+    assert gf.make_sigma(cache_dir=cache)==fname
+    assert os.stat(fname).st_mtime_ns==mtime
+
+    # new one for others
+    assert gf.make_sigma(cache_dir=cache, GAIN=4.)!=fname
+    gf.head.region=[1, 30, 1, 20]
+    assert gf.make_sigma(cache_dir=cache)!=fname
+    assert len(os.listdir(cache))==3
+
+def test_input_extension(gf, tmp_path):
+    from astropy.io import fits
+
+    hdu=fits.open(str(tmp_path/'img.fits'))[0]
+    ext=fits.ImageHDU(hdu.data, header=hdu.header)
+    fits.HDUList([fits.PrimaryHDU(), ext]).writeto(str(tmp_path/'mef.fits'))
+    s0=sigma.sigma_region(gf)
+
+    gf.head.input='mef.fits[1]'
+    assert np.allclose(sigma.sigma_region(gf), s0)
+    fname=gf.make_sigma(cache_dir=str(tmp_path/'cache'))
+    assert np.allclose(fits.getdata(fname)[2:12, 4:15], s0, rtol=1e-6)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from common import import_module
+
+stamps=import_module('stamps')
+GalFit=import_module('galfit').GalFit
+
+def test_stamp_region():
+    shape=(100, 200)
+    assert stamps.stamp_region(50, 50, 2, shape)==[40, 60, 40, 60]
+
+    # clipped at edges, never inverted
+    for x, y in [(1, 1), (200, 100), (0.6, 100.4), (195, 3)]:
+        xmin, xmax, ymin, ymax=stamps.stamp_region(x, y, 2, shape)
+        assert 1<=xmin<=xmax<=200 and 1<=ymin<=ymax<=100
+
+    for x, y in [(-5, 50), (0.4, 50), (50, 100.6), (300, 50), (50, -100)]:
+        assert not stamps.in_mosaic(x, y, shape)
+        with pytest.raises(Exception):
+            stamps.stamp_region(x, y, 2, shape)
+
+def test_iter_stamps(tmp_path):
+    data=np.arange(60*80, dtype='f4').reshape(60, 80)
+    mosaic=str(tmp_path/'mosaic.fits')
+    fits.PrimaryHDU(data).writeto(mosaic)
+
+    cat={'x': [10, 500, 75], 'y': [20, 20, 58], 'mag': [20]*3,
+         'size': [1]*3, 'ba': [0.5]*3, 'pa': [0]*3}
+    outdir=str(tmp_path/'out')
+
+    result=list(stamps.iter_stamps(cat, mosaic, outdir, workers=2))
+    assert [s.index for s in result]==[0, 2]
+
+    for s in result:
+        xmin, xmax, ymin, ymax=s.region
+        cut=fits.getdata(s.fitsname)
+        assert np.array_equal(cut, data[(ymin-1):ymax, (xmin-1):xmax])
+
+        gf=GalFit(s.gfname)
+        x0, y0=gf.comps[0].vals[:2]
+        i=s.index
+        assert (x0+xmin-1, y0+ymin-1)==(cat['x'][i], cat['y'][i])
+
+    with pytest.raises(Exception):
+        list(stamps.iter_stamps(cat, mosaic, outdir, skip_outside=False))
@@ -0,0 +1,64 @@
+import os
+import stat
+import threading
+
+from common import import_module
+
+tools=import_module('tools')
+
+def test_reserve_mode(tmp_path):
+    umask=os.umask(0o022)
+    try:
+        fname=tools.reserve_gfname(str(tmp_path))
+    finally:
+        os.umask(umask)
+    assert os.path.basename(fname)=='galfit.01'
+    assert stat.S_IMODE(os.stat(fname).st_mode)==0o644
+
+def test_reserve_skip_taken(tmp_path):
+    (tmp_path/'galfit.01').write_text('x')
+    alloc=tools.GfnameAllocator(str(tmp_path))
+    assert alloc.reserve_pair()==(2, 3)
+    assert alloc.reserve(10)==11
+
+def test_release_symlink(tmp_path):
+    real=tmp_path/'real'
+    real.mkdir()
+    link=tmp_path/'link'
+    link.symlink_to(real)
+
+    fname=tools.reserve_gfname(str(link))
+    assert os.path.isfile(fname)
+
+    # released through the same allocator, given path by symlink or not
+    tools.release_gfname(os.path.join(str(link), os.path.basename(fname)))
+    assert not os.path.exists(fname)
+    assert tools.get_allocator(str(link)) is tools.get_allocator(str(real))
+    assert tools.reserve_gfname(str(real))==fname
+
+def test_release_nonempty(tmp_path):
+    fname=tools.reserve_gfname(str(tmp_path))
+    with open(fname, 'w') as f:
+        f.write('result')
+    tools.release_gfname(fname)
+    assert os.path.isfile(fname)
+
+def test_reserve_concurrent(tmp_path):
+    # allocators in threads, like separate processes
+    nums=[]
+    lock=threading.Lock()
+
+    def run():
+        alloc=tools.GfnameAllocator(str(tmp_path))
+        for _ in range(20):
+            fno=alloc.reserve()
+            with lock:
+                nums.append(fno)
+
+    threads=[threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(nums)==list(range(1, 161))
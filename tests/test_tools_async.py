@@ -0,0 +1,71 @@
+import os
+import time
+import asyncio
+
+import pytest
+
+from common import import_module, write_template, read
+
+batch=import_module('batch')
+tools_async=import_module('tools_async')
+
+def run_with_ticker(coro):
+    '''
+    run coroutine, with a ticker to count turns of event loop
+    '''
+    ticks=[]
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        t=asyncio.ensure_future(ticker())
+        try:
+            return await coro
+        finally:
+            t.cancel()
+
+    return asyncio.run(main()), ticks
+
+def test_arungf(galfit):
+    init=write_template(galfit)
+    lines=[]
+    result, _=run_with_ticker(tools_async.arungf(init, callback=lines.append))
+    assert os.path.basename(result)=='galfit.02'
+    assert 'C0) 0.1000' in read(result)
+
+def test_not_blocking(galfit, monkeypatch):
+    setup=batch.GalFitJob.setup
+
+    def slow_setup(self, *args):
+        time.sleep(0.3)
+        return setup(self, *args)
+    monkeypatch.setattr(batch.GalFitJob, 'setup', slow_setup)
+
+    init=write_template(galfit)
+    result, ticks=run_with_ticker(tools_async.arungf(init))
+    assert os.path.isfile(result)
+    assert len(ticks)>10
+
+def test_cancel_in_setup(galfit, monkeypatch):
+    setup=batch.GalFitJob.setup
+
+    def slow_setup(self, *args):
+        time.sleep(0.2)
+        return setup(self, *args)
+    monkeypatch.setattr(batch.GalFitJob, 'setup', slow_setup)
+
+    init=write_template(galfit)
+
+    async def main():
+        task=asyncio.ensure_future(tools_async.arungf(init))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.4)
+
+    asyncio.run(main())
+    assert sorted(os.listdir(galfit))==['galfit.01']
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from common import import_module, write_stamp, write_template
+
+GalFit=import_module('galfit').GalFit
+variant=import_module('variant')
+chisq=import_module('chisq')
+
+def test_overrides(tmp_path):
+    base=GalFit(write_template(tmp_path))
+    text=str(base)
+
+    var=base.variant()
+    var.set_param(0, 're', 6., tofit=0)
+    var.set_vals(1, {'1': 0.3})
+    var.set_head('zerop', 26.)
+    var.skip_comp(-1)
+    assert var.get_pval(0, 're')==6. and var.get_pval(0, 'n')==2.5
+    assert var.get_hpval('J')==26.
+    assert not var.is_values_only()
+
+    view=var.view()
+    assert view.comps[0].vals[3]==6. and view.comps[0].tofits[3]==0
+    assert view.comps[1].vals[0]==0.3 and view.comps[1].Z.get()==1
+    assert view.head.zerop==26.
+    assert str(base)==text
+
+    gf=var.materialize()
+    assert str(gf)==str(view)
+    gf.comps[0].re=7.
+    gf.head.zerop=27.
+    assert str(base)==text and str(var)==str(view)
+
+    fname=var.writeto_file(str(tmp_path/'galfit.02'))
+    assert str(GalFit(fname))==str(view)
+
+@pytest.fixture
+def base(tmp_path):
+    gf=GalFit(write_stamp(tmp_path))
+    # skipped component before others
+    gf.add_comp('gaussian', vals=[10., 10., 15., 3., 1., 0.], index=0)
+    gf.comps[0].skip_mod()
+    return gf
+
+def test_eval_chisq_many(base):
+    variants=variant.sweep(base, 1, 'mag', [15.8, 16., 16.2])
+    variants[1].set_param(2, '1', 1.1)
+
+    # not only values, evaluated through view
+    var=base.variant()
+    var.skip_comp(0, 0)
+    variants.append(var)
+
+    cs=variant.eval_chisq_many(variants)
+    for var, c in zip(variants, cs):
+        assert np.isclose(c, chisq.eval_chisq(var.materialize())[0])
+        assert np.isclose(c, var.eval_chisq()[0])
+    assert cs[0]>cs[1] and cs[2]>cs[1]
+    assert cs[3]>cs[1]
+
+def test_vector_skips_comp(base):
+    var=base.variant()
+    var.set_param(0, 'mag', 10.)
+    var.set_param(1, 'mag', 17.)
+    vec=var.get_vector()
+    assert len(vec)==10
+    assert vec[2]==17.
+    assert np.array_equal(vec, chisq.get_vector(var.materialize()))
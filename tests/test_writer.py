@@ -0,0 +1,24 @@
+import io
+
+from common import import_module, write_template, galfit_all_models
+
+GalFit=import_module('galfit').GalFit
+writer=import_module('writer')
+
+def written(gf):
+    f=io.StringIO()
+    writer.write_template(gf, f)
+    return f.getvalue()
+
+def test_writer_same_as_str(tmp_path):
+    gf=galfit_all_models()
+    assert written(gf)==str(gf)+'\n'
+
+    gf=GalFit(write_template(tmp_path))
+    assert written(gf)==str(gf)+'\n'
+
+def test_writeto_file_same_as_str(tmp_path):
+    gf=galfit_all_models()
+    fname=gf.writeto_file(str(tmp_path/'galfit.01'))
+    with open(fname) as f:
+        assert f.read()==str(gf)+'\n'
@@ -3,6 +3,8 @@
 # some convenient tools to run galfit
 
 import os
+import re
+import threading
 
 # convert template file number to its name
 def gfname(num, path=None):
@@ -11,6 +13,106 @@ def gfname(num, path=None):
         fname=os.path.join(path, fname)
     return fname
 
+# number of template file
+def gfnum(fname):
+    '''
+    number of template like galfit.NN, or None
+    '''
+    m=re.match(r'galfit\.(\d+)$', os.path.basename(fname))
+    if m:
+        return int(m.group(1))
+    return None
+
+# allocate numbers of template files
+class GfnameAllocator:
+    '''
+    reserve free numbers of templates in a directory
+
+    a number is reserved by creating an empty file with O_EXCL,
+        which is atomic among threads and processes
+        its mode is as normal `open`, that is 0o666 with umask applied
+    numbers known to be taken are remembered,
+        so later reservations do not rescan them
+
+    Parameters
+    ----------
+    path: str or None
+        directory of templates, default current directory
+        symbolic links in it are resolved,
+            so that one directory has only one allocator
+    '''
+    def __init__(self, path=None):
+        self.path=os.path.realpath(path or os.curdir)
+        self.taken=set()
+        self.lock=threading.Lock()
+
+    def reserve(self, start=0):
+        '''
+        reserve the first free number after `start`
+
+        return reserved number
+        '''
+        with self.lock:
+            fno=start+1
+            while True:
+                if fno not in self.taken:
+                    try:
+                        fd=os.open(gfname(fno, self.path),
+                                   os.O_WRONLY|os.O_CREAT|os.O_EXCL, 0o666)
+                    except FileExistsError:
+                        pass
+                    else:
+                        os.close(fd)
+                        self.taken.add(fno)
+                        return fno
+                    self.taken.add(fno)
+                fno+=1
+
+    def reserve_pair(self, start=0):
+        '''
+        reserve numbers for an input template and its result
+        '''
+        fno=self.reserve(start)
+        return fno, self.reserve(fno)
+
+    def release(self, fno):
+        '''
+        release a reserved number, if its file is still empty
+        '''
+        fname=gfname(fno, self.path)
+        with self.lock:
+            if os.path.isfile(fname) and os.path.getsize(fname)==0:
+                os.remove(fname)
+                self.taken.discard(fno)
+
+    def gfname(self, fno):
+        return gfname(fno, self.path)
+
+# allocators shared in process, one for a directory
+_allocators={}
+_allocators_lock=threading.Lock()
+
+def get_allocator(path=None):
+    path=os.path.realpath(path or os.curdir)
+    with _allocators_lock:
+        if path not in _allocators:
+            _allocators[path]=GfnameAllocator(path)
+        return _allocators[path]
+
+def reserve_gfname(path=None, start=0):
+    '''
+    reserve name of template after number `start` in directory `path`
+    '''
+    alloc=get_allocator(path)
+    return alloc.gfname(alloc.reserve(start))
+
+def release_gfname(fname):
+    '''
+    release a reserved name of template
+    '''
+    path=os.path.dirname(os.path.abspath(fname))
+    get_allocator(path).release(gfnum(fname))
+
 # wrap GalFit
 def readgf(*args, **kwargs):
     # wrap GalFit to avoid circular dependency
@@ -22,7 +124,7 @@ def readgf_no(num):
     return readgf(gfname(num))
 
 # run galfit successively
-def rungf(init, change=None):
+def rungf(init, change=None, cache=None):
     '''
     Parameters
     ----------
@@ -34,32 +136,20 @@ def rungf(init, change=None):
             and run galfit in new one
         if callable, it only accepts one GalFit-type argument
 
+    cache: None, True, str or `gfcache.ResultCache`
+        cache of results
+            if hit, result template and fit.log entry are restored
+                without running galfit
+        if True, use default cache; if str, it is directory of cache
+
     Returns
     -------
     number of galfit result file
+
+    galfit runs in a scratch directory,
+        and numbers of changed template and result are reserved atomically,
+        so that concurrent runs in one directory would not collide
     '''
-    fno=init
-    fname=gfname(fno)
-
-    if change!=None:
-        gf=readgf(fname)
-        change(gf)
-
-        fno+=1
-        fname=gfname(fno)
-        while os.path.isfile(fname):
-            fno+=1
-            fname=gfname(fno)
-        gf.writeto(fname)
-
-    fno_r=fno+1
-    fname_r=gfname(fno_r)
-    if os.path.exists(fname_r):
-        os.remove(fname_r)
-
-    ecode=os.system('galfit '+fname)
-    if ecode!=0 or not os.path.exists(fname_r):
-        raise Exception('galfit failed for %s, exit code: %i'
-                            % (fname, ecode))
-
-    return fno_r
\ No newline at end of file
+    from .batch import GalFitJob
+    result=GalFitJob(init, change, cache=cache).run(capture=False)
+    return gfnum(result)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+'''
+asyncio counterpart of `rungf`
+
+    galfit runs in scratch directory as in `batch`,
+        with its stdout streamed line by line
+'''
+
+import os
+import signal
+import asyncio
+import inspect
+
+from . import batch
+from .batch import GalFitJob, clean_scratch
+from .tools import release_gfname
+
+# run galfit
+async def arun_galfit(scratch, callback=None, timeout=None):
+    '''
+    run galfit in scratch directory, killed if timeout or cancelled
+
+    Parameters
+    ----------
+    callback: callable or None
+        called with each line of stdout, without line break
+        it could also be a coroutine function
+
+    Returns
+    -------
+    exit code
+    '''
+    proc=await asyncio.create_subprocess_exec(
+                batch.galfit_exe, batch.scratch_init, cwd=scratch,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=True)
+
+    async def communicate():
+        with open(os.path.join(scratch, batch.scratch_stdout), 'w') as f:
+            async for line in proc.stdout:
+                line=line.decode(errors='replace')
+                f.write(line)
+                if callback is not None:
+                    r=callback(line.rstrip('\n'))
+                    if inspect.isawaitable(r):
+                        await r
+        return await proc.wait()
+
+    try:
+        return await asyncio.wait_for(communicate(), timeout)
+    except BaseException:
+        # timeout or cancelled: kill all processes in the session
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        raise
+
+def _undo_setup(task):
+    '''
+    release number and scratch directory given by `GalFitJob.setup`
+    '''
+    if task.cancelled() or task.exception() is not None:
+        return
+    _, _, result, scratch=task.result()
+    release_gfname(result)
+    clean_scratch(scratch)
+
+# user function
+async def arungf(init, change=None, callback=None, timeout=None,
+                       cache=None, scratch_dir=None, keep_scratch=False):
+    '''
+    run galfit for a template, without blocking event loop
+
+    Parameters
+    ----------
+    init, change:
+        initial template and its change, see `batch.GalFitJob`
+
+    callback: callable or None
+        called with each line of stdout of galfit
+        it could also be a coroutine function
+
+    timeout: float or None
+        seconds to wait for galfit, killed if exceeded
+
+    cache, scratch_dir, keep_scratch:
+        see `batch.rungf_many`
+
+    Returns
+    -------
+    name of result template
+    '''
+    # file work, hashing for cache and parsing run in threads,
+    #     only galfit is awaited in event loop
+    job=GalFitJob(init, change, cache=cache)
+    setup=asyncio.ensure_future(asyncio.to_thread(job.setup, scratch_dir))
+    try:
+        gf, init, result, scratch=await asyncio.shield(setup)
+    except asyncio.CancelledError:
+        # thread could not be stopped, so undo setup after it finishes
+        setup.add_done_callback(_undo_setup)
+        raise
+
+    succeed=False
+    try:
+        if await asyncio.to_thread(job.restore, init, result, scratch):
+            succeed=True
+            return result
+
+        try:
+            ecode=await arun_galfit(scratch, callback=callback,
+                                             timeout=timeout)
+        except BaseException:
+            release_gfname(result)
+            raise
+        await asyncio.to_thread(job.collect, init, result, scratch, ecode)
+        succeed=True
+    finally:
+        await asyncio.to_thread(clean_scratch, scratch, succeed, keep_scratch)
+
+    return result
+
+async def arungf_many(jobs, limit=None, callback=None,
+                            return_exceptions=True, **kwargs):
+    '''
+    run galfit for many templates, with at most `limit` running at once
+
+    Parameters
+    ----------
+    jobs: list
+        each item is initial template, or tuple (init, change)
+
+    limit: int or None
+        max number of galfit running concurrently
+        if None, use number of CPUs
+
+    callback: callable or None
+        called as `callback(i, line)` for line of stdout in i-th job
+
+    return_exceptions: bool
+        if True, exception of failed job is returned in result
+        otherwise, it is raised
+
+    kwargs: optional arguments for `arungf`
+
+    Returns
+    -------
+    list of result template
+    '''
+    if limit is None:
+        limit=os.cpu_count() or 1
+    sem=asyncio.Semaphore(limit)
+
+    async def run(i, job):
+        if type(job)!=tuple:
+            job=(job,)
+
+        cb=None
+        if callback is not None:
+            cb=lambda line: callback(i, line)
+
+        async with sem:
+            return await arungf(*job, callback=cb, **kwargs)
+
+    return await asyncio.gather(*[run(i, j) for i, j in enumerate(jobs)],
+                                return_exceptions=return_exceptions)
+
+class GalFitRun:
+    '''
+    galfit running in a task, with its stdout as async iterator
+
+    Usage:
+        run=GalFitRun(init)
+        async for line in run:
+            ...
+        result=await run
+    '''
+    def __init__(self, init, change=None, **kwargs):
+        self.queue=asyncio.Queue()
+        self.task=asyncio.ensure_future(
+                    arungf(init, change, callback=self.queue.put_nowait,
+                                         **kwargs))
+        self.task.add_done_callback(lambda t: self.queue.put_nowait(None))
+
+    async def _lines(self):
+        while True:
+            line=await self.queue.get()
+            if line is None:
+                break
+            yield line
+
+    def __aiter__(self):
+        return self._lines()
+
+    def __await__(self):
+        return self.task.__await__()
+
+    def cancel(self):
+        '''
+        cancel the run, which kills galfit
+        '''
+        return self.task.cancel()
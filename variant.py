@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+'''
+copy-on-write variants of a template, for parameter sweeps
+
+    a variant shares head, components and constraints of its base template,
+        and stores only overridden values
+    merged view is built when it is written, rendered or evaluated,
+        in which unchanged components are shared with base
+    an independent GalFit is materialized only on demand
+
+    base should not be changed while variants are in use,
+        since they see changes of it
+'''
+
+import copy
+
+import numpy as np
+
+class Variant:
+    '''
+    variant of a template
+
+    Parameters
+    ----------
+    base: GalFit
+        base template
+    '''
+    def __init__(self, base):
+        self.base=base
+
+        self.head={}     # head key -> value
+        self.params={}   # (index of component, key) -> {field: value}
+        self.Z={}        # index of component -> Z
+
+    # set overrides
+    def set_head(self, key, val):
+        '''
+        override head parameter, key could be alias, like 'region'
+        '''
+        self.head[self.base.head._get_key(key)]=val
+
+    def set_param(self, index, key, val=None, tofit=None):
+        '''
+        override value and/or fit toggle of a parameter
+
+        index: int
+            index of component in base
+
+        key: str
+            key or alias of parameter, like '4' or 're'
+        '''
+        mod=self.base.comps[index]
+        index=index%len(self.base.comps)
+        fields=self.params.setdefault((index, mod._get_key(key)), {})
+        if val is not None:
+            fields['val']=float(val)
+        if tofit is not None:
+            fields['tofit']=int(tofit)
+
+    def set_vals(self, index, vals):
+        '''
+        override values of a component
+            vals: list ordered as `sorted_keys`, or dict
+        '''
+        if type(vals)!=dict:
+            vals=dict(zip(self.base.comps[index].sorted_keys, vals))
+        for k, v in vals.items():
+            self.set_param(index, k, val=v)
+
+    def skip_comp(self, index, Z=1):
+        self.Z[index%len(self.base.comps)]=int(Z)
+
+    # get merged values
+    def get_hpval(self, key):
+        key=self.base.head._get_key(key)
+        if key in self.head:
+            return self.head[key]
+        return self.base.head.get_pval(key)
+
+    def get_pval(self, index, key, field='val'):
+        mod=self.base.comps[index]
+        index=index%len(self.base.comps)
+        fields=self.params.get((index, mod._get_key(key)), {})
+        if field in fields:
+            return fields[field]
+        return mod._peek_param(key).get_pval(field)
+
+    def is_values_only(self):
+        '''
+        whether only values or toggles of parameters are overridden
+        '''
+        return not self.head and not self.Z
+
+    def get_vector(self, base_vec=None):
+        '''
+        vector of parameter values, see `chisq.get_vector`
+            components skipped by Z=1 in base are not in vector
+
+        base_vec: vector of base, if computed before
+        '''
+        from .chisq import get_vector
+
+        if base_vec is None:
+            base_vec=get_vector(self.base)
+        vec=np.array(base_vec, dtype=float)
+
+        offsets=self._offsets()
+        for (i, k), fields in self.params.items():
+            if 'val' in fields and i in offsets:
+                mod=self.base.comps[i]
+                vec[offsets[i]+mod.sorted_keys.index(k)]=fields['val']
+        return vec
+
+    def _offsets(self):
+        '''
+        offset in vector for index of each component not skipped
+        '''
+        offsets={}
+        n=0
+        for i, mod in enumerate(self.base.comps):
+            if not mod.Z.get():
+                offsets[i]=n
+                n+=len(mod.sorted_keys)
+        return offsets
+
+    # build GalFit
+    def _build(self, share):
+        '''
+        GalFit of merged view
+
+        share: bool
+            whether to share unchanged components with base
+        '''
+        from .galfit import GalFit
+
+        base=self.base
+        base._load_pending_log()
+
+        gf=GalFit()
+        gf.gfpath=base.gfpath
+        for k in ['logname', 'init_file']:
+            if k in base.__dict__:
+                setattr(gf, k, base.__dict__[k])
+
+        # head is always copied, since it may be changed in writing
+        gf.head=base.head.copy()
+        for k, v in self.head.items():
+            gf.head._set_param(k, v)
+
+        changed={i for i, _ in self.params}|set(self.Z)
+        for i, mod in enumerate(base.comps):
+            if share and i not in changed:
+                gf.comps.append(mod)
+                continue
+
+            if share:
+                newmod=_shallow_copy(mod)
+            else:
+                newmod=mod.copy()
+            gf.comps.append(newmod)
+
+        for (i, k), fields in self.params.items():
+            mod=gf.comps[i]
+            p=mod._peek_param(k).copy()
+            for f, v in fields.items():
+                p._set_param(f, v)
+            mod.params[k]=p
+
+        for i, Z in self.Z.items():
+            gf.comps[i].Z=gf.comps[i].Z.copy()
+            gf.comps[i].Z.set(Z)
+
+        # constraints, with components mapped to those in view
+        inds={id(mod): i for i, mod in enumerate(base.comps)}
+        for cons in base.gfcons.cons:
+            newcons=copy.copy(cons)
+            newcons.comps=[gf.comps[inds[id(mod)]] for mod in cons.comps]
+            gf.gfcons.cons.append(newcons)
+
+        return gf
+
+    def view(self):
+        '''
+        merged view, sharing unchanged components with base
+            it should be taken as read-only
+        '''
+        return self._build(share=True)
+
+    def materialize(self):
+        '''
+        independent GalFit with overrides applied
+        '''
+        return self._build(share=False)
+
+    # output
+    def writeto_file(self, filename, **kwargs):
+        '''
+        write merged view, see `GalFit.writeto_file`
+        '''
+        return self.view().writeto_file(filename, **kwargs)
+
+    def render_model(self, **kwargs):
+        return self.view().render_model(**kwargs)
+
+    def eval_chisq(self, **kwargs):
+        from .chisq import eval_chisq
+        return eval_chisq(self.view(), **kwargs)
+
+    def __str__(self):
+        return str(self.view())
+
+def _shallow_copy(mod):
+    '''
+    copy of model, sharing containers of parameters
+        and its dict of parameters could be changed independently
+    '''
+    newmod=object.__new__(type(mod))
+    object.__setattr__(newmod, 'fmt', mod.fmt)
+    object.__setattr__(newmod, 'params', dict(mod.params))
+    newmod.__dict__.update(mod.__dict__)
+    newmod.parrs=None
+    newmod.logloader=None
+    return newmod
+
+# user functions
+def sweep(base, index, key, values, field='val'):
+    '''
+    variants of base, with one parameter taking each of values
+
+    Parameters
+    ----------
+    index, key: component and parameter, see `Variant.set_param`
+
+    values: iterable
+
+    field: 'val' or 'tofit'
+    '''
+    variants=[]
+    for v in values:
+        var=Variant(base)
+        var.set_param(index, key, **{field: v})
+        variants.append(var)
+    return variants
+
+def eval_chisq_many(variants, **kwargs):
+    '''
+    chi-square of many variants
+
+        variants of a base overriding only parameters
+            are evaluated in batch by one `chisq.ChiSquare` of base
+        others are evaluated one by one through their views
+
+    kwargs: optional arguments for `chisq.ChiSquare`
+
+    Returns
+    -------
+    array of chi-square
+    '''
+    from .chisq import ChiSquare, get_vector
+
+    chisq=np.empty(len(variants))
+
+    groups={}
+    for i, var in enumerate(variants):
+        if var.is_values_only():
+            groups.setdefault(id(var.base), []).append(i)
+        else:
+            chisq[i]=ChiSquare(var.view(), **kwargs)()
+
+    for inds in groups.values():
+        base=variants[inds[0]].base
+        base_vec=get_vector(base)
+        vecs=[variants[i].get_vector(base_vec) for i in inds]
+        chisq[inds]=ChiSquare(base, **kwargs)(vecs)
+
+    return chisq
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+'''
+streaming writer of templates
+
+    text of a template is written to file handle piece by piece,
+        with line formats precompiled per class of model and head,
+    same as `str(gf)`
+
+    constraint file is rewritten only if its content changes
+'''
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .collection import Collection
+from .head import Head
+
+# constant lines in template
+head_title='='*80+'\n# IMAGE and GALFIT CONTROL PARAMETERS\n'
+comps_title='''
+# INITIAL FITTING PARAMETERS
+#
+#   For component type, the allowed functions:
+#     sersic, expdisk, edgedisk, devauc,
+#     king, nuker, psf, gaussian, moffat,
+#     ferrer, and sky.
+#
+#   Hidden parameters appear only when specified:
+#     Bn (n=integer, Bending Modes).
+#     C0 (diskyness/boxyness),
+#     Fn (n=integer, Azimuthal Fourier Modes).
+#     R0-R10 (coordinate rotation, for spiral).
+#     To, Ti, T0-T10 (truncation function).
+#
+# {0}
+#   par)    par value(s)    fit toggle(s)
+# {0}
+
+'''.format('-'*78)
+tail='='*80+'\n'
+
+# precompiled formats
+_formats={}
+
+def _comment(cls, key):
+    '''
+    comment of a key, as `Collection._get_comments`
+    '''
+    comments=cls.comments
+    if key not in comments:
+        sup=cls.__bases__[0]
+        if issubclass(sup, Collection):
+            comments=sup.comments
+    return comments.get(key, '')
+
+def get_formats(cls):
+    '''
+    list of (key, line format) for a class of Head or Model
+        line format has one '%s' for string of value
+    '''
+    if cls not in _formats:
+        if issubclass(cls, Head):
+            keys=cls.sorted_keys
+        else:
+            keys=('0',)+cls.sorted_keys+('Z',)
+            if not cls.is_sky(cls):   # not depend on instance
+                keys=keys[:2]+keys[3:]
+
+        klen, vlen=cls.len_keystr, cls.len_valstr
+        fmts=[]
+        for k in keys:
+            c=_comment(cls, k).replace('%', '%%')
+            fmts.append((k, '%*s) %%-%is # %s\n' % (klen, k, vlen, c)))
+        _formats[cls]=fmts
+    return _formats[cls]
+
+# strings of values
+def _param_fields(p):
+    '''
+    strings of val and tofit of a parameter
+    '''
+    fields=p.params
+    v=fields['val'] if 'val' in fields else p._peek_param('val')
+    t=fields['tofit'] if 'tofit' in fields else p._peek_param('tofit')
+    return str(v), str(t)
+
+# strings of default values in head, by class
+_head_defaults={}
+
+def write_head(head, f):
+    cls=type(head)
+    if cls not in _head_defaults:
+        h=cls()
+        _head_defaults[cls]={k: str(h._peek_param(k)) for k in cls.sorted_keys}
+    defaults=_head_defaults[cls]
+    if head.fmt!=cls.fmt_value:
+        defaults={}
+
+    params=head.params
+    for k, fmt in get_formats(cls):
+        if k in params:
+            v=params[k]
+        elif k in defaults:
+            v=defaults[k]
+        else:
+            v=head._peek_param(k)
+        f.write(fmt % v)
+
+def write_model(mod, f):
+    '''
+    write lines of a model, without loading fit.log pending
+    '''
+    params=mod.params
+    peek=lambda k: params[k] if k in params else mod._peek_param(k)
+
+    sky=mod.is_sky()
+    for k, fmt in get_formats(type(mod)):
+        if k=='0':
+            v=mod.name
+        elif k=='Z':
+            v=mod.Z
+        elif k=='1' and not sky:
+            x0s=_param_fields(peek('1'))
+            y0s=_param_fields(peek('2'))
+            v='%s %s %s %s' % (x0s[0], y0s[0], x0s[1], y0s[1])
+        else:
+            v='%-11s %s' % _param_fields(peek(k))
+        f.write(fmt % v)
+
+def write_template(gf, f):
+    '''
+    write template to a file handle, same as `str(gf)` with ending newline
+    '''
+    f.write(head_title)
+    write_head(gf.head, f)
+    f.write(comps_title)
+
+    gf._reset_comps_id()
+    for comp in gf.comps:
+        f.write('# Component number: %i\n' % comp.id)
+        write_model(comp, f)
+        f.write('\n')
+
+    f.write(tail)
+
+# constraint file
+def write_if_changed(fname, text):
+    '''
+    write text to a file, only if its content changes
+
+    return True if written
+    '''
+    try:
+        if os.path.getsize(fname)==len(text.encode()):
+            with open(fname) as f:
+                if f.read()==text:
+                    return False
+    except OSError:
+        pass
+
+    with open(fname, 'w') as f:
+        f.write(text)
+    return True
+
+def write_cons(gf):
+    '''
+    write constraint file of a template, if not empty and changed
+    '''
+    if gf.gfcons.is_empty():
+        return False
+    return write_if_changed(gf.get_abs_hdp('cons'), str(gf.gfcons)+'\n')
+
+# user function
+def write_many(gfs, paths, workers=None, **kwargs):
+    '''
+    write many templates by a thread pool
+
+    Parameters
+    ----------
+    gfs: list of GalFit
+
+    paths: list of str or int
+        files to write
+
+    workers: int or None
+        number of threads, default by `ThreadPoolExecutor`
+
+    kwargs: optional arguments for `GalFit.writeto_file`, like chdir
+
+    Returns
+    -------
+    list of file names
+    '''
+    paths=list(paths)
+    if len(gfs)!=len(paths):
+        raise Exception('mismatched numbers of templates and paths')
+
+    def write(gf, path):
+        return gf.writeto_file(path, **kwargs)
+
+    if workers==1:
+        return [write(gf, p) for gf, p in zip(gfs, paths)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(write, gfs, paths))